@@ -50,7 +50,7 @@ class _dict(dict):
 
 def _(msg, lang=None):
 	"""Returns translated string in current lang, if exists."""
-	from frappe.translate import get_full_dict
+	from frappe.translate import get_translation
 	from frappe.utils import strip_html_tags, is_html
 
 	if not hasattr(local, 'lang'):
@@ -67,8 +67,8 @@ def _(msg, lang=None):
 	# msg should always be unicode
 	msg = as_unicode(msg).strip()
 
-	# return lang_full_dict according to lang passed parameter
-	return get_full_dict(lang).get(msg) or non_translated_msg
+	# return translation according to lang passed parameter
+	return get_translation(msg, lang) or non_translated_msg
 
 def as_unicode(text, encoding='utf-8'):
 	'''Convert to unicode if required'''
@@ -150,6 +150,8 @@ def init(site, sites_path=None, new_site=False):
 	local.conf = _dict(get_site_config())
 	local.lang = local.conf.lang or "en"
 	local.lang_full_dict = None
+	local.lang_user_translations = None
+	local.translation_catalogs = None
 
 	local.module_app = None
 	local.app_modules = None
@@ -159,6 +161,7 @@ def init(site, sites_path=None, new_site=False):
 	local.user_perms = None
 	local.session = None
 	local.role_permissions = {}
+	local.permission_bundles = {}
 	local.valid_columns = {}
 	local.new_doc_templates = {}
 	local.link_count = {}
@@ -166,8 +169,10 @@ def init(site, sites_path=None, new_site=False):
 	local.jenv = None
 	local.jloader =None
 	local.cache = {}
+	local.l1_cache_versions = {}
 	local.document_cache = {}
 	local.meta_cache = {}
+	local.meta_versions = None
 	local.form_dict = _dict()
 	local.session = _dict()
 
@@ -212,13 +217,14 @@ def get_site_config(sites_path=None, site_path=None):
 
 	if sites_path:
 		common_site_config = os.path.join(sites_path, "common_site_config.json")
-		if os.path.exists(common_site_config):
-			config.update(get_file_json(common_site_config))
+		config.update(get_cached_file_json(common_site_config) or {})
 
 	if site_path:
 		site_config = os.path.join(site_path, "site_config.json")
-		if os.path.exists(site_config):
-			config.update(get_file_json(site_config))
+		site_config_json = get_cached_file_json(site_config,
+			ttl=config.get("site_config_cache_ttl", 300))
+		if site_config_json is not None:
+			config.update(site_config_json)
 		elif local.site and not local.flags.new_site:
 			print("{0} does not exist".format(local.site))
 			sys.exit(1)
@@ -226,6 +232,30 @@ def get_site_config(sites_path=None, site_path=None):
 
 	return _dict(config)
 
+# path -> (file signature, time loaded, parsed json), see get_cached_file_json
+file_json_cache = {}
+
+def get_cached_file_json(path, ttl=300):
+	"""Returns a copy of the parsed JSON file (or None if it does not exist).
+
+	Files are parsed once per process and read again only when their mtime, size or
+	inode change, or after `ttl` seconds. Each call gets its own copy, so changes
+	to the returned dict (like `local.conf`) don't leak to other requests."""
+	import copy, time
+
+	try:
+		stat = os.stat(path)
+	except OSError:
+		file_json_cache.pop(path, None)
+		return None
+
+	signature = (stat.st_mtime, stat.st_size, stat.st_ino)
+	cached = file_json_cache.get(path)
+	if not cached or cached[0] != signature or (ttl and time.time() - cached[1] > ttl):
+		cached = file_json_cache[path] = (signature, time.time(), get_file_json(path))
+
+	return copy.deepcopy(cached[2])
+
 def get_conf(site=None):
 	if hasattr(local, 'conf'):
 		return local.conf
@@ -384,6 +414,7 @@ def set_user(username):
 	local.jenv = None
 	local.session.data = _dict()
 	local.role_permissions = {}
+	local.permission_bundles = {}
 	local.new_doc_templates = {}
 	local.user_perms = None
 
@@ -567,6 +598,7 @@ def clear_cache(user=None, doctype=None):
 			get_attr(fn)()
 
 	local.role_permissions = {}
+	local.permission_bundles = {}
 
 def has_permission(doctype=None, ptype="read", doc=None, user=None, verbose=False, throw=False):
 	"""Raises `frappe.PermissionError` if not permitted.
@@ -737,6 +769,15 @@ def get_doc(*args, **kwargs):
 
 	return doc
 
+def bulk_insert(docs, **kwargs):
+	"""Insert a list of new documents (or document dicts) using batched multi-row `INSERT`
+	queries. Validations and hooks run as in `Document.insert`.
+
+	:param docs: List of documents or document dicts.
+	:param chunk_size: [optional] Maximum number of rows per `INSERT`."""
+	import frappe.model.document
+	return frappe.model.document.bulk_insert(docs, **kwargs)
+
 def get_last_doc(doctype):
 	"""Get last created document of this type."""
 	d = get_all(doctype, ["name"], order_by="creation desc", limit_page_length=1)
@@ -1244,6 +1285,7 @@ def get_list(doctype, *args, **kwargs):
 	:param order_by: Order By e.g. `modified desc`.
 	:param limit_page_start: Start results at record #. Default 0.
 	:param limit_page_length: No of records in the page. Default 20.
+	:param as_iterator: Return a generator of rows, fetched from the database in batches.
 
 	Example usage:
 
@@ -1454,6 +1496,8 @@ def enqueue(*args, **kwargs):
 		:param event: this is passed to enable clearing of jobs from queues
 		:param is_async: (optional) if is_async=False, the method is executed immediately, else via a worker
 		:param job_name: (optional) can be used to name an enqueue call, which can be used to prevent duplicate calls
+		:param deduplicate: (optional) if deduplicate=True, the job is not enqueued if a job with the same `job_id` is already queued
+		:param job_id: (optional) identifies the job for `deduplicate`, defaults to `job_name` or the method
 		:param kwargs: keyword arguments to be passed to the method
 	'''
 	import frappe.utils.background_jobs
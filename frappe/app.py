@@ -19,6 +19,7 @@ import frappe.auth
 import frappe.api
 import frappe.utils.response
 import frappe.website.render
+import frappe.website.page_cache
 from frappe.utils import get_site_name
 from frappe.middlewares import StaticDataMiddleware
 from frappe.utils.error import make_error_snapshot
@@ -49,7 +50,14 @@ def application(request):
 	try:
 		rollback = True
 
-		init_request(request)
+		init_site(request)
+
+		# cached guest pages are sent before the session is loaded and the database is connected
+		response = frappe.website.page_cache.get_response(request)
+		if response:
+			return response
+
+		init_session(request)
 
 		frappe.recorder.record()
 
@@ -67,6 +75,7 @@ def application(request):
 
 		elif frappe.local.request.method in ('GET', 'HEAD', 'POST'):
 			response = frappe.website.render.render()
+			frappe.website.page_cache.store_response(request, response)
 
 		else:
 			raise NotFound
@@ -98,6 +107,10 @@ def application(request):
 	return response
 
 def init_request(request):
+	init_site(request)
+	init_session(request)
+
+def init_site(request):
 	frappe.local.request = request
 	frappe.local.is_ajax = frappe.get_request_header("X-Requested-With")=="XMLHttpRequest"
 
@@ -111,6 +124,7 @@ def init_request(request):
 	if frappe.local.conf.get('maintenance_mode'):
 		raise frappe.SessionStopped
 
+def init_session(request):
 	make_form_dict(request)
 
 	frappe.local.http_request = frappe.auth.HTTPRequest()
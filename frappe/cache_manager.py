@@ -17,7 +17,7 @@ global_cache_keys = ("app_hooks", "installed_apps",
 
 user_cache_keys = ("bootinfo", "user_recent", "roles", "user_doc", "lang",
 		"defaults", "user_permissions", "home_page", "linked_with",
-		"desktop_icons", 'portal_menu_items')
+		"desktop_icons", 'portal_menu_items', 'permission_stamp')
 
 doctype_cache_keys = ("meta", "form_meta", "table_columns", "last_modified",
 		"linked_doctypes", 'notifications', 'workflow' ,'energy_point_rule_map')
@@ -31,13 +31,13 @@ def clear_user_cache(user=None):
 	clear_notifications(user)
 
 	if user:
-		for name in user_cache_keys:
-			cache.hdel(name, user)
-		cache.delete_keys("user:" + user)
-		clear_defaults_cache(user)
+		with cache.batch():
+			cache.hdel_many(user_cache_keys, user)
+			cache.delete_keys("user:" + user)
+			clear_defaults_cache(user)
 	else:
-		for name in user_cache_keys:
-			cache.delete_key(name)
+		cache.delete_key(user_cache_keys)
+		cache.delete_keys("user:*:permission_bundle")
 		clear_defaults_cache()
 		clear_global_cache()
 
@@ -51,8 +51,7 @@ def clear_global_cache():
 
 def clear_defaults_cache(user=None):
 	if user:
-		for p in ([user] + common_default_keys):
-			frappe.cache().hdel("defaults", p)
+		frappe.cache().hdel_many("defaults", [user] + common_default_keys)
 	elif frappe.flags.in_install!="frappe":
 		frappe.cache().delete_key("defaults")
 
@@ -61,37 +60,34 @@ def clear_document_cache():
 	frappe.cache().delete_key("document_cache")
 
 def clear_doctype_cache(doctype=None):
+	from frappe.model.meta import clear_meta_store
 	cache = frappe.cache()
 
 	if getattr(frappe.local, 'meta_cache') and (doctype in frappe.local.meta_cache):
 		del frappe.local.meta_cache[doctype]
 
-	for key in ('is_table', 'doctype_modules'):
-		cache.delete_value(key)
+	with cache.batch():
+		cache.delete_value(['is_table', 'doctype_modules'])
 
-	def clear_single(dt):
-		for name in doctype_cache_keys:
-			cache.hdel(name, dt)
+		if doctype:
+			# clear all parent doctypes
+			doctypes = [doctype] + [dt.parent for dt in frappe.db.get_all('DocField', 'parent',
+				dict(fieldtype=['in', frappe.model.table_fields], options=doctype))]
 
-	if doctype:
-		clear_single(doctype)
+			cache.hdel_many(doctype_cache_keys, doctypes)
+			for dt in doctypes:
+				clear_meta_store(dt)
 
-		# clear all parent doctypes
+			# clear all notifications
+			delete_notification_count_for(doctype)
 
-		for dt in frappe.db.get_all('DocField', 'parent',
-			dict(fieldtype=['in', frappe.model.table_fields], options=doctype)):
-			clear_single(dt.parent)
+		else:
+			# clear all
+			cache.delete_value(doctype_cache_keys)
+			clear_meta_store()
 
-		# clear all notifications
-		delete_notification_count_for(doctype)
-
-	else:
-		# clear all
-		for name in doctype_cache_keys:
-			cache.delete_value(name)
-
-	# Clear all document's cache. To clear documents of a specific DocType document_cache should be restructured
-	clear_document_cache()
+		# Clear all document's cache. To clear documents of a specific DocType document_cache should be restructured
+		clear_document_cache()
 
 def get_doctype_map(doctype, name, filters, order_by=None):
 	cache = frappe.cache()
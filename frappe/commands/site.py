@@ -216,23 +216,34 @@ def disable_user(context, email):
 
 @click.command('migrate')
 @click.option('--rebuild-website', help="Rebuild webpages after migration")
+@click.option('--parallel', type=int, default=1, help="Migrate this many sites at a time, in separate processes")
 @pass_context
-def migrate(context, rebuild_website=False):
+def migrate(context, rebuild_website=False, parallel=1):
 	"Run patches, sync schema and rebuild files/translations"
-	from frappe.migrate import migrate
+	from frappe.migrate import migrate_site
 
-	for site in context.sites:
-		print('Migrating', site)
-		frappe.init(site=site)
-		frappe.connect()
-		try:
-			migrate(context.verbose, rebuild_website=rebuild_website)
-		finally:
-			frappe.destroy()
+	if parallel > 1 and len(context.sites) > 1:
+		from frappe.utils.site_pool import run_for_sites, print_report
+
+		def print_progress(result):
+			print('Migrated {0}: {1} ({2:.1f}s)'.format(result.site, result.status, result.time))
+
+		results = run_for_sites(migrate_site, context.sites, parallel,
+			args=(context.verbose, rebuild_website), callback=print_progress)
+		failed = print_report(results, 'Migrate')
+
+	else:
+		failed = []
+		for site in context.sites:
+			print('Migrating', site)
+			migrate_site(site, context.verbose, rebuild_website=rebuild_website)
 
 	print("Compiling Python Files...")
 	compileall.compile_dir('../apps', quiet=1, rx=re.compile('.*node_modules.*'))
 
+	if failed:
+		sys.exit(1)
+
 @click.command('run-patch')
 @click.argument('module')
 @pass_context
@@ -26,6 +26,9 @@ def build(app=None, make_copy=False, restore = False, verbose=False):
 	no_compress = frappe.local.conf.developer_mode or False
 	frappe.build.bundle(no_compress, app=app, make_copy=make_copy, restore = restore, verbose=verbose)
 
+	from frappe.utils.translation_catalog import build_catalogs
+	build_catalogs(verbose=verbose)
+
 @click.command('watch')
 def watch():
 	"Watch and concatenate JS and CSS files as and when they change"
@@ -6,9 +6,11 @@ from __future__ import unicode_literals
 import frappe
 from frappe import _
 import frappe.permissions
-import re, csv, os
+import re
 from frappe.utils.csvutils import UnicodeWriter
+from frappe.utils.xlsxutils import XLSXWriter
 from frappe.utils import cstr, formatdate, format_datetime, parse_json, cint
+from frappe.utils.data import make_filter_tuple
 from frappe.core.doctype.data_import.importer import get_data_keys
 from six import string_types
 
@@ -30,6 +32,9 @@ def export_data(doctype=None, parent_doctype=None, all_doctypes=True, with_data=
 	exporter.build_response()
 
 class DataExporter:
+	# parents fetched per query, children are fetched for each page of parents
+	page_length = 1000
+
 	def __init__(self, doctype=None, parent_doctype=None, all_doctypes=True, with_data=False,
 		select_columns=None, file_type='CSV', template=False, filters=None):
 		self.doctype = doctype
@@ -70,7 +75,10 @@ class DataExporter:
 				self.child_doctypes.append(dict(doctype=df.options, parentfield=df.fieldname))
 
 	def build_response(self):
-		self.writer = UnicodeWriter()
+		if self.file_type == 'Excel':
+			self.writer = XLSXWriter("Data Import Template" if self.template else 'Data Export')
+		else:
+			self.writer = UnicodeWriter()
 		self.name_field = 'parent' if self.parent_doctype != self.doctype else 'name'
 
 		if self.template:
@@ -256,90 +264,136 @@ class DataExporter:
 
 		frappe.permissions.can_export(self.parent_doctype, raise_exception=True)
 
-		# sort nested set doctypes by `lft asc`
-		order_by = None
-		table_columns = frappe.db.get_table_columns(self.parent_doctype)
-		if 'lft' in table_columns and 'rgt' in table_columns:
-			order_by = '`tab{doctype}`.`lft` asc'.format(doctype=self.parent_doctype)
-		# get permitted data only
-		self.data = frappe.get_list(self.doctype, fields=["*"], filters=self.filters, limit_page_length=None, order_by=order_by)
+		self.data = False
+		self.column_formatters = {}
+		name_filter = self.get_name_filter()
 
-		for doc in self.data:
-			op = self.docs_to_export.get("op")
-			names = self.docs_to_export.get("name")
+		for docs in self.get_data_pages():
+			self.data = True
+			children = self.get_children([doc.name for doc in docs]) if self.all_doctypes else {}
 
-			if names and op:
-				if op == '=' and doc.name not in names:
+			for doc in docs:
+				if name_filter and not name_filter(doc.name):
 					continue
-				elif op == '!=' and doc.name in names:
-					continue
-			elif names:
-				try:
-					sflags = self.docs_to_export.get("flags", "I,U").upper()
-					flags = 0
-					for a in re.split('\W+',sflags):
-						flags = flags | reflags.get(a,0)
-
-					c = re.compile(names, flags)
-					m = c.match(doc.name)
-					if not m:
-						continue
-				except Exception:
-					if doc.name not in names:
-						continue
-			# add main table
-			rows = []
-
-			self.add_data_row(rows, self.doctype, None, doc, 0)
-
-			if self.all_doctypes:
-				# add child tables
-				for c in self.child_doctypes:
-					for ci, child in enumerate(frappe.db.sql("""select * from `tab{0}`
-						where parent=%s and parentfield=%s order by idx""".format(c['doctype']),
-						(doc.name, c['parentfield']), as_dict=1)):
-						self.add_data_row(rows, c['doctype'], c['parentfield'], child, ci)
-
-			for row in rows:
-				self.writer.writerow(row)
 
-	def add_data_row(self, rows, dt, parentfield, doc, rowidx):
-		d = doc.copy()
-		meta = frappe.get_meta(dt)
-		if self.all_doctypes:
-			d.name = '"'+ d.name+'"'
+				# add main table
+				rows = []
+
+				self.add_data_row(rows, self.doctype, None, doc, 0)
 
+				if self.all_doctypes:
+					# add child tables
+					for c in self.child_doctypes:
+						for ci, child in enumerate(children.get((c['doctype'], c['parentfield'], doc.name), [])):
+							self.add_data_row(rows, c['doctype'], c['parentfield'], child, ci)
+
+				for row in rows:
+					self.writer.writerow(row)
+
+	def get_data_pages(self):
+		"""Yields pages of permitted documents. Pages are read after the last `name` (`lft` for
+		trees) of the previous page, so the whole list is never held in memory and late
+		pages are not slower than the first"""
+		# sort nested set doctypes by `lft asc`
+		table_columns = frappe.db.get_table_columns(self.parent_doctype)
+		key = 'lft' if 'lft' in table_columns and 'rgt' in table_columns else 'name'
+		order_by = '`tab{doctype}`.`{key}` asc'.format(doctype=self.doctype, key=key)
+
+		last = None
+		while True:
+			filters = self.get_filters()
+			if last is not None:
+				filters.append([self.doctype, key, '>', last])
+
+			# get permitted data only
+			docs = frappe.get_list(self.doctype, fields=["*"], filters=filters, order_by=order_by,
+				limit_page_length=self.page_length)
+			if docs:
+				yield docs
+
+			if len(docs) < self.page_length:
+				break
+
+			last = docs[-1].get(key)
+
+	def get_filters(self):
+		if isinstance(self.filters, dict):
+			return [make_filter_tuple(self.doctype, key, value) for key, value in self.filters.items()]
+
+		return list(self.filters or [])
+
+	def get_children(self, names):
+		"""Returns {(doctype, parentfield, parent): rows} of the child tables of `names`,
+		with one query per table field"""
+		children = {}
+		for c in self.child_doctypes:
+			for child in frappe.db.sql("""select * from `tab{0}`
+				where parent in ({1}) and parentfield=%s order by parent, idx""".format(c['doctype'],
+					", ".join(["%s"] * len(names))), tuple(names) + (c['parentfield'],), as_dict=1):
+				children.setdefault((c['doctype'], c['parentfield'], child.parent), []).append(child)
+
+		return children
+
+	def get_name_filter(self):
+		"""Returns a function that checks if a name matches `docs_to_export`"""
+		op = self.docs_to_export.get("op")
+		names = self.docs_to_export.get("name")
+
+		if names and op:
+			if op == '=':
+				return lambda name: name in names
+			elif op == '!=':
+				return lambda name: name not in names
+		elif names:
+			try:
+				sflags = self.docs_to_export.get("flags", "I,U").upper()
+				flags = 0
+				for a in re.split('\W+',sflags):
+					flags = flags | reflags.get(a,0)
+
+				c = re.compile(names, flags)
+				return lambda name: c.match(name)
+			except Exception:
+				return lambda name: name in names
+
+	def add_data_row(self, rows, dt, parentfield, doc, rowidx):
 		if len(rows) < rowidx + 1:
 			rows.append([""] * (len(self.columns) + 1))
 		row = rows[rowidx]
 
-		_column_start_end = self.column_start_end.get((dt, parentfield))
-
-		if _column_start_end:
-			for i, c in enumerate(self.columns[_column_start_end.start:_column_start_end.end]):
-				df = meta.get_field(c)
-				fieldtype = df.fieldtype if df else "Data"
-				value = d.get(c, "")
-				if value:
+		for idx, fieldname, formatter in self.get_column_formatters(dt, parentfield):
+			value = doc.get(fieldname, "")
+			if value:
+				if formatter:
+					value = formatter(value)
+				elif fieldname == 'name' and self.all_doctypes:
+					value = '"'+ value+'"'
+
+			row[idx] = value
+
+	def get_column_formatters(self, dt, parentfield):
+		"""Returns [(index in row, fieldname, formatter)] of the columns of `dt`, built once per export"""
+		if (dt, parentfield) not in self.column_formatters:
+			meta = frappe.get_meta(dt)
+			formatters = self.column_formatters[(dt, parentfield)] = []
+
+			_column_start_end = self.column_start_end.get((dt, parentfield))
+			if _column_start_end:
+				for i, c in enumerate(self.columns[_column_start_end.start:_column_start_end.end]):
+					df = meta.get_field(c)
+					fieldtype = df.fieldtype if df else "Data"
+					formatter = None
 					if fieldtype == "Date":
-						value = formatdate(value)
+						formatter = formatdate
 					elif fieldtype == "Datetime":
-						value = format_datetime(value)
+						formatter = format_datetime
 
-				row[_column_start_end.start + i + 1] = value
+					formatters.append((_column_start_end.start + i + 1, c, formatter))
 
-	def build_response_as_excel(self):
-		filename = frappe.generate_hash("", 10)
-		with open(filename, 'wb') as f:
-			f.write(cstr(self.writer.getvalue()).encode('utf-8'))
-		f = open(filename)
-		reader = csv.reader(f)
+		return self.column_formatters[(dt, parentfield)]
 
-		from frappe.utils.xlsxutils import make_xlsx
-		xlsx_file = make_xlsx(reader, "Data Import Template" if self.template else 'Data Export')
-
-		f.close()
-		os.remove(filename)
+	def build_response_as_excel(self):
+		xlsx_file = self.writer.getvalue()
 
 		# write out response as a xlsx type
 		frappe.response['filename'] = self.doctype + '.xlsx'
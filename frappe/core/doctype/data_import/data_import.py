@@ -8,7 +8,7 @@ from frappe import _
 import frappe.modules.import_file
 from frappe.model.document import Document
 from frappe.utils.data import format_datetime
-from frappe.core.doctype.data_import.importer import upload
+from frappe.core.doctype.data_import.importer import upload, start_chunked_import, get_chunk_size
 from frappe.utils.background_jobs import enqueue
 
 
@@ -37,10 +37,17 @@ def import_data(data_import):
 
 	from frappe.core.page.background_jobs.background_jobs import get_info
 	enqueued_jobs = [d.get("job_name") for d in get_info()]
+	# chunks of a chunked import are named "<data import>:<chunk>"
+	enqueued_jobs += [d.rsplit(":", 1)[0] for d in enqueued_jobs if d and ":" in d]
 
 	if data_import not in enqueued_jobs:
-		enqueue(upload, queue='default', timeout=6000, event='data_import', job_name=data_import,
-			data_import_doc=data_import, from_data_import="Yes", user=frappe.session.user)
+		chunk_size = get_chunk_size()
+		if chunk_size and frappe.db.get_value("Data Import", data_import, "total_rows") > chunk_size:
+			enqueue(start_chunked_import, queue='long', timeout=6000, event='data_import', job_name=data_import,
+				data_import=data_import, user=frappe.session.user)
+		else:
+			enqueue(upload, queue='default', timeout=6000, event='data_import', job_name=data_import,
+				data_import_doc=data_import, from_data_import="Yes", user=frappe.session.user)
 
 
 def import_doc(path, overwrite=False, ignore_links=False, ignore_insert=False,
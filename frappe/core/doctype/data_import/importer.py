@@ -7,7 +7,7 @@ from __future__ import unicode_literals, print_function
 
 from six.moves import range
 import requests
-import frappe, json, os
+import frappe, json, os, time
 import frappe.permissions
 
 from frappe import _
@@ -36,6 +36,18 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 	update_only = None, ignore_links=False, pre_process=None, via_console=False, from_data_import="No",
 	skip_errors = True, data_import_doc=None, validate_template=False, user=None):
 	"""upload data"""
+	return _upload(rows=rows, submit_after_import=submit_after_import, ignore_encoding_errors=ignore_encoding_errors,
+		no_email=no_email, overwrite=overwrite, update_only=update_only, ignore_links=ignore_links,
+		pre_process=pre_process, via_console=via_console, from_data_import=from_data_import,
+		skip_errors=skip_errors, data_import_doc=data_import_doc, validate_template=validate_template, user=user)
+
+def _upload(rows = None, submit_after_import=None, ignore_encoding_errors=False, no_email=True, overwrite=None,
+	update_only = None, ignore_links=False, pre_process=None, via_console=False, from_data_import="No",
+	skip_errors = True, data_import_doc=None, validate_template=False, user=None, chunk=None):
+	"""upload data, `rows` being one chunk of the file if `chunk` is set
+
+	:param chunk: dict with `index`, `count`, `row_offset` and `total` of the part of the file
+		in `rows` when imported by `import_chunk`"""
 
 	# for translations
 	if user:
@@ -199,16 +211,6 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 			doc['doctype'] = doctype
 			return doc, [], None
 
-	# used in testing whether a row is empty or parent row or child row
-	# checked only 3 first columns since first two columns can be blank for example the case of
-	# importing the item variant where item code and item name will be blank.
-	def main_doc_empty(row):
-		if row:
-			for i in range(3,0,-1):
-				if len(row) > i and row[i]:
-					return False
-		return True
-
 	def validate_naming(doc):
 		autoname = frappe.get_meta(doctype).autoname
 		if autoname:
@@ -276,23 +278,35 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 		_file.save()
 
 
+	def get_existing_names():
+		"""Names in the file that exist, fetched in bulk instead of one `frappe.db.exists` per row"""
+		name_idx = None
+		if doctypes:
+			for (dt, parentfield), fieldnames in column_idx_to_fieldname.items():
+				if dt == doctype:
+					for column_idx, fieldname in fieldnames.items():
+						if fieldname == "name":
+							name_idx = column_idx
+		elif "name" in columns:
+			name_idx = columns.index("name") + 1
+
+		names = []
+		if name_idx is not None:
+			for row in data:
+				if len(row) > name_idx and row[name_idx]:
+					name = cstr(row[name_idx])
+					if name.startswith('"'):
+						name = name[1:-1]
+					names.append(name)
+
+		return frappe.db.get_existing_names(doctype, names)
+
 	# header
 	filename, file_extension = ['','']
-	if not rows:
-		_file = frappe.get_doc("File", {"file_url": data_import_doc.import_file})
-		fcontent = _file.get_content()
-		filename, file_extension = _file.get_extension()
-
-		if file_extension == '.xlsx' and from_data_import == 'Yes':
-			from frappe.utils.xlsxutils import read_xlsx_file_from_attached_file
-			rows = read_xlsx_file_from_attached_file(file_url=data_import_doc.import_file)
-
-		elif file_extension == '.csv':
-			from frappe.utils.csvutils import read_csv_content
-			rows = read_csv_content(fcontent, ignore_encoding_errors)
-
-		else:
-			frappe.throw(_("Unsupported File Format"))
+	if chunk:
+		filename, file_extension = chunk.get("file_name"), chunk.get("file_extension")
+	elif not rows:
+		rows, filename, file_extension = read_import_file(data_import_doc, ignore_encoding_errors)
 
 	start_row = get_start_row()
 	header = rows[:start_row]
@@ -306,8 +320,7 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 	column_idx_to_fieldname = {}
 	column_idx_to_fieldtype = {}
 
-	if skip_errors:
-		data_rows_with_error = header
+	error_rows = []
 
 	if submit_after_import and not cint(frappe.db.get_value("DocType",
 			doctype, "is_submittable")):
@@ -344,6 +357,16 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 		if overwrite:
 			delete_child_rows(data, doctype)
 
+	# names are checked against the prefetched list, unless pre_process may change them
+	existing_names = None
+	if overwrite and not parentfield and not pre_process:
+		existing_names = get_existing_names()
+
+	def exists(name):
+		if existing_names is None:
+			return frappe.db.exists(doctype, name)
+		return cstr(name) in existing_names
+
 	import_log = []
 	def log(**kwargs):
 		if via_console:
@@ -358,15 +381,21 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 			return getlink(doctype, name)
 
 	# publish realtime task update
+	progress = frappe._dict(percent=None, time=0)
+	progress_total = chunk["total"] if chunk else total
 	def publish_progress(achieved, reload=False):
 		if data_import_doc:
-			frappe.publish_realtime("data_import_progress", {"progress": str(int(100.0*achieved/total)),
-				"data_import": data_import_doc.name, "reload": reload}, user=frappe.session.user)
+			# at most one event per percent and second, an event per row floods socketio for large files
+			percent = int(100.0*achieved/progress_total)
+			if reload or (percent != progress.percent and time.time() - progress.time >= 1):
+				progress.update(percent=percent, time=time.time())
+				publish_import_progress(data_import_doc.name, percent, reload)
 
 
 	error_flag = rollback_flag = False
 
 	batch_size = frappe.conf.data_import_batch_size or 1000
+	row_offset = chunk["row_offset"] if chunk else 0
 
 	for batch_start in range(0, total, batch_size):
 		batch = data[batch_start:batch_start + batch_size]
@@ -379,7 +408,9 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 			row_idx = i + start_row
 			doc = None
 
-			publish_progress(i)
+			if not chunk:
+				# chunks publish the progress of all chunks after each commit
+				publish_progress(batch_start + i)
 
 			try:
 				doc, attachments, last_error_row_idx = get_doc(row_idx)
@@ -393,7 +424,7 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 					doc = parent.append(parentfield, doc)
 					parent.save()
 				else:
-					if overwrite and doc.get("name") and frappe.db.exists(doctype, doc["name"]):
+					if overwrite and doc.get("name") and exists(doc["name"]):
 						original = frappe.get_doc(doctype, doc["name"])
 						original_name = original.name
 						original.update(doc)
@@ -408,6 +439,8 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 							prepare_for_insert(doc)
 							doc.flags.ignore_links = ignore_links
 							doc.insert()
+							if existing_names is not None:
+								existing_names.add(cstr(doc.name))
 					if attachments:
 						# check file url and create a File document
 						for file_url in attachments:
@@ -420,16 +453,16 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 					log(**{"row": doc.idx, "title": 'Inserted row for "%s"' % (as_link(parenttype, doc.parent)),
 						"link": get_absolute_url(parenttype, doc.parent), "message": 'Document successfully saved', "indicator": "green"})
 				elif submit_after_import:
-					log(**{"row": row_idx + 1, "title":'Submitted row for "%s"' % (as_link(doc.doctype, doc.name)),
+					log(**{"row": row_offset + row_idx + 1, "title":'Submitted row for "%s"' % (as_link(doc.doctype, doc.name)),
 						"message": "Document successfully submitted", "link": get_absolute_url(doc.doctype, doc.name), "indicator": "blue"})
 				elif original:
-					log(**{"row": row_idx + 1,"title":'Updated row for "%s"' % (as_link(doc.doctype, doc.name)),
+					log(**{"row": row_offset + row_idx + 1,"title":'Updated row for "%s"' % (as_link(doc.doctype, doc.name)),
 						"message": "Document successfully updated", "link": get_absolute_url(doc.doctype, doc.name), "indicator": "green"})
 				elif not update_only:
-					log(**{"row": row_idx + 1, "title":'Inserted row for "%s"' % (as_link(doc.doctype, doc.name)),
+					log(**{"row": row_offset + row_idx + 1, "title":'Inserted row for "%s"' % (as_link(doc.doctype, doc.name)),
 						"message": "Document successfully saved", "link": get_absolute_url(doc.doctype, doc.name), "indicator": "green"})
 				else:
-					log(**{"row": row_idx + 1, "title":'Ignored row for %s' % (row[1]), "link": None,
+					log(**{"row": row_offset + row_idx + 1, "title":'Ignored row for %s' % (row[1]), "link": None,
 						"message": "Document updation ignored", "indicator": "orange"})
 
 			except Exception as e:
@@ -449,7 +482,7 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 					error_link = None
 
 				log(**{
-					"row": row_idx + 1,
+					"row": row_offset + row_idx + 1,
 					"title": 'Error for row %s' % (len(row)>1 and frappe.safe_decode(row[1]) or ""),
 					"message": err_msg,
 					"indicator": "red",
@@ -461,7 +494,7 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 				if skip_errors:
 					if last_error_row_idx == len(rows)-1:
 						last_error_row_idx = len(rows)
-					data_rows_with_error += rows[row_idx:last_error_row_idx]
+					error_rows += rows[row_idx:last_error_row_idx]
 				else:
 					rollback_flag = True
 			finally:
@@ -473,50 +506,96 @@ def upload(rows = None, submit_after_import=None, ignore_encoding_errors=False,
 		else:
 			frappe.db.commit()
 
+		if chunk:
+			publish_progress(frappe.cache().incr(frappe.cache().make_key(get_chunk_key(data_import_doc.name, "progress")), len(batch)))
+
 	frappe.flags.mute_emails = False
 	frappe.flags.in_import = False
 
 	log_message = {"messages": import_log, "error": error_flag}
-	if data_import_doc:
-		data_import_doc.log_details = json.dumps(log_message)
-
-		import_status = None
-		if error_flag and data_import_doc.skip_errors and len(data) != len(data_rows_with_error):
-			import_status = "Partially Successful"
-			# write the file with the faulty row
-			file_name = 'error_' + filename + file_extension
-			if file_extension == '.xlsx':
-				from frappe.utils.xlsxutils import make_xlsx
-				xlsx_file = make_xlsx(data_rows_with_error, "Data Import Template")
-				file_data = xlsx_file.getvalue()
-			else:
-				from frappe.utils.csvutils import to_csv
-				file_data = to_csv(data_rows_with_error)
-			_file = frappe.get_doc({
-				"doctype": "File",
-				"file_name": file_name,
-				"attached_to_doctype": "Data Import",
-				"attached_to_name": data_import_doc.name,
-				"folder": "Home/Attachments",
-				"content": file_data})
-			_file.save()
-			data_import_doc.error_file = _file.file_url
-
-		elif error_flag:
-			import_status = "Failed"
-		else:
-			import_status = "Successful"
+	if chunk:
+		# merged into the Data Import doc once all chunks are done
+		return frappe._dict(index=chunk["index"], log_message=log_message, error_rows=error_rows,
+			header=header if chunk["index"] == 0 else None)
+	elif data_import_doc:
+		update_import_status(data_import_doc, log_message, header + error_rows, len(data),
+			filename, file_extension)
+	else:
+		return log_message
+
+def read_import_file(data_import_doc, ignore_encoding_errors=False):
+	"""Returns rows, file name and extension of the file attached to the Data Import"""
+	_file = frappe.get_doc("File", {"file_url": data_import_doc.import_file})
+	fcontent = _file.get_content()
+	filename, file_extension = _file.get_extension()
+
+	if file_extension == '.xlsx':
+		from frappe.utils.xlsxutils import read_xlsx_file_from_attached_file
+		rows = read_xlsx_file_from_attached_file(file_url=data_import_doc.import_file)
 
-		data_import_doc.import_status = import_status
-		data_import_doc.save()
-		if data_import_doc.import_status in ["Successful", "Partially Successful"]:
-			data_import_doc.submit()
-			publish_progress(100, True)
+	elif file_extension == '.csv':
+		from frappe.utils.csvutils import read_csv_content
+		rows = read_csv_content(fcontent, ignore_encoding_errors)
+
+	else:
+		frappe.throw(_("Unsupported File Format"))
+
+	return rows, filename, file_extension
+
+def update_import_status(data_import_doc, log_message, data_rows_with_error, total, filename, file_extension):
+	"""Set the log and status of the Data Import and attach the rows with errors"""
+	data_import_doc.log_details = json.dumps(log_message)
+
+	import_status = None
+	error_flag = log_message["error"]
+	if error_flag and data_import_doc.skip_errors and total != len(data_rows_with_error):
+		import_status = "Partially Successful"
+		# write the file with the faulty row
+		file_name = 'error_' + filename + file_extension
+		if file_extension == '.xlsx':
+			from frappe.utils.xlsxutils import make_xlsx
+			xlsx_file = make_xlsx(data_rows_with_error, "Data Import Template")
+			file_data = xlsx_file.getvalue()
 		else:
-			publish_progress(0, True)
-		frappe.db.commit()
+			from frappe.utils.csvutils import to_csv
+			file_data = to_csv(data_rows_with_error)
+		_file = frappe.get_doc({
+			"doctype": "File",
+			"file_name": file_name,
+			"attached_to_doctype": "Data Import",
+			"attached_to_name": data_import_doc.name,
+			"folder": "Home/Attachments",
+			"content": file_data})
+		_file.save()
+		data_import_doc.error_file = _file.file_url
+
+	elif error_flag:
+		import_status = "Failed"
 	else:
-		return log_message
+		import_status = "Successful"
+
+	data_import_doc.import_status = import_status
+	data_import_doc.save()
+	if data_import_doc.import_status in ["Successful", "Partially Successful"]:
+		data_import_doc.submit()
+		publish_import_progress(data_import_doc.name, 100, True)
+	else:
+		publish_import_progress(data_import_doc.name, 0, True)
+	frappe.db.commit()
+
+def publish_import_progress(data_import, progress, reload=False):
+	frappe.publish_realtime("data_import_progress", {"progress": str(progress),
+		"data_import": data_import, "reload": reload}, user=frappe.session.user)
+
+# used in testing whether a row is empty or parent row or child row
+# checked only 3 first columns since first two columns can be blank for example the case of
+# importing the item variant where item code and item name will be blank.
+def main_doc_empty(row):
+	if row:
+		for i in range(3,0,-1):
+			if len(row) > i and row[i]:
+				return False
+	return True
 
 def get_parent_field(doctype, parenttype):
 	parentfield = None
@@ -539,3 +618,128 @@ def delete_child_rows(rows, doctype):
 	for p in list(set([r[1] for r in rows])):
 		if p:
 			frappe.db.sql("""delete from `tab{0}` where parent=%s""".format(doctype), p)
+
+def get_chunk_size():
+	"""Rows per background job of a chunked import, set `data_import_chunk_size` in site config
+	to import large files in parallel on the `long` queue workers (0 imports in one job)"""
+	return cint(frappe.conf.data_import_chunk_size)
+
+def get_parent_columns(header):
+	"""Returns the indexes of the columns of the main doctype in the "DocType:" row of the
+	template header, None for old style templates"""
+	doctype_row = [row for row in header if row and row[0]==get_data_keys().doctype]
+	if not doctype_row:
+		return None
+
+	doctype_row, columns = doctype_row[0], []
+	for i, d in enumerate(doctype_row[1:]):
+		if d in ("~", "-"):
+			continue
+		if d and doctype_row[i] in (None, '', '~', '-', _("DocType") + ":") and columns:
+			# the next doctype (child table) starts
+			break
+		columns.append(i+1)
+
+	return columns or None
+
+def split_into_chunks(data, chunk_size, parent_columns=None):
+	"""Returns (start, end) of chunks of about `chunk_size` rows of `data`. Child rows
+	are kept in the chunk of their parent
+
+	:param parent_columns: Columns of the main doctype (see `get_parent_columns`), a row
+		with a value in any of them starts a new document."""
+	def is_parent_row(row):
+		if parent_columns is None:
+			return not main_doc_empty(row)
+		return any(len(row) > i and row[i] for i in parent_columns)
+
+	chunks = []
+	start = 0
+	for i in range(len(data)):
+		if i - start >= chunk_size and is_parent_row(data[i]):
+			chunks.append((start, i))
+			start = i
+
+	if start < len(data):
+		chunks.append((start, len(data)))
+
+	return chunks
+
+def get_chunk_key(data_import, key):
+	return "data_import_chunks:{0}:{1}".format(data_import, key)
+
+def clear_chunk_keys(data_import):
+	frappe.cache().delete_value([get_chunk_key(data_import, key) for key in ("results", "done", "progress")])
+
+def start_chunked_import(data_import, user=None):
+	"""Split the file of the Data Import into chunks and import them in parallel background
+	jobs, each committed separately. The last chunk to finish updates the Data Import"""
+	from frappe.utils.background_jobs import enqueue
+
+	data_import_doc = frappe.get_doc("Data Import", data_import)
+	rows, filename, file_extension = read_import_file(data_import_doc, data_import_doc.ignore_encoding_errors)
+
+	data_separator = get_data_keys().data_separator
+	start_row = [i for i, row in enumerate(rows) if row and row[0]==data_separator]
+	parent_table = [row for row in rows[:start_row[0]] if row and row[0]==get_data_keys().parent_table] \
+		if start_row else None
+	chunk_size = get_chunk_size()
+
+	# children imported into existing parents are saved with their parent, which can't
+	# be done by parallel jobs
+	if not start_row or (parent_table and len(parent_table[0]) > 1 and parent_table[0][1]) or not chunk_size:
+		return upload(data_import_doc=data_import_doc, from_data_import="Yes", user=user)
+
+	header, data = rows[:start_row[0] + 1], rows[start_row[0] + 1:]
+	chunks = split_into_chunks(data, chunk_size, get_parent_columns(header))
+
+	clear_chunk_keys(data_import)
+	for i, (start, end) in enumerate(chunks):
+		chunk = {"index": i, "count": len(chunks), "row_offset": start, "total": len(data),
+			"file_name": filename, "file_extension": file_extension}
+		enqueue(import_chunk, queue='long', timeout=6000, event='data_import',
+			job_name='{0}:{1}'.format(data_import, i), data_import=data_import,
+			rows=header + data[start:end], chunk=chunk, user=user)
+
+def import_chunk(data_import, rows, chunk, user=None):
+	"""Import a part of the file of the Data Import, see `start_chunked_import`"""
+	cache = frappe.cache()
+	result = None
+	try:
+		result = _upload(rows=rows, data_import_doc=data_import, from_data_import="Yes", user=user, chunk=chunk)
+	except Exception:
+		frappe.db.rollback()
+		error_log = frappe.log_error(frappe.get_traceback())
+		result = frappe._dict(index=chunk["index"], error_rows=[], header=None,
+			log_message={"messages": [{"row": chunk["row_offset"] + 1,
+				"title": 'Error for rows {0} to {1}'.format(chunk["row_offset"] + 1, chunk["row_offset"] + len(rows)),
+				"message": '<p class="border-bottom small">{0}</p>'.format(_("Import of the rows failed")),
+				"indicator": "red", "link": get_absolute_url("Error Log", error_log.name)}], "error": True})
+		raise
+	finally:
+		cache.rpush(get_chunk_key(data_import, "results"), json.dumps(result, default=cstr))
+		if cache.incr(cache.make_key(get_chunk_key(data_import, "done"))) == chunk["count"]:
+			finish_chunked_import(data_import, chunk)
+
+def finish_chunked_import(data_import, chunk):
+	cache = frappe.cache()
+	results = [json.loads(frappe.safe_decode(r)) for r in cache.lrange(cache.make_key(get_chunk_key(data_import, "results")), 0, -1)]
+	log_message, data_rows_with_error = merge_chunk_results(results)
+
+	data_import_doc = frappe.get_doc("Data Import", data_import)
+	update_import_status(data_import_doc, log_message, data_rows_with_error, chunk["total"],
+		chunk["file_name"], chunk["file_extension"])
+
+	clear_chunk_keys(data_import)
+
+def merge_chunk_results(results):
+	"""Returns the import log and the rows with errors (with header) of all chunks"""
+	results = sorted(results, key=lambda r: r["index"])
+	header = [r["header"] for r in results if r.get("header")]
+
+	messages, error_rows = [], header[0] if header else []
+	for r in results:
+		messages.extend(r["log_message"]["messages"])
+		error_rows.extend(r["error_rows"])
+
+	return {"messages": messages, "error": any(r["log_message"]["error"] for r in results)}, error_rows
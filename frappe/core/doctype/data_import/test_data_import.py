@@ -29,6 +29,16 @@ class TestDataImport(unittest.TestCase):
 		self.assertEqual(content[13][1], "User")
 		self.assertTrue("Has Role" in content[13])
 
+	def test_export_in_pages(self):
+		exporter.export_data("User", all_doctypes=True, template=True, with_data=True)
+		content = read_csv_content(frappe.response.result)
+
+		# children are fetched per page of parents
+		data_exporter = exporter.DataExporter(doctype="User", all_doctypes=True, template=True, with_data=True)
+		data_exporter.page_length = 1
+		data_exporter.build_response()
+		self.assertEqual(read_csv_content(frappe.response.result), content)
+
 	def test_import(self):
 		if frappe.db.exists("Blog Category", "test-category"):
 			frappe.delete_doc("Blog Category", "test-category")
@@ -97,4 +107,28 @@ class TestDataImport(unittest.TestCase):
 		content = read_xlsx_file_from_attached_file(fcontent=frappe.response.filecontent)
 		content.append(["", "_test", "Private", "05-11-2017 13:51:48", "Event", "0", "0", "", "1", "", "", 0, 0, 0, 0, 0, 0, 0, "blue"])
 		importer.upload(content)
-		self.assertTrue(frappe.db.get_value("Event", {"subject": "_test"}, "name"))
\ No newline at end of file
+		self.assertTrue(frappe.db.get_value("Event", {"subject": "_test"}, "name"))
+
+	def test_split_into_chunks(self):
+		header = [[importer.get_data_keys().doctype, "Parent", "", "", "Child", "items", ""]]
+		parent_columns = importer.get_parent_columns(header)
+		self.assertEqual(parent_columns, [1, 2, 3])
+
+		data = [["", "parent 1", "a"], ["", "", "", "", "child"], ["", "parent 2", "b"], ["", "parent 3", "c"],
+			["", "", "", "", "child"], ["", "", "", "", "child"], ["", "parent 4", "d"]]
+
+		# child rows stay in the chunk of their parent
+		self.assertEqual(importer.split_into_chunks(data, 1, parent_columns), [(0, 2), (2, 3), (3, 6), (6, 7)])
+		self.assertEqual(importer.split_into_chunks(data, 3, parent_columns), [(0, 3), (3, 6), (6, 7)])
+		self.assertEqual(importer.split_into_chunks(data, 10, parent_columns), [(0, 7)])
+
+		results = [
+			{"index": 1, "header": None, "error_rows": [["", "parent 3"]],
+				"log_message": {"messages": [{"row": 4}], "error": True}},
+			{"index": 0, "header": [["header"]], "error_rows": [],
+				"log_message": {"messages": [{"row": 1}, {"row": 3}], "error": False}}
+		]
+		log_message, error_rows = importer.merge_chunk_results(results)
+		self.assertEqual([m["row"] for m in log_message["messages"]], [1, 3, 4])
+		self.assertTrue(log_message["error"])
+		self.assertEqual(error_rows, [["header"], ["", "parent 3"]])
@@ -6,6 +6,7 @@ import frappe
 from frappe.model.document import Document
 from frappe import _
 from frappe.utils import get_fullname
+from frappe.permissions import clear_permission_stamp
 
 exclude_from_linked_with = True
 
@@ -48,13 +49,21 @@ class DocShare(Document):
 		else:
 			doc.add_comment("Shared", _("{0} shared this document with {1}").format(owner, get_fullname(self.user)))
 
+	def on_update(self):
+		self.clear_permission_stamp()
+
 	def on_trash(self):
 		if not self.flags.ignore_share_permission:
 			self.check_share_permission()
 
+		self.clear_permission_stamp()
+
 		self.get_doc().add_comment("Unshared",
 			_("{0} un-shared this document with {1}").format(get_fullname(self.owner), get_fullname(self.user)))
 
+	def clear_permission_stamp(self):
+		clear_permission_stamp(None if self.everyone else self.user)
+
 def on_doctype_update():
 	"""Add index in `tabDocShare` for `(user, share_doctype)`"""
 	frappe.db.add_index("DocShare", ["user", "share_doctype"])
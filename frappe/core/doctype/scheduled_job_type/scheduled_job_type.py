@@ -9,7 +9,7 @@ from frappe.model.document import Document
 from frappe.utils import now_datetime, get_datetime
 from datetime import datetime
 from croniter import croniter
-from frappe.utils.background_jobs import enqueue, get_jobs
+from frappe.utils.background_jobs import enqueue, is_job_queued
 
 class ScheduledJobType(Document):
 	def autoname(self):
@@ -31,7 +31,7 @@ class ScheduledJobType(Document):
 			else:
 				if not self.is_job_in_queue():
 					enqueue('frappe.core.doctype.scheduled_job_type.scheduled_job_type.run_scheduled_job',
-						queue = self.get_queue_name(), job_type=self.method)
+						queue = self.get_queue_name(), job_type=self.method, deduplicate=True, job_id=self.method)
 					return True
 
 		return False
@@ -42,8 +42,7 @@ class ScheduledJobType(Document):
 		return self.get_next_execution() <= (current_time or now_datetime())
 
 	def is_job_in_queue(self):
-		queued_jobs = get_jobs(site=frappe.local.site, key='job_type')[frappe.local.site]
-		return self.method in queued_jobs
+		return is_job_queued(self.method)
 
 	def get_next_execution(self):
 		CRON_MAP = {
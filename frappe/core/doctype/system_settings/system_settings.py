@@ -10,6 +10,7 @@ from frappe.translate import set_default_language
 from frappe.utils import cint, today
 from frappe.utils.momentjs import get_all_timezones
 from frappe.twofactor import toggle_two_factor_auth
+from frappe.permissions import clear_permission_stamp
 
 class SystemSettings(Document):
 	def validate(self):
@@ -52,6 +53,9 @@ class SystemSettings(Document):
 		frappe.cache().delete_value('time_zone')
 		frappe.local.system_settings = {}
 
+		# cached permissions and query plans depend on e.g. apply_strict_user_permissions
+		clear_permission_stamp()
+
 		if frappe.flags.update_last_reset_password_date:
 			update_last_reset_password_date()
 
@@ -5,7 +5,8 @@
 from __future__ import unicode_literals
 import frappe, json
 from frappe.model.document import Document
-from frappe.permissions import (get_valid_perms, update_permission_property)
+from frappe.permissions import (get_valid_perms, update_permission_property,
+	clear_permission_stamp)
 from frappe import _
 from frappe.utils import cstr
 from frappe.core.utils import find
@@ -18,10 +19,12 @@ class UserPermission(Document):
 
 	def on_update(self):
 		frappe.cache().delete_value('user_permissions')
+		clear_permission_stamp(self.user)
 		frappe.publish_realtime('update_user_permissions')
 
 	def on_trash(self): # pylint: disable=no-self-use
 		frappe.cache().delete_value('user_permissions')
+		clear_permission_stamp(self.user)
 		frappe.publish_realtime('update_user_permissions')
 
 	def validate_user_permission(self):
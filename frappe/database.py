@@ -16,7 +16,7 @@ from frappe.utils import now, get_datetime, cstr, cast_fieldtype
 from frappe import _
 from frappe.model.utils.link_count import flush_local_link_count
 from frappe.model.utils import STANDARD_FIELD_CONVERSION_MAP
-from frappe.utils.background_jobs import execute_job, get_queue
+from frappe.utils.background_jobs import enqueue_call
 from frappe import as_unicode
 import six
 
@@ -1015,7 +1015,6 @@ class Database:
 def enqueue_jobs_after_commit():
 	if frappe.flags.enqueue_after_commit and len(frappe.flags.enqueue_after_commit) > 0:
 		for job in frappe.flags.enqueue_after_commit:
-			q = get_queue(job.get("queue"), is_async=job.get("is_async"))
-			q.enqueue_call(execute_job, timeout=job.get("timeout"),
-							kwargs=job.get("queue_args"))
+			enqueue_call(job.get("queue"), job.get("is_async"), job.get("timeout"),
+				job.get("queue_args"))
 		frappe.flags.enqueue_after_commit = []
@@ -15,8 +15,8 @@ import frappe.model.meta
 
 from frappe import _
 from time import time
-from frappe.utils import now, getdate, cast_fieldtype
-from frappe.utils.background_jobs import execute_job, get_queue
+from frappe.utils import now, getdate, cast_fieldtype, cstr
+from frappe.utils.background_jobs import enqueue_call
 from frappe.model.utils.link_count import flush_local_link_count
 from frappe.utils import cint
 
@@ -114,9 +114,7 @@ class Database(object):
 				{"name": "a%", "owner":"test@example.com"})
 
 		"""
-		if re.search(r'ifnull\(', query, flags=re.IGNORECASE):
-			# replaces ifnull in query with coalesce
-			query = re.sub(r'ifnull\(', 'coalesce(', query, flags=re.IGNORECASE)
+		query = replace_ifnull(query)
 
 		if not self._conn:
 			self.connect()
@@ -210,6 +208,77 @@ class Database(object):
 		else:
 			return self._cursor.fetchall()
 
+	def sql_iter(self, query, values=(), as_dict=0, batch_size=1000, as_batches=False,
+		update=None, debug=0):
+		"""Execute a SQL query and yield rows (or lists of rows if `as_batches` is set)
+		without loading the whole result in memory.
+
+		The query is run on an unbuffered (server-side) cursor and rows are fetched
+		`batch_size` at a time. On MariaDB, no other query can be run on the connection
+		until the iterator is exhausted or closed.
+
+		:param query: SQL query.
+		:param values: List / dict of values to be escaped and substituted in the query.
+		:param as_dict: Yield rows as dictionaries.
+		:param batch_size: Number of rows fetched from the server at a time.
+		:param as_batches: Yield lists of `batch_size` rows.
+		:param update: Update this dict to all rows (if `as_dict`).
+
+		Example:
+
+			for user in frappe.db.sql_iter("select name, email from tabUser", as_dict=True):
+				print(user.email)
+		"""
+		query = replace_ifnull(query)
+
+		if not self._conn:
+			self.connect()
+
+		if values != () and not isinstance(values, (dict, tuple, list)):
+			values = (values,)
+
+		if debug:
+			frappe.errprint(query)
+
+		cursor = self.get_unbuffered_cursor(batch_size)
+		try:
+			try:
+				if values != ():
+					cursor.execute(query, values)
+				else:
+					cursor.execute(query)
+			except Exception:
+				if frappe.conf.db_type == 'postgres':
+					self.rollback()
+				raise
+
+			keys = None
+			while True:
+				rows = cursor.fetchmany(batch_size)
+				if not rows:
+					break
+
+				if as_dict:
+					# description of postgres named cursors is only set after the first fetch
+					keys = keys or [column[0] for column in cursor.description]
+					rows = [frappe._dict(zip(keys, row)) for row in rows]
+					if update:
+						for row in rows:
+							row.update(update)
+
+				if as_batches:
+					yield rows
+				else:
+					for row in rows:
+						yield row
+		finally:
+			cursor.close()
+
+	def get_unbuffered_cursor(self, batch_size=1000):
+		"""Returns a cursor that fetches rows from the server as they are read. Backends
+		override this, the default is a regular cursor, which loads all rows on execute."""
+		return self._conn.cursor()
+
 	def explain_query(self, query, values=None):
 		"""Print `EXPLAIN` in error log."""
 		try:
@@ -790,6 +859,26 @@ class Database(object):
 			except Exception:
 				return None
 
+	def get_existing_names(self, dt, names, chunk_size=1000):
+		"""Returns the set of `names` that exist as documents of `dt`, checked with one query
+		per `chunk_size` names instead of one `exists` per name.
+
+		:param dt: DocType name.
+		:param names: List of document names."""
+		names = list(names)
+		found = set()
+		for i in range(0, len(names), chunk_size):
+			chunk = names[i:i + chunk_size]
+			found.update(self.sql_list("select name from `tab{0}` where name in ({1})".format(dt,
+				", ".join(["%s"] * len(chunk))), chunk))
+
+		if self.db_type != 'postgres':
+			# MySQL is case insensitive (and ignores trailing spaces)
+			found = set(cstr(name).lower().rstrip() for name in found)
+			return set(name for name in names if cstr(name).lower().rstrip() in found)
+
+		return set(name for name in names if name in found)
+
 	def count(self, dt, filters=None, debug=False, cache=False):
 		"""Returns `COUNT(*)` for given DocType and filters."""
 		if cache and not filters:
@@ -926,6 +1015,70 @@ class Database(object):
 		else:
 			frappe.throw('No conditions provided')
 
+	def bulk_insert(self, doctype, fields, values, ignore_duplicates=False, chunk_size=10000):
+		"""Insert multiple rows with one multi-row `INSERT` per chunk.
+
+		:param doctype: DocType name.
+		:param fields: List of column names.
+		:param values: Iterable of rows (list / tuple of values in the order of `fields`).
+		:param ignore_duplicates: Silently skip rows that violate a primary / unique key.
+		:param chunk_size: Maximum number of rows sent in one query."""
+		columns = ", ".join(["`"+field+"`" for field in fields])
+		row_placeholder = "({0})".format(", ".join(["%s"] * len(fields)))
+
+		prefix, suffix = "", ""
+		if ignore_duplicates:
+			if self.db_type == 'postgres':
+				suffix = " ON CONFLICT DO NOTHING"
+			else:
+				prefix = " IGNORE"
+
+		def _insert(rows):
+			self.sql("""INSERT{prefix} INTO `tab{doctype}` ({columns}) VALUES {values}{suffix}""".format(
+				prefix=prefix,
+				doctype=doctype,
+				columns=columns,
+				values=", ".join([row_placeholder] * len(rows)),
+				suffix=suffix
+			), [value for row in rows for value in row])
+
+		rows = []
+		for row in values:
+			rows.append(tuple(row))
+			if len(rows) >= chunk_size:
+				_insert(rows)
+				rows = []
+
+		if rows:
+			_insert(rows)
+
+	def bulk_update(self, doctype, fields, values, chunk_size=100):
+		"""Update multiple rows (by `name`) with one `UPDATE ... CASE` query per chunk.
+
+		:param doctype: DocType name.
+		:param fields: List of column names to be updated (without `name`).
+		:param values: Dict of `name` -> row (list / tuple of values in the order of `fields`).
+		:param chunk_size: Maximum number of rows updated in one query."""
+		names = list(values)
+		for i in range(0, len(names), chunk_size):
+			chunk = names[i:i + chunk_size]
+			query_values = []
+			assignments = []
+			for idx, field in enumerate(fields):
+				cases = []
+				for name in chunk:
+					cases.append("when %s then %s")
+					query_values.extend([name, values[name][idx]])
+				assignments.append("`{0}` = case `name` {1} end".format(field, " ".join(cases)))
+
+			query_values.extend(chunk)
+			self.sql("""update `tab{doctype}` set {assignments}
+				where `name` in ({names})""".format(
+					doctype=doctype,
+					assignments=", ".join(assignments),
+					names=", ".join(["%s"] * len(chunk))
+				), query_values)
+
 	def log_touched_tables(self, query, values=None):
 		if values:
 			query = frappe.safe_decode(self._cursor.mogrify(query, values))
@@ -955,12 +1108,17 @@ class Database(object):
 			frappe.flags.touched_tables.update(tables)
 
 
+def replace_ifnull(query):
+	"""Replaces ifnull in query with coalesce"""
+	if re.search(r'ifnull\(', query, flags=re.IGNORECASE):
+		query = re.sub(r'ifnull\(', 'coalesce(', query, flags=re.IGNORECASE)
+	return query
+
 def enqueue_jobs_after_commit():
 	if frappe.flags.enqueue_after_commit and len(frappe.flags.enqueue_after_commit) > 0:
 		for job in frappe.flags.enqueue_after_commit:
-			q = get_queue(job.get("queue"), is_async=job.get("is_async"))
-			q.enqueue_call(execute_job, timeout=job.get("timeout"),
-							kwargs=job.get("queue_args"))
+			enqueue_call(job.get("queue"), job.get("is_async"), job.get("timeout"),
+				job.get("queue_args"))
 		frappe.flags.enqueue_after_commit = []
 
 # Helpers
@@ -4,6 +4,7 @@ import frappe
 import warnings
 
 import pymysql
+import pymysql.cursors
 from pymysql.times import TimeDelta
 from pymysql.constants 	import ER, FIELD_TYPE
 from pymysql.converters import conversions
@@ -97,6 +98,9 @@ class MariaDBDatabase(Database):
 
 		return conn
 
+	def get_unbuffered_cursor(self, batch_size=1000):
+		return self._conn.cursor(pymysql.cursors.SSCursor)
+
 	def get_database_size(self):
 		''''Returns database size in MB'''
 		db_size = self.sql('''
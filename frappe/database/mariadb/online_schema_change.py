@@ -0,0 +1,171 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""
+Online schema change for large MariaDB tables.
+
+Opt-in, in site config:
+
+	"online_schema_change": 1,
+	"online_schema_change_min_rows": 100000
+
+`MariaDBTable.alter` then alters tables with at least `online_schema_change_min_rows`
+(estimated) rows without blocking writes:
+
+1. `ALTER TABLE ... ALGORITHM=INPLACE, LOCK=NONE`, if the engine can do the change in place.
+2. Otherwise the table is copied to an altered shadow table `_[table]_new` in chunks
+   of primary keys. Triggers on the table apply the writes made while copying to the
+   shadow table. Then the two tables are swapped with an atomic `RENAME TABLE`.
+"""
+
+from __future__ import unicode_literals, print_function
+
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import cint, update_progress_bar
+
+# ER_ALTER_OPERATION_NOT_SUPPORTED, ER_ALTER_OPERATION_NOT_SUPPORTED_REASON
+INPLACE_NOT_SUPPORTED = (1845, 1846)
+
+DEFAULT_MIN_ROWS = 100000
+CHUNK_SIZE = 5000
+
+def is_enabled(table_name):
+	conf = frappe.local.conf
+	if not cint(conf.get('online_schema_change')):
+		return False
+
+	min_rows = cint(conf.get('online_schema_change_min_rows') or DEFAULT_MIN_ROWS)
+	return get_estimated_rows(table_name) >= min_rows
+
+def get_estimated_rows(table_name):
+	rows = frappe.db.sql("""select table_rows from information_schema.tables
+		where table_schema=database() and table_name=%s""", table_name)
+	return cint(rows[0][0]) if rows else 0
+
+def alter_table(table_name, query_parts, unique_columns=()):
+	"""Apply the `ALTER TABLE` clauses in `query_parts` without locking the table for writes
+
+	:param unique_columns: Columns that are made unique by the clauses."""
+	query = "ALTER TABLE `{0}` {1}".format(table_name, ", ".join(query_parts))
+	try:
+		frappe.db.sql_ddl(query + ", ALGORITHM=INPLACE, LOCK=NONE")
+		return
+	except Exception as e:
+		if e.args[0] not in INPLACE_NOT_SUPPORTED:
+			raise
+
+	copy_table(table_name, query_parts, unique_columns)
+
+def copy_table(table_name, query_parts, unique_columns=()):
+	"""Alter a copy of the table and swap it with the table"""
+	for column in unique_columns:
+		# the copy would silently drop the duplicates, fail like `ALTER TABLE`
+		if frappe.db.sql("""select `{0}` from `{1}` where `{0}` is not null
+			group by `{0}` having count(*) > 1 limit 1""".format(column, table_name)):
+			frappe.throw(_("{0} field cannot be set as unique in {1}, as there are non-unique existing values").format(
+				column, table_name))
+
+	new_table, old_table = '_{0}_new'.format(table_name), '_{0}_old'.format(table_name)
+	triggers = get_trigger_names(table_name)
+
+	# left over by an interrupted change
+	drop_shadow_table(table_name)
+	frappe.db.sql_ddl("DROP TABLE IF EXISTS `{0}`".format(old_table))
+
+	frappe.db.sql_ddl("CREATE TABLE `{0}` LIKE `{1}`".format(new_table, table_name))
+
+	try:
+		frappe.db.sql_ddl("ALTER TABLE `{0}` {1}".format(new_table, ", ".join(query_parts)))
+		columns = get_common_columns(table_name, new_table)
+
+		create_triggers(table_name, new_table, columns)
+		copy_rows(table_name, new_table, columns)
+
+		# atomic, writes wait for the rename and go to the altered table
+		frappe.db.sql_ddl("RENAME TABLE `{0}` TO `{1}`, `{2}` TO `{0}`".format(table_name, old_table, new_table))
+	except Exception:
+		drop_triggers(triggers)
+		drop_shadow_table(table_name)
+		raise
+
+	# the triggers moved with the old table
+	drop_triggers(triggers)
+	frappe.db.sql_ddl("DROP TABLE `{0}`".format(old_table))
+
+def get_trigger_names(table_name):
+	# trigger names are limited to 64 characters, like table names
+	table_hash = hashlib.md5(table_name.encode('utf-8')).hexdigest()[:16]
+	return dict((event, 'osc_{0}_{1}'.format(table_hash, event))
+		for event in ('insert', 'update', 'delete'))
+
+def create_triggers(table_name, new_table, columns):
+	"""Apply the writes made to the table while it is copied to the new table"""
+	triggers = get_trigger_names(table_name)
+	column_list = ", ".join("`{0}`".format(c) for c in columns)
+	new_values = ", ".join("NEW.`{0}`".format(c) for c in columns)
+
+	# upsert on the primary key, unlike REPLACE this does not delete the row (and with it,
+	# rows of other unique keys that the new values collide with)
+	upsert = """INSERT INTO `{new_table}` ({columns}) VALUES ({values})
+		ON DUPLICATE KEY UPDATE {updates}""".format(new_table=new_table, columns=column_list,
+			values=new_values, updates=", ".join("`{0}`=VALUES(`{0}`)".format(c) for c in columns))
+
+	frappe.db.sql_ddl("""CREATE TRIGGER `{trigger}` AFTER INSERT ON `{table}` FOR EACH ROW
+		{upsert}""".format(trigger=triggers['insert'], table=table_name, upsert=upsert))
+
+	# the name can change (rename_doc)
+	frappe.db.sql_ddl("""CREATE TRIGGER `{trigger}` AFTER UPDATE ON `{table}` FOR EACH ROW BEGIN
+		DELETE FROM `{new_table}` WHERE `name` = OLD.`name` AND OLD.`name` <> NEW.`name`;
+		{upsert};
+		END""".format(trigger=triggers['update'], table=table_name, new_table=new_table,
+			upsert=upsert))
+
+	frappe.db.sql_ddl("""CREATE TRIGGER `{trigger}` AFTER DELETE ON `{table}` FOR EACH ROW
+		DELETE FROM `{new_table}` WHERE `name` = OLD.`name`""".format(trigger=triggers['delete'],
+			table=table_name, new_table=new_table))
+
+def drop_triggers(triggers):
+	for trigger in triggers.values():
+		frappe.db.sql_ddl("DROP TRIGGER IF EXISTS `{0}`".format(trigger))
+
+def drop_shadow_table(table_name):
+	frappe.db.sql_ddl("DROP TABLE IF EXISTS `_{0}_new`".format(table_name))
+
+def get_common_columns(table_name, new_table):
+	columns = {}
+	for table, column in frappe.db.sql("""select table_name, column_name from information_schema.columns
+		where table_schema=database() and table_name in (%s, %s)
+		order by ordinal_position""", (table_name, new_table)):
+		columns.setdefault(table, []).append(column)
+
+	new_columns = set(columns.get(new_table) or [])
+	return [c for c in columns.get(table_name) or [] if c in new_columns]
+
+def copy_rows(table_name, new_table, columns):
+	"""Copy the rows in chunks of `CHUNK_SIZE` names, each in its own transaction"""
+	column_list = ", ".join("`{0}`".format(c) for c in columns)
+	total = max(get_estimated_rows(table_name), 1)
+	copied, last_name = 0, ''
+
+	while True:
+		names = frappe.db.sql_list("""select name from `{0}` where name > %s
+			order by name limit {1}""".format(table_name, CHUNK_SIZE), last_name)
+		if not names:
+			break
+
+		# rows written by the triggers in the meantime are newer, and kept. Unlike
+		# INSERT IGNORE, errors other than the duplicate name (e.g. truncated values) fail
+		frappe.db.sql("""INSERT INTO `{new_table}` ({columns})
+			SELECT {columns} FROM `{table}` WHERE name > %s AND name <= %s
+			LOCK IN SHARE MODE
+			ON DUPLICATE KEY UPDATE `name`=`{new_table}`.`name`""".format(new_table=new_table,
+				columns=column_list, table=table_name), (last_name, names[-1]))
+		frappe.db.commit()
+
+		copied += len(names)
+		last_name = names[-1]
+		update_progress_bar("Copying {0}".format(table_name), min(copied, total) - 1, total)
+
+	print()
@@ -2,7 +2,9 @@ from __future__ import unicode_literals
 
 import frappe
 from frappe import _
+from frappe.utils import cint
 from frappe.database.schema import DBTable
+from frappe.database.mariadb import online_schema_change
 
 class MariaDBTable(DBTable):
 	def create(self):
@@ -53,21 +55,28 @@ class MariaDBTable(DBTable):
 		for col in columns_to_modify:
 			modify_column_query.append("MODIFY `{}` {}".format(col.fieldname, col.get_definition()))
 
+		indexes = self.get_indexes()
+
 		for col in self.add_index:
 			# if index key not exists
-			if not frappe.db.sql("SHOW INDEX FROM `%s` WHERE key_name = %s" %
-					(self.table_name, '%s'), col.fieldname):
+			if col.fieldname not in indexes:
 				add_index_query.append("ADD INDEX `{}`(`{}`)".format(col.fieldname, col.fieldname))
 
 		for col in self.drop_index:
 			if col.fieldname != 'name': # primary key
 				# if index key exists
-				if frappe.db.sql("""SHOW INDEX FROM `{0}`
-					WHERE key_name=%s
-					AND Non_unique=%s""".format(self.table_name), (col.fieldname, col.unique)):
+				if col.fieldname in indexes and indexes[col.fieldname] == cint(col.unique):
 					drop_index_query.append("drop index `{}`".format(col.fieldname))
 
+		all_query_parts = add_column_query + modify_column_query + add_index_query + drop_index_query
+
 		try:
+			if all_query_parts and online_schema_change.is_enabled(self.table_name):
+				# in one statement, so that a large table is copied at most once
+				online_schema_change.alter_table(self.table_name, all_query_parts,
+					unique_columns=[col.fieldname for col in self.add_unique])
+				return
+
 			for query_parts in [add_column_query, modify_column_query, add_index_query, drop_index_query]:
 				if query_parts:
 					query_body = ", ".join(query_parts)
@@ -84,3 +93,8 @@ class MariaDBTable(DBTable):
 					fieldname, self.table_name)))
 			else:
 				raise e
+
+	def get_indexes(self):
+		"""Returns {index name: non unique} of the table, with one query"""
+		return dict(frappe.db.sql("""select index_name, non_unique from information_schema.statistics
+			where table_schema=database() and table_name=%s""", self.table_name))
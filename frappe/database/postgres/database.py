@@ -4,7 +4,7 @@ import re
 import frappe
 import psycopg2
 import psycopg2.extensions
-from six import string_types
+from six import string_types, iteritems
 from frappe.utils import cstr
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
@@ -102,6 +102,15 @@ class PostgresDatabase(Database):
 
 		return super(PostgresDatabase, self).sql(*args, **kwargs)
 
+	def sql_iter(self, query, *args, **kwargs):
+		return super(PostgresDatabase, self).sql_iter(modify_query(query), *args, **kwargs)
+
+	def get_unbuffered_cursor(self, batch_size=1000):
+		# named cursors are server side, withhold as the connection is in autocommit mode
+		cursor = self._conn.cursor(name='frappe_sql_iter_' + frappe.generate_hash(length=10), withhold=True)
+		cursor.itersize = batch_size
+		return cursor
+
 	def get_tables(self):
 		return [d[0] for d in self.sql("""select table_name
 			from information_schema.tables
@@ -237,6 +246,15 @@ class PostgresDatabase(Database):
 			key=key
 		)
 
+	def bulk_update(self, doctype, fields, values, chunk_size=100):
+		# string literals in a CASE resolve to text, which postgres won't assign
+		# to date / numeric columns, so update row by row
+		for name, row in iteritems(values):
+			self.sql("""update `tab{doctype}` set {assignments} where `name`=%s""".format(
+				doctype=doctype,
+				assignments=", ".join(["`{0}`=%s".format(field) for field in fields])
+			), list(row) + [name])
+
 	def check_transaction_status(self, query):
 		pass
 
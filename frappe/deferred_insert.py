@@ -1,44 +1,182 @@
 import json
 import frappe
 
-from frappe.utils import cstr
+from frappe.utils import cint, now
 
 queue_prefix = 'insert_queue_for_'
 
+# set of doctypes that have a queue, so queues are found without scanning keys
+queue_index = 'deferred_insert_queues'
+
+# set once the queues written before the index existed are added to it
+queue_index_seeded = 'deferred_insert_queues_seeded'
+
+# records that could not be inserted, with the error
+dead_letter_queue = 'deferred_insert_failed'
+dead_letter_queue_length = 1000
+
+# simple log doctypes, inserted with multi-row INSERTs
+bulk_insert_doctypes = ('View Log', 'Route History', 'Access Log')
+
+# queue entries read from a queue at a time
+batch_size = 500
+
+# queue entries inserted per run (can be set as `deferred_insert_budget` in site config)
+default_budget = 5000
+
 @frappe.whitelist()
 def deferred_insert(doctype, records):
 	frappe.cache().rpush(queue_prefix + doctype, records)
+	frappe.cache().sadd(queue_index, doctype)
 
 def save_to_db():
-	queue_keys = frappe.cache().get_keys(queue_prefix)
-	for key in queue_keys:
-		record_count = 0
-		queue_key = get_key_name(key)
-		doctype = get_doctype_name(key)
-		while frappe.cache().llen(queue_key) > 0 and record_count <= 500:
-			records = frappe.cache().lpop(queue_key)
-			records = json.loads(records.decode('utf-8'))
-			if isinstance(records, dict):
-				record_count += 1
-				insert_record(records, doctype)
+	"""Insert the queued records. Queues are read in batches, one batch per doctype in
+	turn, so a busy doctype does not hold up the others. The next run starts after the
+	doctype that was read last."""
+	budget = cint(frappe.local.conf.get('deferred_insert_budget')) or default_budget
+	doctypes = get_queued_doctypes()
+
+	last_doctype = None
+	while doctypes and budget > 0:
+		for doctype in list(doctypes):
+			entries = pop_entries(doctype, min(batch_size, budget))
+			if not entries:
+				doctypes.remove(doctype)
 				continue
-			for record in records:
-				record_count += 1
-				insert_record(record, doctype)
 
-	frappe.db.commit()
+			budget -= len(entries)
+			last_doctype = doctype
+			insert_records(doctype, get_records(doctype, entries))
+
+			if budget <= 0:
+				break
+
+	if last_doctype:
+		frappe.cache().set_value('deferred_insert_last_doctype', last_doctype)
+
+def get_queued_doctypes():
+	"""Doctypes with a queue, starting after the doctype read last in the previous run"""
+	doctypes = sorted(frappe.safe_decode(d) for d in frappe.cache().smembers(queue_index))
+	if not doctypes and not frappe.cache().get_value(queue_index_seeded):
+		doctypes = sorted(seed_queue_index())
+	last_doctype = frappe.cache().get_value('deferred_insert_last_doctype')
+
+	if last_doctype in doctypes:
+		i = doctypes.index(last_doctype) + 1
+		doctypes = doctypes[i:] + doctypes[:i]
+
+	return doctypes
+
+def seed_queue_index():
+	"""Add the queues that were written without the index (before an update) to it, once"""
+	cache = frappe.cache()
+	doctypes = set()
+	for key in cache.get_keys(queue_prefix):
+		# [db_name]|insert_queue_for_[doctype]
+		doctypes.add(frappe.safe_decode(key).split('|', 1)[1][len(queue_prefix):])
+
+	if doctypes:
+		cache.sadd(queue_index, *doctypes)
+	cache.set_value(queue_index_seeded, 1)
+
+	return doctypes
+
+def pop_entries(doctype, count):
+	"""Remove and return up to `count` entries from the head of the queue"""
+	cache = frappe.cache()
+	key = cache.make_key(queue_prefix + doctype)
+
+	# LRANGE + LTRIM in a transaction, so that concurrent runs do not read the same entries
+	pipeline = cache.pipeline()
+	pipeline.lrange(key, 0, count - 1)
+	pipeline.ltrim(key, count, -1)
+	return pipeline.execute()[0]
+
+def get_records(doctype, entries):
+	"""Records of the queue entries, an entry is a record or a list of records"""
+	records = []
+	for entry in entries:
+		try:
+			entry = json.loads(frappe.safe_decode(entry))
+		except ValueError:
+			add_to_dead_letter_queue(doctype, frappe.safe_decode(entry), 'Invalid JSON')
+			continue
+
+		for record in (entry if isinstance(entry, list) else [entry]):
+			if isinstance(record, dict):
+				records.append(record)
+			else:
+				add_to_dead_letter_queue(doctype, record, 'Not a record')
+
+	return records
+
+def insert_records(doctype, records):
+	if doctype in bulk_insert_doctypes:
+		bulk_records = [r for r in records if r.get('doctype', doctype) == doctype]
+		records = [r for r in records if r.get('doctype', doctype) != doctype]
+
+		try:
+			frappe.bulk_insert([dict(r, doctype=doctype) for r in bulk_records])
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+
+			# find the records that fail
+			records = bulk_records + records
+
+	for record in records:
+		insert_record(record, doctype)
 
 def insert_record(record, doctype):
-	if not record.get('doctype'):
-		record['doctype'] = doctype
 	try:
+		if not record.get('doctype'):
+			record['doctype'] = doctype
 		doc = frappe.get_doc(record)
 		doc.insert()
-	except Exception as e:
-		print(e, doctype)
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		add_to_dead_letter_queue(doctype, record, frappe.get_traceback())
+
+def add_to_dead_letter_queue(doctype, record, error):
+	"""Keep the failed record with its error. Only the latest `dead_letter_queue_length`
+	records are kept."""
+	cache = frappe.cache()
+	key = cache.make_key(dead_letter_queue)
+
+	pipeline = cache.pipeline(transaction=False)
+	pipeline.rpush(key, json.dumps({
+		'doctype': doctype,
+		'record': record,
+		'error': error,
+		'failed_on': now()
+	}, default=str))
+	pipeline.ltrim(key, -dead_letter_queue_length, -1)
+	pipeline.execute()
+
+def get_failed_records():
+	"""Returns the records in the dead letter queue"""
+	cache = frappe.cache()
+	return [json.loads(frappe.safe_decode(d))
+		for d in cache.lrange(cache.make_key(dead_letter_queue), 0, -1)]
+
+def requeue_failed_records():
+	"""Move the records in the dead letter queue back to their queues, to be inserted in
+	the next run. Run via:
+
+		bench --site [site] execute frappe.deferred_insert.requeue_failed_records
+	"""
+	cache = frappe.cache()
+	key = cache.make_key(dead_letter_queue)
+
+	pipeline = cache.pipeline()
+	pipeline.lrange(key, 0, -1)
+	pipeline.delete(key)
+	entries = pipeline.execute()[0]
 
-def get_key_name(key):
-	return cstr(key).split('|')[1]
+	for entry in entries:
+		entry = json.loads(frappe.safe_decode(entry))
+		if isinstance(entry['record'], dict):
+			deferred_insert(entry['doctype'], json.dumps(entry['record'], default=str))
 
-def get_doctype_name(key):
-	return cstr(key).split(queue_prefix)[1]
+	return len(entries)
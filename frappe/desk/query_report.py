@@ -12,7 +12,7 @@ from frappe.utils import flt, cint, get_html_format, cstr, get_url_to_form
 from frappe.model.utils import render_include
 from frappe.translate import send_translations
 import frappe.desk.reportview
-from frappe.permissions import get_role_permissions
+from frappe.permissions import get_role_permissions, get_permission_bundle
 from six import string_types, iteritems
 from datetime import timedelta
 from frappe.utils import gzip_decompress
@@ -96,8 +96,11 @@ def generate_report_result(report, filters=None, user=None):
 				columns = json.loads(report.custom_columns)
 				result = add_data_to_custom_columns(columns, result)
 
+	filter_time = 0
 	if result:
+		start_time = datetime.datetime.now()
 		result = get_filtered_data(report.ref_doctype, columns, result, user)
+		filter_time = (datetime.datetime.now() - start_time).total_seconds()
 
 	if cint(report.add_total_row) and result:
 		result = add_total_row(result, columns)
@@ -109,7 +112,8 @@ def generate_report_result(report, filters=None, user=None):
 		"chart": chart,
 		"data_to_be_printed": data_to_be_printed,
 		"status": status,
-		"execution_time": frappe.cache().hget('report_execution_time', report.name) or 0
+		"execution_time": frappe.cache().hget('report_execution_time', report.name) or 0,
+		"filter_time": round(filter_time, 3)
 	}
 
 @frappe.whitelist()
@@ -313,26 +317,29 @@ def export_query():
 		data = frappe._dict(data)
 		columns = get_columns_dict(data.columns)
 
-		from frappe.utils.xlsxutils import make_xlsx
-		xlsx_data = build_xlsx_data(columns, data, visible_idx)
-		xlsx_file = make_xlsx(xlsx_data, "Query Report")
+		from frappe.utils.xlsxutils import make_xlsx_file
+		xlsx_data = iter_xlsx_data(columns, data, visible_idx)
 
 		frappe.response['filename'] = report_name + '.xlsx'
-		frappe.response['filecontent'] = xlsx_file.getvalue()
-		frappe.response['type'] = 'binary'
+		frappe.response['filepath'] = make_xlsx_file(xlsx_data, "Query Report")
+		frappe.response['type'] = 'file'
 
 
 def build_xlsx_data(columns, data, visible_idx):
-	result = [[]]
+	return list(iter_xlsx_data(columns, data, visible_idx))
 
+def iter_xlsx_data(columns, data, visible_idx):
+	"""Yields the heading and the visible rows of the report, to be written to the xlsx file
+	without building another copy of the result"""
 	# add column headings
-	for idx in range(len(data.columns)):
-		result[0].append(columns[idx]["label"])
+	yield [columns[idx]["label"] for idx in range(len(data.columns))]
+
+	visible_idx = set(visible_idx) if visible_idx is not None else None
 
 	# build table from result
 	for i, row in enumerate(data.result):
 		# only pick up rows that are visible in the report
-		if i in visible_idx:
+		if visible_idx is None or i in visible_idx:
 			row_data = []
 
 			if isinstance(row, dict) and row:
@@ -344,9 +351,7 @@ def build_xlsx_data(columns, data, visible_idx):
 			else:
 				row_data = row
 
-			result.append(row_data)
-
-	return result
+			yield row_data
 
 
 def get_report_module_dotted_path(module, report_name):
@@ -463,19 +468,28 @@ def get_filtered_data(ref_doctype, columns, data, user):
 	result = []
 	linked_doctypes = get_linked_doctypes(columns, data)
 	match_filters_per_doctype = get_user_match_filters(linked_doctypes, user=user)
-	shared = frappe.share.get_shared(ref_doctype, user)
+	shared = get_permission_bundle(ref_doctype, user).shared["read"]
 	columns_dict = get_columns_dict(columns)
 
 	role_permissions = get_role_permissions(frappe.get_meta(ref_doctype), user)
 	if_owner = role_permissions.get("if_owner", {}).get("report")
 
 	if match_filters_per_doctype:
+		# membership checks on sets
+		for filter_list in match_filters_per_doctype.values():
+			for match_filters in filter_list:
+				for dt in match_filters:
+					match_filters[dt] = set(match_filters[dt])
+
+		existing_values = get_existing_link_values(data, linked_doctypes, match_filters_per_doctype)
+
 		for row in data:
 			# Why linked_doctypes.get(ref_doctype)? because if column is empty, linked_doctypes[ref_doctype] is removed
 			if linked_doctypes.get(ref_doctype) and shared and row[linked_doctypes[ref_doctype]] in shared:
 				result.append(row)
 
-			elif has_match(row, linked_doctypes, match_filters_per_doctype, ref_doctype, if_owner, columns_dict, user):
+			elif has_match(row, linked_doctypes, match_filters_per_doctype, ref_doctype, if_owner, columns_dict,
+				user, existing_values):
 				result.append(row)
 	else:
 		result = list(data)
@@ -483,13 +497,64 @@ def get_filtered_data(ref_doctype, columns, data, user):
 	return result
 
 
-def has_match(row, linked_doctypes, doctype_match_filters, ref_doctype, if_owner, columns_dict, user):
+def get_existing_link_values(data, linked_doctypes, doctype_match_filters):
+	"""Returns {doctype: set of values of the doctype's column that exist as documents}
+	for values that are not allowed by any of the match filters, checked with one
+	query per 1000 values instead of one `frappe.db.exists` per row"""
+	allowed_values = {}
+	for filter_list in doctype_match_filters.values():
+		for match_filters in filter_list:
+			for dt, values in match_filters.items():
+				allowed_values.setdefault(dt, set()).update(values)
+
+	existing_values = {}
+	for dt, idx in linked_doctypes.items():
+		if dt not in allowed_values:
+			continue
+
+		values = set()
+		for row in data:
+			cell_value = None
+			if isinstance(row, dict):
+				cell_value = row.get(idx)
+			elif isinstance(row, list):
+				cell_value = row[idx]
+
+			# not a link (e.g. a list or dict), can't be a name
+			if is_hashable(cell_value):
+				values.add(cell_value)
+		values -= allowed_values[dt]
+
+		existing = existing_values[dt] = set()
+		names = []
+		for value in values:
+			if value and isinstance(value, string_types) and value != dt:
+				names.append(value)
+			elif frappe.db.exists(dt, value):
+				existing.add(value)
+
+		existing.update(frappe.db.get_existing_names(dt, names))
+
+	return existing_values
+
+def is_hashable(value):
+	try:
+		hash(value)
+	except TypeError:
+		return False
+	return True
+
+def has_match(row, linked_doctypes, doctype_match_filters, ref_doctype, if_owner, columns_dict, user,
+	existing_values=None):
 	"""Returns True if after evaluating permissions for each linked doctype
 		- There is an owner match for the ref_doctype
 		- `and` There is a user permission match for all linked doctypes
 
 		Returns True if the row is empty
 
+		`existing_values` (see `get_existing_link_values`) is used instead of checking
+		if each linked value exists.
+
 		Note:
 		Each doctype could have multiple conflicting user permission doctypes.
 		Hence even if one of the sets allows a match, it is true.
@@ -526,9 +591,12 @@ def has_match(row, linked_doctypes, doctype_match_filters, ref_doctype, if_owner
 					elif isinstance(row, list):
 						cell_value = row[idx]
 
-					if dt in match_filters and cell_value not in match_filters.get(dt) and frappe.db.exists(dt, cell_value):
-						match = False
-						break
+					if dt in match_filters and is_hashable(cell_value) \
+						and cell_value not in match_filters.get(dt):
+						if (cell_value in existing_values[dt] if existing_values is not None
+							else frappe.db.exists(dt, cell_value)):
+							match = False
+							break
 
 				# each doctype could have multiple conflicting user permission doctypes, hence using OR
 				# so that even if one of the sets allows a match, it is true
@@ -136,15 +136,20 @@ def export_query():
 		form_params["filters"] = {"name": ("in", si)}
 		del form_params["selected_items"]
 
+	# rows are read with an unbuffered cursor, unless all rows are needed for the totals
 	db_query = DatabaseQuery(doctype)
-	ret = db_query.execute(**form_params)
+	ret = db_query.execute(as_iterator=not add_totals_row, **form_params)
 
 	if add_totals_row:
 		ret = append_totals_row(ret)
 
-	data = [['Sr'] + get_labels(db_query.fields, doctype)]
-	for i, row in enumerate(ret):
-		data.append([i+1] + list(row))
+	def get_data():
+		yield ['Sr'] + labels
+		for i, row in enumerate(ret):
+			yield [i+1] + list(row)
+
+	labels = get_labels(db_query.fields, doctype)
+	data = get_data()
 
 	if file_format_type == "CSV":
 
@@ -166,12 +171,11 @@ def export_query():
 
 	elif file_format_type == "Excel":
 
-		from frappe.utils.xlsxutils import make_xlsx
-		xlsx_file = make_xlsx(data, doctype)
+		from frappe.utils.xlsxutils import make_xlsx_file
 
 		frappe.response['filename'] = doctype + '.xlsx'
-		frappe.response['filecontent'] = xlsx_file.getvalue()
-		frappe.response['type'] = 'binary'
+		frappe.response['filepath'] = make_xlsx_file(data, doctype)
+		frappe.response['type'] = 'file'
 
 
 def append_totals_row(data):
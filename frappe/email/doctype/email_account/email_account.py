@@ -19,7 +19,7 @@ from dateutil.relativedelta import relativedelta
 from datetime import datetime, timedelta
 from frappe.desk.form import assign_to
 from frappe.utils.user import get_system_managers
-from frappe.utils.background_jobs import enqueue, get_jobs
+from frappe.utils.background_jobs import enqueue
 from frappe.core.doctype.communication.email import set_incoming_outgoing_accounts
 from frappe.utils.scheduler import log
 from frappe.utils.html_utils import clean_email_html
@@ -694,7 +694,6 @@ def pull(now=False):
 			frappe.cache().set_value("workers:no-internet", False)
 		else:
 			return
-	queued_jobs = get_jobs(site=frappe.local.site, key='job_name')[frappe.local.site]
 	for email_account in frappe.get_list("Email Account",
 		filters={"enable_incoming": 1, "awaiting_password": 0}):
 		if now:
@@ -703,10 +702,8 @@ def pull(now=False):
 		else:
 			# job_name is used to prevent duplicates in queue
 			job_name = 'pull_from_email_account|{0}'.format(email_account.name)
-
-			if job_name not in queued_jobs:
-				enqueue(pull_from_email_account, 'short', event='all', job_name=job_name,
-					email_account=email_account.name)
+			enqueue(pull_from_email_account, 'short', event='all', job_name=job_name,
+				deduplicate=True, email_account=email_account.name)
 
 def pull_from_email_account(email_account):
 	'''Runs within a worker process'''
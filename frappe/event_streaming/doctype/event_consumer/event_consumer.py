@@ -9,7 +9,6 @@ import requests
 from frappe.model.document import Document
 from frappe.frappeclient import FrappeClient
 from frappe.utils.data import get_url
-from frappe.utils.background_jobs import get_jobs
 
 
 class EventConsumer(Document):
@@ -141,6 +140,5 @@ def notify(consumer):
 	# enqueue another job if the site was not notified
 	if not consumer.flags.notified:
 		enqueued_method = 'frappe.event_streaming.doctype.event_consumer.event_consumer.notify'
-		jobs = get_jobs()
-		if not jobs or enqueued_method not in jobs[frappe.local.site] and not consumer.flags.notifed:
-			frappe.enqueue(enqueued_method, queue='long', enqueue_after_commit=True, **{'consumer': consumer})
+		frappe.enqueue(enqueued_method, queue='long', enqueue_after_commit=True, deduplicate=True,
+			**{'consumer': consumer})
@@ -11,7 +11,6 @@ from six import iteritems
 from frappe import _
 from frappe.model.document import Document
 from frappe.frappeclient import FrappeClient
-from frappe.utils.background_jobs import get_jobs
 from frappe.utils.data import get_url
 from frappe.custom.doctype.custom_field.custom_field import create_custom_field
 from frappe.integrations.oauth2 import validate_url
@@ -466,9 +465,7 @@ def get_mapped_update(update, producer_site):
 def new_event_notification(producer_url):
 	"""Pull data from producer when notified"""
 	enqueued_method = 'frappe.event_streaming.doctype.event_producer.event_producer.pull_from_node'
-	jobs = get_jobs()
-	if not jobs or enqueued_method not in jobs[frappe.local.site]:
-		frappe.enqueue(enqueued_method, queue='default', **{'event_producer': producer_url})
+	frappe.enqueue(enqueued_method, queue='default', deduplicate=True, **{'event_producer': producer_url})
 
 
 @frappe.whitelist()
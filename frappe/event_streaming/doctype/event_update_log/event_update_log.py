@@ -5,7 +5,6 @@
 from __future__ import unicode_literals
 import frappe
 from frappe.model.document import Document
-from frappe.utils.background_jobs import get_jobs
 from frappe.model import no_value_fields, table_fields
 
 class EventUpdateLog(Document):
@@ -13,10 +12,8 @@ class EventUpdateLog(Document):
 		"""Send update notification updates to event consumers
 		whenever update log is generated"""
 		enqueued_method = 'frappe.event_streaming.doctype.event_consumer.event_consumer.notify_event_consumers'
-		jobs = get_jobs()
-		if not jobs or enqueued_method not in jobs[frappe.local.site]:
-			frappe.enqueue(enqueued_method, doctype=self.ref_doctype, queue='long',
-				enqueue_after_commit=True)
+		frappe.enqueue(enqueued_method, doctype=self.ref_doctype, queue='long',
+			enqueue_after_commit=True, deduplicate=True)
 
 def notify_consumers(doc, event):
 	'''called via hooks'''
@@ -238,6 +238,9 @@ def update_site_config(key, value, validate=True, site_config_path=None):
 	with open(site_config_path, "w") as f:
 		f.write(json.dumps(site_config, indent=1, sort_keys=True))
 
+	# don't wait for the mtime to change
+	frappe.file_json_cache.pop(site_config_path, None)
+
 	if hasattr(frappe.local, "conf"):
 		frappe.local.conf[key] = value
 
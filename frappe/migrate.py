@@ -16,6 +16,7 @@ from frappe.website import render
 from frappe.core.doctype.language.language import sync_languages
 from frappe.modules.utils import sync_customizations
 from frappe.utils import global_search
+from frappe.utils.translation_catalog import build_catalogs
 
 def migrate(verbose=True, rebuild_website=False):
 	'''Migrate all apps to the latest version, will:
@@ -49,6 +50,7 @@ def migrate(verbose=True, rebuild_website=False):
 		# sync
 		frappe.model.sync.sync_all(verbose=verbose)
 		frappe.translate.clear_cache()
+		build_catalogs()
 		sync_fixtures()
 		sync_customizations()
 		sync_languages()
@@ -77,3 +79,12 @@ def migrate(verbose=True, rebuild_website=False):
 			json.dump(list(frappe.flags.touched_tables), f, sort_keys=True, indent=4)
 		frappe.flags.touched_tables.clear()
 
+
+def migrate_site(site, verbose=False, rebuild_website=False):
+	'''Migrate the given site (connects and destroys the connection)'''
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		migrate(verbose, rebuild_website=rebuild_website)
+	finally:
+		frappe.destroy()
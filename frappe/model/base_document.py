@@ -299,8 +299,8 @@ class BaseDocument(object):
 		fieldname = [df.fieldname for df in self.meta.get_table_fields() if df.options==doctype]
 		return fieldname[0] if fieldname else None
 
-	def db_insert(self):
-		"""INSERT the document (with valid columns) in the database."""
+	def get_valid_dict_for_insert(self):
+		"""Set name and timestamps (if missing) and return the valid dict to be inserted."""
 		if not self.name:
 			# name will be set by document class in most cases
 			set_new_name(self)
@@ -310,7 +310,11 @@ class BaseDocument(object):
 			self.created_by = self.modified_by = frappe.session.user
 
 		# if doctype is "DocType", don't insert null values as we don't know who is valid yet
-		d = self.get_valid_dict(convert_dates_to_str=True, ignore_nulls = self.doctype in ('DocType', 'DocField', 'DocPerm'))
+		return self.get_valid_dict(convert_dates_to_str=True, ignore_nulls = self.doctype in ('DocType', 'DocField', 'DocPerm'))
+
+	def db_insert(self):
+		"""INSERT the document (with valid columns) in the database."""
+		d = self.get_valid_dict_for_insert()
 
 		columns = list(d)
 		try:
@@ -432,8 +436,11 @@ class BaseDocument(object):
 
 		return missing
 
-	def get_invalid_links(self, is_submittable=False):
-		'''Returns list of invalid links and also updates fetch values if not set'''
+	def get_invalid_links(self, is_submittable=False, link_values=None):
+		'''Returns list of invalid links and also updates fetch values if not set
+
+		:param link_values: [optional] values of linked documents already fetched via
+			`get_link_values`, used to validate links of a whole document tree in a few queries.'''
 		def get_msg(df, docname):
 			if self.parentfield:
 				return "{} #{}: {}: {}".format(_("Row"), self.idx, _(df.label), docname)
@@ -443,6 +450,37 @@ class BaseDocument(object):
 		invalid_links = []
 		cancelled_links = []
 
+		links = self.get_links_to_validate()
+		if link_values is None:
+			link_values = get_link_values(links)
+
+		for df, doctype, docname, fields_to_fetch in links:
+			# MySQL is case insensitive. Preserve case of the original docname in the Link Field.
+			values = get_link_value(link_values, doctype, docname) or frappe._dict(name=None)
+
+			setattr(self, df.fieldname, values.name)
+
+			for _df in fields_to_fetch:
+				if self.is_new() or self.docstatus != 1 or _df.allow_on_submit:
+					setattr(self, _df.fieldname, values.get(_df.fetch_from.split('.')[-1]))
+
+			notify_link_count(doctype, docname)
+
+			if not values.name:
+				invalid_links.append((df.fieldname, docname, get_msg(df, docname)))
+
+			elif (df.fieldname != "amended_from"
+				and (is_submittable or self.meta.is_submittable) and frappe.get_meta(doctype).is_submittable
+				and cint(values.docstatus)==2):
+
+				cancelled_links.append((df.fieldname, docname, get_msg(df, docname)))
+
+		return invalid_links, cancelled_links
+
+	def get_links_to_validate(self):
+		'''Returns list of (docfield, linked doctype, linked name, fields to fetch) for all set
+		Link and Dynamic Link fields'''
+		links = []
 		for df in (self.meta.get_link_fields()
 				+ self.meta.get("fields", {"fieldtype": ('=', "Dynamic Link")})):
 			docname = self.get(df.fieldname)
@@ -457,8 +495,6 @@ class BaseDocument(object):
 					if not doctype:
 						frappe.throw(_("{0} must be set first").format(self.meta.get_label(df.options)))
 
-				# MySQL is case insensitive. Preserve case of the original docname in the Link Field.
-
 				# get a map of values ot fetch along with this link query
 				# that are mapped as link_fieldname.source_fieldname in Options of
 				# Readonly or Data or Text type fields
@@ -470,40 +506,9 @@ class BaseDocument(object):
 						or (_df.get('fetch_if_empty') and not self.get(_df.fieldname))
 				]
 
-				if not fields_to_fetch:
-					# cache a single value type
-					values = frappe._dict(name=frappe.db.get_value(doctype, docname,
-						'name', cache=True))
-				else:
-					values_to_fetch = ['name'] + [_df.fetch_from.split('.')[-1]
-						for _df in fields_to_fetch]
-
-					# don't cache if fetching other values too
-					values = frappe.db.get_value(doctype, docname,
-						values_to_fetch, as_dict=True)
-
-				if frappe.get_meta(doctype).issingle:
-					values.name = doctype
-
-				if values:
-					setattr(self, df.fieldname, values.name)
+				links.append((df, doctype, docname, fields_to_fetch))
 
-					for _df in fields_to_fetch:
-						if self.is_new() or self.docstatus != 1 or _df.allow_on_submit:
-							setattr(self, _df.fieldname, values[_df.fetch_from.split('.')[-1]])
-
-					notify_link_count(doctype, docname)
-
-					if not values.name:
-						invalid_links.append((df.fieldname, docname, get_msg(df, docname)))
-
-					elif (df.fieldname != "amended_from"
-						and (is_submittable or self.meta.is_submittable) and frappe.get_meta(doctype).is_submittable
-						and cint(frappe.db.get_value(doctype, docname, "docstatus"))==2):
-
-						cancelled_links.append((df.fieldname, docname, get_msg(df, docname)))
-
-		return invalid_links, cancelled_links
+		return links
 
 	def _validate_selects(self):
 		if frappe.flags.in_import:
@@ -812,6 +817,55 @@ class BaseDocument(object):
 			for df in self.meta.get("fields", {"fieldtype": ('=', "Text Editor")}):
 				extract_images_from_doc(self, df.fieldname)
 
+def get_link_values(links):
+	'''Fetch `name`, `docstatus` and values to be fetched for all given links
+	(as returned by `get_links_to_validate`) with one query per linked doctype.
+
+	Returns a dict of doctype -> {name: values}'''
+	to_fetch = {}
+	for df, doctype, docname, fields_to_fetch in links:
+		names, fields = to_fetch.setdefault(doctype, (set(), set()))
+		names.add(docname)
+		fields.update(_df.fetch_from.split('.')[-1] for _df in fields_to_fetch)
+
+	link_values = {}
+	for doctype, (names, fields) in iteritems(to_fetch):
+		meta = frappe.get_meta(doctype)
+		values = link_values[doctype] = {}
+
+		if meta.issingle:
+			for docname in names:
+				row = frappe.db.get_value(doctype, docname, ['name'] + list(fields), as_dict=True)
+				if row:
+					row.name = doctype
+					values[cstr(docname)] = row
+			continue
+
+		fields = ['name'] + list(fields - {'name'})
+		if meta.is_submittable and 'docstatus' not in fields:
+			fields.append('docstatus')
+
+		names = list(names)
+		for i in range(0, len(names), 1000):
+			for row in frappe.db.get_values(doctype, {'name': ('in', names[i:i + 1000])},
+				fields, as_dict=True):
+				values[cstr(row.name)] = row
+
+	return link_values
+
+def get_link_value(link_values, doctype, docname):
+	'''Returns values of the linked document from the result of `get_link_values`'''
+	values = link_values.get(doctype) or {}
+	docname = cstr(docname)
+	if docname in values:
+		return values[docname]
+
+	if frappe.db.db_type != 'postgres':
+		# MySQL is case insensitive (and ignores trailing spaces)
+		for name, row in iteritems(values):
+			if name.lower().rstrip() == docname.lower().rstrip():
+				return row
+
 def _filter(data, filters, limit=None):
 	"""pass filters as:
 		{"key": "val", "key": ["!=", "val"],
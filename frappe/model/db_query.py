@@ -18,6 +18,8 @@ from frappe.client import check_parent_permission
 from frappe.model.utils.user_settings import get_user_settings, update_user_settings
 from frappe.utils import flt, cint, get_time, make_filter_tuple, get_filter, add_to_date, cstr, nowdate
 
+query_plans = None
+
 class DatabaseQuery(object):
 	def __init__(self, doctype, user=None):
 		self.doctype = doctype
@@ -36,7 +38,8 @@ class DatabaseQuery(object):
 		ignore_permissions=False, user=None, with_comment_count=False,
 		join='left join', distinct=False, start=None, page_length=None, limit=None,
 		ignore_ifnull=False, save_user_settings=False, save_user_settings_fields=False,
-		update=None, add_total_row=None, user_settings=None, reference_doctype=None, return_query=False):
+		update=None, add_total_row=None, user_settings=None, reference_doctype=None, return_query=False,
+		as_iterator=False):
 		if not ignore_permissions and not frappe.has_permission(self.doctype, "read", user=user):
 			frappe.flags.error_message = _('Insufficient Permission for {0}').format(frappe.bold(self.doctype))
 			raise frappe.PermissionError(self.doctype)
@@ -80,6 +83,7 @@ class DatabaseQuery(object):
 		self.update = update
 		self.user_settings_fields = copy.deepcopy(self.fields)
 		self.return_query = return_query
+		self.as_iterator = as_iterator
 
 		# for contextual user permission check
 		# to determine which user permission is applicable on link field of specific doctype
@@ -95,7 +99,7 @@ class DatabaseQuery(object):
 			if return_query:
 				return result
 
-		if with_comment_count and not as_list and self.doctype:
+		if with_comment_count and not as_list and not as_iterator and self.doctype:
 			self.add_comment_count(result)
 
 		if save_user_settings:
@@ -120,14 +124,20 @@ class DatabaseQuery(object):
 
 		if self.return_query:
 			return query
+		elif self.as_iterator:
+			return frappe.db.sql_iter(query, as_dict=not self.as_list, debug=self.debug, update=self.update)
 		else:
 			return frappe.db.sql(query, as_dict=not self.as_list, debug=self.debug, update=self.update)
 
 	def prepare_args(self):
 		self.parse_args()
-		self.sanitize_fields()
-		self.extract_tables()
-		self.set_optional_columns()
+		if not self.load_query_plan('fields', ['fields', 'tables']):
+			self.sanitize_fields()
+			self.extract_tables()
+			self.set_optional_columns()
+			self.save_query_plan('fields', ['fields', 'tables'])
+		else:
+			self.set_optional_columns()
 		self.build_conditions()
 
 		args = frappe._dict()
@@ -516,31 +526,20 @@ class DatabaseQuery(object):
 
 		if not self.tables: self.extract_tables()
 
-		meta = frappe.get_meta(self.doctype)
-		role_permissions = frappe.permissions.get_role_permissions(meta, user=self.user)
-		self.shared = frappe.share.get_shared(self.doctype, self.user)
+		self.shared = list(frappe.permissions.get_permission_bundle(self.doctype, self.user).shared['read'])
 
-		if (not meta.istable and
-			not role_permissions.get("read") and
-			not self.flags.ignore_permissions and
-			not has_any_user_permission_for_doctype(self.doctype, self.user, self.reference_doctype)):
+		plan_attributes = ['match_conditions', 'match_filters', 'read_only_if_shared']
+		if not self.load_query_plan('match', plan_attributes):
+			self.set_match_conditions()
+			self.save_query_plan('match', plan_attributes)
+
+		if self.read_only_if_shared:
 			only_if_shared = True
 			if not self.shared:
 				frappe.throw(_("No permission to read {0}").format(self.doctype), frappe.PermissionError)
 			else:
 				self.conditions.append(self.get_share_condition())
 
-		else:
-			#if has if_owner permission skip user perm check
-			if role_permissions.get("if_owner", {}).get("read"):
-				self.match_conditions.append("`tab{0}`.`owner` = {1}".format(self.doctype,
-					frappe.db.escape(self.user, percent=False)))
-			# add user permission only if role has read perm
-			elif role_permissions.get("read"):
-				# get user permissions
-				user_permissions = frappe.permissions.get_user_permissions(self.user)
-				self.add_user_permissions(user_permissions)
-
 		if as_condition:
 			conditions = ""
 			if self.match_conditions:
@@ -561,7 +560,81 @@ class DatabaseQuery(object):
 		else:
 			return self.match_filters
 
+	def set_match_conditions(self):
+		"""Set `match_conditions` and `match_filters` from role and user permissions"""
+		meta = frappe.get_meta(self.doctype)
+		role_permissions = frappe.permissions.get_role_permissions(meta, user=self.user)
+
+		self.read_only_if_shared = bool(not meta.istable and
+			not role_permissions.get("read") and
+			not self.flags.ignore_permissions and
+			not has_any_user_permission_for_doctype(self.doctype, self.user, self.reference_doctype))
+
+		if self.read_only_if_shared:
+			return
+
+		#if has if_owner permission skip user perm check
+		if role_permissions.get("if_owner", {}).get("read"):
+			self.match_conditions.append("`tab{0}`.`owner` = {1}".format(self.doctype,
+				frappe.db.escape(self.user, percent=False)))
+		# add user permission only if role has read perm
+		elif role_permissions.get("read"):
+			# get user permissions
+			user_permissions = frappe.permissions.get_user_permissions(self.user)
+			self.add_user_permissions(user_permissions)
+
+	def get_query_plan_key(self, plan_type):
+		if plan_type == 'fields':
+			return (plan_type, self.doctype, self.user, tuple(self.fields),
+				bool(self.flags.ignore_permissions))
+		else:
+			return (plan_type, self.doctype, self.user, self.reference_doctype,
+				bool(self.flags.ignore_permissions))
+
+	def load_query_plan(self, plan_type, attributes):
+		"""Set `attributes` from the cached query plan, returns False if not cached.
+
+		If `db_query_plan_cache` is set in site config, the parts of the query that do not
+		depend on filter values (sanitized fields, tables and permission conditions) are
+		kept per worker process, stamped with the meta version of the doctype and the
+		user's permission stamp (see `frappe.permissions.get_permission_stamp`)."""
+		if not frappe.local.conf.get('db_query_plan_cache'):
+			return False
+
+		store = get_query_plan_store()
+		self._query_plan_generation = store.get_generation(frappe.local.site)
+		found, value = store.get(frappe.local.site, self.get_query_plan_key(plan_type))
+		if not (found and value[0] == get_query_plan_stamp(self.doctype, self.user)):
+			return False
+
+		for attribute, cached_value in zip(attributes, value[1]):
+			# plans are shared, copy lists that are modified while building the query
+			if isinstance(cached_value, list):
+				cached_value = copy.deepcopy(cached_value)
+			setattr(self, attribute, cached_value)
+
+		return True
+
+	def save_query_plan(self, plan_type, attributes):
+		if not frappe.local.conf.get('db_query_plan_cache'):
+			return
+
+		plan = tuple(copy.deepcopy(getattr(self, attribute)) for attribute in attributes)
+		get_query_plan_store().set(frappe.local.site, self.get_query_plan_key(plan_type),
+			(get_query_plan_stamp(self.doctype, self.user), plan), len(repr(plan)),
+			self._query_plan_generation)
+
 	def get_share_condition(self):
+		if len(self.shared) > get_semi_join_threshold():
+			# a long list of names makes the query slow to send and parse
+			user_condition = "`user`={0}".format(frappe.db.escape(self.user, percent=False))
+			if self.user != 'Guest':
+				user_condition += " or `everyone`=1"
+
+			return """`tab{0}`.name in (select `share_name` from `tabDocShare`
+				where `share_doctype`={1} and `read`=1 and ({2}))""".format(self.doctype,
+				frappe.db.escape(self.doctype, percent=False), user_condition)
+
 		return """`tab{0}`.name in ({1})""".format(self.doctype, ", ".join(["%s"] * len(self.shared))) % \
 			tuple([frappe.db.escape(s, percent=False) for s in self.shared])
 
@@ -612,11 +685,15 @@ class DatabaseQuery(object):
 						docs.append(permission.get('doc'))
 
 				if docs:
+					if len(docs) > get_semi_join_threshold():
+						values = self.get_user_permission_query(df)
+					else:
+						values = ", ".join([(frappe.db.escape(doc, percent=False)) for doc in docs])
+
 					condition += "`tab{doctype}`.`{fieldname}` in ({values})".format(
 						doctype=self.doctype,
 						fieldname=df.get('fieldname'),
-						values=", ".join(
-							[(frappe.db.escape(doc, percent=False)) for doc in docs])
+						values=values
 						)
 
 					match_conditions.append("({condition})".format(condition=condition))
@@ -628,6 +705,30 @@ class DatabaseQuery(object):
 		if match_filters:
 			self.match_filters.append(match_filters)
 
+	def get_user_permission_query(self, df):
+		"""Returns a sub query for the values of `df` allowed by the user's User Permissions,
+		same as the values selected from `get_user_permissions` in `add_user_permissions`"""
+		allow = df.get('options')
+		if df.get('fieldname') == 'name' and self.reference_doctype:
+			applicable_for = self.reference_doctype
+		else:
+			applicable_for = self.doctype
+
+		query = """select `for_value` from `tabUser Permission`
+			where `user`={user} and `allow`={allow}
+				and (ifnull(`applicable_for`, '')='' or `applicable_for`={applicable_for})""".format(
+			user=frappe.db.escape(self.user, percent=False),
+			allow=frappe.db.escape(allow, percent=False),
+			applicable_for=frappe.db.escape(applicable_for, percent=False))
+
+		if frappe.get_meta(allow).is_nested_set():
+			# permission on a node applies to its descendants
+			query = """select `descendant`.`name` from `tab{allow}` `descendant`, `tab{allow}` `node`
+				where `descendant`.`lft` >= `node`.`lft` and `descendant`.`rgt` <= `node`.`rgt`
+					and `node`.`name` in ({query})""".format(allow=allow, query=query)
+
+		return query
+
 	def get_permission_query_conditions(self):
 		condition_methods = frappe.get_hooks("permission_query_conditions", {}).get(self.doctype, [])
 		if condition_methods:
@@ -642,6 +743,8 @@ class DatabaseQuery(object):
 	def run_custom_query(self, query):
 		if '%(key)s' in query:
 			query = query.replace('%(key)s', '`name`')
+		if self.as_iterator:
+			return frappe.db.sql_iter(query, as_dict = (not self.as_list))
 		return frappe.db.sql(query, as_dict = (not self.as_list))
 
 	def set_order_by(self, args):
@@ -724,6 +827,21 @@ class DatabaseQuery(object):
 
 		update_user_settings(self.doctype, user_settings)
 
+def get_semi_join_threshold():
+	"""Lists of permitted names longer than this are replaced by a sub query"""
+	return cint(frappe.local.conf.get('permission_semi_join_threshold')) or 500
+
+def get_query_plan_store():
+	global query_plans
+	if not query_plans:
+		from frappe.utils.process_cache import ProcessCache
+		query_plans = ProcessCache(max_entries=frappe.local.conf.get('db_query_plan_max_entries') or 5000)
+	return query_plans
+
+def get_query_plan_stamp(doctype, user):
+	from frappe.model.meta import get_meta_version
+	return get_meta_version(doctype), frappe.permissions.get_permission_stamp(user)
+
 def get_order_by(doctype, meta):
 	order_by = ""
 
@@ -817,4 +935,42 @@ def get_between_date_filter(value, df=None):
 			frappe.db.format_date(from_date),
 			frappe.db.format_date(to_date))
 
-	return data
\ No newline at end of file
+	return data
+
+def benchmark_permission_conditions(count=10000, doctype='ToDo'):
+	"""Print query size and time of user permission conditions on `name` with `count`
+	permitted docs, as an IN list and as a sub query. Changes are rolled back.
+
+		bench --site [sitename] execute frappe.model.db_query.benchmark_permission_conditions
+	"""
+	from time import time
+	from frappe.utils import now
+
+	user, timestamp = '_benchmark_permissions@example.com', now()
+	names = ['_benchmark-{0}'.format(i) for i in range(cint(count))]
+	frappe.db.bulk_insert('User Permission',
+		['name', 'user', 'allow', 'for_value', 'creation', 'modified', 'owner', 'modified_by'],
+		[(name, user, doctype, name, timestamp, timestamp, 'Administrator', 'Administrator') for name in names])
+
+	user_permissions = {doctype: [frappe._dict(doc=name) for name in names]}
+	threshold = frappe.local.conf.get('permission_semi_join_threshold')
+	try:
+		for label, semi_join_threshold in (('in list', cint(count) + 1), ('sub query', 1)):
+			frappe.local.conf.permission_semi_join_threshold = semi_join_threshold
+
+			start = time()
+			query = DatabaseQuery(doctype, user=user)
+			query.match_conditions, query.match_filters = [], []
+			query.add_user_permissions(user_permissions)
+			condition = query.match_conditions[0]
+			build_time = time() - start
+
+			start = time()
+			frappe.db.sql("select count(*) from `tab{0}` where {1}".format(doctype, condition))
+			query_time = time() - start
+
+			print('{0:<10} query: {1:>10} bytes, build: {2:.4f}s, execute: {3:.4f}s'.format(label,
+				len(condition), build_time, query_time))
+	finally:
+		frappe.local.conf.permission_semi_join_threshold = threshold
+		frappe.db.rollback()
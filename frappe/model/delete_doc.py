@@ -12,6 +12,7 @@ from frappe.utils.password import delete_all_passwords_for
 from frappe import _
 from frappe.model.naming import revert_series_if_last
 from frappe.utils.global_search import delete_for_document
+from frappe.permissions import clear_shared_permission_stamps
 from six import string_types, integer_types
 
 doctypes_to_skip = ("Communication", "ToDo", "DocShare", "Email Unsubscribe", "Activity Log", "File", "Version", "Document Follow", "Comment" , "View Log")
@@ -102,6 +103,11 @@ def delete_doc(doctype=None, name=None, force=0, ignore_doctypes=None, for_reloa
 
 		if doc and not for_reload:
 			add_to_deleted_document(doc)
+
+			from frappe.model.sync import synced_doctypes, reset_sync_manifest, is_synced_from_file
+			if doctype in synced_doctypes and is_synced_from_file(doc):
+				# import it again on the next migrate
+				reset_sync_manifest()
 			if not frappe.flags.in_patch:
 				try:
 					doc.notify_update()
@@ -271,6 +277,7 @@ def raise_link_exists_exception(doc, reference_doctype, reference_docname, row='
 def delete_dynamic_links(doctype, name):
 	delete_references('ToDo', doctype, name, 'reference_type')
 	delete_references('Email Unsubscribe', doctype, name)
+	clear_shared_permission_stamps(doctype, name)
 	delete_references('DocShare', doctype, name, 'share_doctype', 'share_name')
 	delete_references('Version', doctype, name, 'ref_doctype', 'docname')
 	delete_references('Comment', doctype, name)
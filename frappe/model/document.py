@@ -7,11 +7,11 @@ import time
 from frappe import _, msgprint
 from frappe.utils import flt, cstr, now, get_datetime_str, file_lock, date_diff
 from frappe.utils.background_jobs import enqueue
-from frappe.model.base_document import BaseDocument, get_controller
+from frappe.model.base_document import BaseDocument, get_controller, get_link_values
 from frappe.model.naming import set_new_name
 from six import iteritems, string_types
 from werkzeug.exceptions import NotFound, Forbidden
-import hashlib, json
+import hashlib, json, re
 from frappe.model import optional_fields, table_fields
 from frappe.model.workflow import validate_workflow
 from frappe.utils.global_search import update_global_search
@@ -200,6 +200,29 @@ class Document(BaseDocument):
 		if self.flags.in_print:
 			return
 
+		self.run_before_insert(ignore_permissions=ignore_permissions, ignore_links=ignore_links,
+			ignore_mandatory=ignore_mandatory)
+
+		# parent
+		if getattr(self.meta, "issingle", 0):
+			self.update_single(self.get_valid_dict())
+		else:
+			try:
+				self.db_insert()
+			except frappe.DuplicateEntryError as e:
+				if not ignore_if_duplicate:
+					raise e
+
+		# children
+		for d in self.get_all_children():
+			d.db_insert()
+
+		self.run_after_insert()
+		return self
+
+	def run_before_insert(self, ignore_permissions=None, ignore_links=None, ignore_mandatory=None):
+		"""Check permissions, set defaults and name, and run `before_insert` and
+		`validate` methods. Called by `insert` (and `insert_many`) before writing to the database."""
 		self.flags.notifications_executed = []
 
 		if ignore_permissions!=None:
@@ -230,25 +253,9 @@ class Document(BaseDocument):
 		self.set_docstatus()
 		self.flags.in_insert = False
 
-		# follow document on document creation
-
-
-		# run validate, on update etc.
-
-		# parent
-		if getattr(self.meta, "issingle", 0):
-			self.update_single(self.get_valid_dict())
-		else:
-			try:
-				self.db_insert()
-			except frappe.DuplicateEntryError as e:
-				if not ignore_if_duplicate:
-					raise e
-
-		# children
-		for d in self.get_all_children():
-			d.db_insert()
-
+	def run_after_insert(self):
+		"""Run `after_insert`, `on_update` etc. once the document and its children are
+		written to the database. Called by `insert` (and `insert_many`)."""
 		self.run_method("after_insert")
 		self.flags.in_insert = True
 
@@ -264,7 +271,14 @@ class Document(BaseDocument):
 
 		if not (frappe.flags.in_migrate or frappe.local.flags.in_install):
 			follow_document(self.doctype, self.name, frappe.session.user)
-		return self
+
+	@staticmethod
+	def insert_many(docs, ignore_permissions=None, ignore_links=None, ignore_mandatory=None,
+		chunk_size=500):
+		"""Insert new documents (and their children) with one multi-row `INSERT` per
+		table for every `chunk_size` rows. See `bulk_insert`."""
+		return bulk_insert(docs, ignore_permissions=ignore_permissions, ignore_links=ignore_links,
+			ignore_mandatory=ignore_mandatory, chunk_size=chunk_size)
 
 	def save(self, *args, **kwargs):
 		"""Wrapper for _save"""
@@ -345,34 +359,81 @@ class Document(BaseDocument):
 
 	def update_children(self):
 		'''update child tables'''
+		self.flags.child_table_sync = frappe._dict(inserted=0, updated=0, deleted=0, skipped=0)
 		for df in self.meta.get_table_fields():
 			self.update_child_table(df.fieldname, df)
 
 	def update_child_table(self, fieldname, df=None):
-		'''sync child table for given fieldname'''
+		'''sync child table for given fieldname
+
+		Rows are compared with `_doc_before_save` so that only new rows are
+		inserted (multi-row `INSERT`), only changed rows are updated (batched) and
+		removed rows are deleted in a single query. Counts are set in
+		`self.flags.child_table_sync`.'''
 		rows = []
 		if not df:
 			df = self.meta.get_field(fieldname)
 
+		if not self.flags.child_table_sync:
+			self.flags.child_table_sync = frappe._dict(inserted=0, updated=0, deleted=0, skipped=0)
+		stats = self.flags.child_table_sync
+
+		doc_before_save = self.get_doc_before_save()
+		rows_before_save = None
+		if doc_before_save:
+			rows_before_save = {d.name: d for d in doc_before_save.get(df.fieldname) or []}
+
+		to_insert, to_update = [], {}
 		for d in self.get(df.fieldname):
-			d.db_update()
+			if d.get("__islocal") or not d.name:
+				to_insert.append(d)
+			else:
+				values = d.get_valid_dict(convert_dates_to_str=True,
+					ignore_nulls = d.doctype in ('DocType', 'DocField', 'DocPerm'))
+				if rows_before_save is not None and d.name in rows_before_save \
+					and not is_child_row_changed(values, rows_before_save[d.name]):
+					stats.skipped += 1
+				else:
+					# don't update name, as case might've been changed
+					del values['name']
+					to_update.setdefault(tuple(values), {})[d.name] = d, tuple(values.values())
+
 			rows.append(d.name)
 
+		if to_insert:
+			db_insert_rows(to_insert)
+			stats.inserted += len(to_insert)
+
+		for columns, changed_rows in iteritems(to_update):
+			try:
+				frappe.db.bulk_update(df.options, columns,
+					{name: values for name, (d, values) in iteritems(changed_rows)})
+			except Exception as e:
+				if frappe.db.is_unique_key_violation(e):
+					row = get_row_with_duplicate_value([d for d, values in changed_rows.values()], e)
+					(row or self).show_unique_validation_message(e)
+				else:
+					raise
+			stats.updated += len(changed_rows)
+
 		if df.options in (self.flags.ignore_children_type or []):
 			# do not delete rows for this because of flags
 			# hack for docperm :(
 			return
 
+		if rows_before_save is not None:
+			# nothing to delete if all rows loaded before save are still present
+			deleted_rows = set(rows_before_save) - set(rows)
+			if not deleted_rows:
+				return
+			stats.deleted += len(deleted_rows)
+
 		if rows:
-			# select rows that do not match the ones in the document
-			deleted_rows = frappe.db.sql("""select name from `tab{0}` where parent=%s
+			# delete rows that do not match the ones in the document
+			frappe.db.sql("""delete from `tab{0}` where parent=%s
 				and parenttype=%s and parentfield=%s
 				and name not in ({1})""".format(df.options, ','.join(['%s'] * len(rows))),
 					[self.name, self.doctype, fieldname] + rows)
-			if len(deleted_rows) > 0:
-				# delete rows that do not match the ones in the document
-				frappe.db.sql("""delete from `tab{0}` where name in ({1})""".format(df.options,
-					','.join(['%s'] * len(deleted_rows))), tuple(row[0] for row in deleted_rows))
 
 		else:
 			# no rows found, delete all rows
@@ -742,10 +803,18 @@ class Document(BaseDocument):
 		if self.flags.ignore_links or self._action == "cancel":
 			return
 
-		invalid_links, cancelled_links = self.get_invalid_links()
+		# fetch all linked documents of parent and children with one query per doctype
+		children = self.get_all_children()
+		links = self.get_links_to_validate()
+		for d in children:
+			links.extend(d.get_links_to_validate())
+		link_values = get_link_values(links)
 
-		for d in self.get_all_children():
-			result = d.get_invalid_links(is_submittable=self.meta.is_submittable)
+		invalid_links, cancelled_links = self.get_invalid_links(link_values=link_values)
+
+		for d in children:
+			result = d.get_invalid_links(is_submittable=self.meta.is_submittable,
+				link_values=link_values)
 			invalid_links.extend(result[0])
 			cancelled_links.extend(result[1])
 
@@ -1233,6 +1302,123 @@ class Document(BaseDocument):
 				frappe.bold(self.meta.get_label(from_date_field)),
 			), frappe.exceptions.InvalidDates)
 
+def bulk_insert(docs, ignore_permissions=None, ignore_links=None, ignore_mandatory=None,
+	chunk_size=500):
+	"""Insert a list of new documents using batched multi-row `INSERT` queries.
+
+	Each document goes through the same permission checks, naming and validation
+	as `Document.insert`. Rows of parents and children are then grouped by table
+	and written `chunk_size` rows at a time, parents before children. If a chunk
+	fails on a duplicate key, that chunk is retried row by row so that hash names
+	are regenerated and the offending document raises the usual error. On Postgres
+	the error rolls back the transaction, so it is raised as is.
+
+	:param docs: List of documents or document dicts.
+	:param chunk_size: Maximum number of rows per `INSERT`.
+
+	Example:
+
+		frappe.bulk_insert([{"doctype": "ToDo", "description": d} for d in descriptions])
+	"""
+	docs = [get_doc(d) for d in docs]
+	docs = [d for d in docs if not d.flags.in_print]
+
+	for doc in docs:
+		doc.run_before_insert(ignore_permissions=ignore_permissions, ignore_links=ignore_links,
+			ignore_mandatory=ignore_mandatory)
+
+	parents = []
+	for doc in docs:
+		if getattr(doc.meta, "issingle", 0):
+			doc.update_single(doc.get_valid_dict())
+		else:
+			parents.append(doc)
+
+	db_insert_rows(parents, chunk_size=chunk_size)
+
+	# a parent is renamed if its hash name collides, so children are built after
+	children = []
+	for doc in parents:
+		doc.set_parent_in_children()
+		children.extend(doc.get_all_children())
+
+	db_insert_rows(children, chunk_size=chunk_size)
+
+	for doc in docs:
+		doc.run_after_insert()
+
+	return docs
+
+def db_insert_rows(rows, chunk_size=500):
+	"""INSERT new documents / child rows with one multi-row `INSERT` per table and chunk.
+	If a chunk fails on a duplicate key, its rows are inserted one by one (MariaDB only)."""
+	# group rows by table (and column set, as some doctypes skip null columns)
+	tables = {}
+	for d in rows:
+		values = d.get_valid_dict_for_insert()
+		tables.setdefault((d.doctype, tuple(values)), []).append((d, tuple(values.values())))
+
+	for (doctype, columns), table_rows in iteritems(tables):
+		for i in range(0, len(table_rows), chunk_size):
+			chunk = table_rows[i:i + chunk_size]
+			try:
+				frappe.db.bulk_insert(doctype, columns, [values for d, values in chunk],
+					chunk_size=chunk_size)
+			except Exception as e:
+				# on postgres the failed query has rolled back the transaction, nothing to retry
+				if frappe.db.db_type == 'postgres' or not (frappe.db.is_primary_key_violation(e)
+					or frappe.db.is_unique_key_violation(e)):
+					raise
+
+				# find the offending row(s)
+				for d, values in chunk:
+					d.db_insert()
+
+			for d, values in chunk:
+				d.set("__islocal", False)
+
+def get_row_with_duplicate_value(rows, e):
+	"""Returns the row that has the value reported as duplicate by the unique key
+	violation `e`, or None"""
+	# MariaDB: Duplicate entry 'value' for key 'fieldname'
+	# Postgres: Key (fieldname)=(value) already exists
+	match = re.search(r"Duplicate entry '(.*)' for key '(?:.*\.)?(.*?)'", cstr(e))
+	if match:
+		value, fieldname = match.groups()
+	else:
+		match = re.search(r"Key \((.*)\)=\((.*)\) already exists", cstr(e))
+		if not match:
+			return None
+		fieldname, value = match.groups()
+
+	# unique_first_fieldname_second_fieldname is the constraint name created using frappe.db.add_unique
+	if fieldname.startswith("unique_"):
+		fieldname = fieldname.split("_", 1)[1]
+
+	for d in rows:
+		if d.meta.get_field(fieldname) and cstr(d.get(fieldname)) == value:
+			return d
+
+	return None
+
+def is_child_row_changed(values, row_before_save):
+	"""Returns True if the valid dict `values` of a child row differs from the row
+	as it was loaded before save (ignoring the timestamps set on every save)."""
+	values_before_save = row_before_save.get_valid_dict(convert_dates_to_str=True)
+	for key in set(values) | set(values_before_save):
+		if key in ('modified', 'modified_by'):
+			continue
+
+		value, value_before_save = values.get(key), values_before_save.get(key)
+		if value == value_before_save:
+			continue
+
+		# values loaded from the database may differ in type (dates, decimals)
+		if value is None or value_before_save is None or cstr(value) != cstr(value_before_save):
+			return True
+
+	return False
+
 def execute_action(doctype, name, action, **kwargs):
 	'''Execute an action on a document (called by background worker)'''
 	doc = frappe.get_doc(doctype, name)
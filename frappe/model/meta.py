@@ -17,8 +17,9 @@ Example:
 
 from __future__ import unicode_literals, print_function
 from datetime import datetime
+from six import iteritems
 from six.moves import range
-import frappe, json, os
+import frappe, json, os, redis
 from frappe.utils import cstr, cint
 from frappe.model import default_fields, no_value_fields, optional_fields, data_fieldtypes, table_fields
 from frappe.model.document import Document
@@ -27,21 +28,83 @@ from frappe.modules import load_doctype_module
 from frappe.model.workflow import get_workflow_name
 from frappe import _
 
+# Meta objects shared by all requests of the worker process, see `get_meta`
+meta_store = None
+
 def get_meta(doctype, cached=True):
+	"""Returns the processed `Meta` of the doctype.
+
+	Cached `Meta` objects are kept for the request in `frappe.local.meta_cache`
+	and for the worker process in `meta_store` (keyed by site and doctype, stamped
+	with the version set by `clear_meta_store`), so they are built only once per
+	process. They are shared by all requests and must not be modified: copy a docfield
+	(`copy.copy(df)`) before setting properties on it. If Redis is not available, the
+	process store is not used, as its versions cannot be checked."""
 	if cached:
 		if not frappe.local.meta_cache.get(doctype):
-			meta = frappe.cache().hget("meta", doctype)
-			if meta:
-				meta = Meta(meta)
+			store = get_meta_store()
+			version = get_meta_version(doctype)
+			generation = store.get_generation(frappe.local.site)
+
+			found, value = store.get(frappe.local.site, doctype) if version else (False, None)
+			if found and value[0] == version:
+				meta = value[1]
 			else:
-				meta = Meta(doctype)
-				frappe.cache().hset('meta', doctype, meta.as_dict())
+				meta = frappe.cache().hget("meta", doctype)
+				if meta:
+					meta = Meta(meta)
+				else:
+					meta = Meta(doctype)
+					frappe.cache().hset('meta', doctype, meta.as_dict())
+
+				meta.init_lookups()
+				if version:
+					store.set(frappe.local.site, doctype, (version, meta), 0, generation)
+
 			frappe.local.meta_cache[doctype] = meta
 
 		return frappe.local.meta_cache[doctype]
 	else:
 		return load_meta(doctype)
 
+def get_meta_store():
+	global meta_store
+	if not meta_store:
+		from frappe.utils.process_cache import ProcessCache
+		meta_store = ProcessCache(max_entries=frappe.local.conf.get('meta_store_max_entries') or 5000)
+	return meta_store
+
+def get_meta_version(doctype):
+	"""Returns the version stamp of the doctype's meta, the versions of all doctypes
+	are read from redis once per request. Returns None if redis is not available."""
+	versions = getattr(frappe.local, 'meta_versions', None)
+	if versions is None:
+		try:
+			versions = {frappe.safe_decode(key): value
+				for key, value in iteritems(frappe.cache().hgetall('meta_version'))}
+		except redis.exceptions.ConnectionError:
+			versions = False
+		frappe.local.meta_versions = versions
+
+	if versions is False:
+		return None
+
+	return versions.get('__all__'), versions.get(doctype)
+
+def clear_meta_store(doctype=None):
+	"""Set a new version stamp for the doctype (or all doctypes) so that `Meta` objects
+	held by other worker processes are rebuilt"""
+	cache = frappe.cache()
+	if doctype:
+		cache.hset('meta_version', doctype, frappe.generate_hash(length=10))
+	else:
+		cache.delete_value('meta_version')
+		cache.hset('meta_version', '__all__', frappe.generate_hash(length=10))
+
+	frappe.local.meta_versions = None
+	if meta_store:
+		meta_store.invalidate(frappe.local.site, doctype)
+
 def load_meta(doctype):
 	return Meta(doctype)
 
@@ -105,10 +168,24 @@ class Meta(Document):
 		self.get_valid_columns()
 		self.set_custom_permissions()
 
+	def init_lookups(self):
+		'''Precompute field lookups (`get_field`, `get_valid_columns`, `get_link_fields`)
+		for meta shared across requests'''
+		self._fields = {}
+		for df in self.get("fields"):
+			self._fields[df.fieldname] = df
+
+		self._link_fields = tuple(self.get("fields", {"fieldtype": "Link", "options":["!=", "[Select]"]}))
+		self.get_valid_columns()
+
 	def as_dict(self, no_nulls = False):
 		def serialize(doc):
 			out = {}
 			for key in doc.__dict__:
+				if key == '_link_fields':
+					# lookup set by init_lookups
+					continue
+
 				value = doc.__dict__.get(key)
 
 				if isinstance(value, (list, tuple)):
@@ -127,6 +204,8 @@ class Meta(Document):
 		return serialize(self)
 
 	def get_link_fields(self):
+		if hasattr(self, "_link_fields"):
+			return list(self._link_fields)
 		return self.get("fields", {"fieldtype": "Link", "options":["!=", "[Select]"]})
 
 	def get_dynamic_link_fields(self):
@@ -6,8 +6,13 @@ import frappe
 from frappe import _
 from frappe.utils import now_datetime, cint, cstr
 import re
+import threading
 from six import string_types
 
+# (site, series) -> [next number, last reserved number], see `get_series_block_size`
+series_pools = {}
+series_pools_lock = threading.Lock()
+
 
 def set_new_name(doc):
 	"""
@@ -155,6 +160,11 @@ def parse_naming_series(parts, doctype='', doc=''):
 
 
 def getseries(key, digits):
+	if get_series_block_size(key) > 1:
+		current = get_next_from_series_block(key)
+		if current is not None:
+			return ('%0'+str(digits)+'d') % current
+
 	# series created ?
 	current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name`=%s FOR UPDATE", (key,))
 	if current and current[0][0] is not None:
@@ -168,6 +178,103 @@ def getseries(key, digits):
 		current = 1
 	return ('%0'+str(digits)+'d') % current
 
+def get_series_block_size(key):
+	"""Returns the block size set for the series in `naming_series_block_size` in site config.
+
+	By default, the next number of a series is taken by locking its row in `tabSeries`
+	until the transaction that inserts the document is committed, so concurrent inserts
+	for the same series are serialized. With a block size, e.g.
+
+		"naming_series_block_size": {"SINV-": 50, "POS-": 100}
+
+	each worker process reserves the next 50 numbers of `SINV-` at a time in a separate,
+	short transaction and hands them out from its own pool. This leaves gaps in the series:
+
+	- numbers are not in the order of creation across workers
+	- numbers left in a pool when the worker restarts are never used
+	- numbers of documents that were rolled back are not reused
+
+	`tabSeries` holds the last reserved (not the last used) number of the series.
+
+	Pools suit long-lived web workers. Background jobs run in a new process each, which
+	would throw away most of every block, so they lock the row as usual."""
+	block_sizes = frappe.local.conf.get('naming_series_block_size')
+	if not block_sizes:
+		return 0
+
+	block_size = cint(block_sizes.get(key))
+	if block_size > 1 and in_background_job():
+		return 0
+
+	return block_size
+
+def in_background_job():
+	try:
+		from rq import get_current_job
+	except ImportError:
+		return False
+
+	return bool(get_current_job())
+
+def get_next_from_series_block(key):
+	"""Returns the next number from the worker's pool for the series, reserving a new
+	block when the pool is used up. Returns None if no block could be reserved."""
+	pool_key = (frappe.local.site, key)
+	with series_pools_lock:
+		pool = series_pools.get(pool_key)
+		if not pool or pool[0] > pool[1]:
+			block_size = get_series_block_size(key)
+			first = reserve_series_block(key, block_size)
+			if first is None:
+				return None
+			pool = series_pools[pool_key] = [first, first + block_size - 1]
+
+		current = pool[0]
+		pool[0] += 1
+
+	return current
+
+def reserve_series_block(key, block_size):
+	"""Reserve the next `block_size` numbers of the series in a separate transaction that is
+	committed immediately. Returns the first reserved number.
+
+	Returns None if the row stays locked for a second, e.g. by the caller's own
+	transaction (which would wait for this one forever)."""
+	from frappe.database import get_db
+
+	db = get_db(user=frappe.local.conf.db_name)
+	rollback_observers = frappe.local.rollback_observers
+	try:
+		# the hooks of the main transaction must not run on a rollback of this one
+		frappe.local.rollback_observers = []
+		db.connect()
+		if db.db_type == 'postgres':
+			db.sql("SET statement_timeout = 1000")
+		else:
+			db.sql("SET SESSION innodb_lock_wait_timeout = 1")
+
+		db.sql("START TRANSACTION")
+		try:
+			current = db.sql("SELECT `current` FROM `tabSeries` WHERE `name`=%s FOR UPDATE", (key,))
+			if current:
+				first = cint(current[0][0]) + 1
+				db.sql("UPDATE `tabSeries` SET `current` = %s WHERE `name`=%s", (first + block_size - 1, key))
+			else:
+				first = 1
+				db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (key, block_size))
+		except Exception as e:
+			if db.is_timedout(e):
+				return None
+			raise
+
+		# not db.commit(), which runs the hooks of the main transaction
+		db.sql("COMMIT")
+	finally:
+		db.close()
+		frappe.local.rollback_observers = rollback_observers
+
+	return first
+
 
 def revert_series_if_last(key, name):
 	if ".#" in key:
@@ -181,6 +288,15 @@ def revert_series_if_last(key, name):
 		prefix = parse_naming_series(prefix.split('.'))
 
 	count = cint(name.replace(prefix, ""))
+
+	if get_series_block_size(prefix) > 1:
+		# numbers are reserved in blocks, only the worker's pool can take the number back
+		with series_pools_lock:
+			pool = series_pools.get((frappe.local.site, prefix))
+			if pool and pool[0] - 1 == count:
+				pool[0] -= 1
+		return
+
 	current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name`=%s FOR UPDATE", (prefix,))
 
 	if current and current[0][0]==count:
@@ -8,6 +8,7 @@ from frappe.utils import cint
 from frappe.model.naming import validate_name
 from frappe.model.dynamic_links import get_dynamic_link_map
 from frappe.utils.password import rename_password
+from frappe.permissions import clear_shared_permission_stamps
 from frappe.model.utils.user_settings import sync_user_settings, update_user_settings_data
 
 @frappe.whitelist()
@@ -46,6 +47,8 @@ def rename_doc(doctype, old, new, force=False, merge=False, ignore_permissions=F
 	link_fields = get_link_fields(doctype)
 	update_link_field_values(link_fields, old, new, doctype)
 
+	# the shares of the document are renamed with the dynamic links
+	clear_shared_permission_stamps(doctype, old)
 	rename_dynamic_links(doctype, old, new)
 
 	# save the user settings in the db
@@ -8,9 +8,19 @@ from __future__ import unicode_literals, print_function
 """
 import frappe
 import os
-from frappe.modules.import_file import import_file_by_path
+import json
+import hashlib
+from frappe.modules.import_file import import_file_by_path, read_doc_from_file
 from frappe.modules.patch_handler import block_user
-from frappe.utils import update_progress_bar
+from frappe.utils import cint, update_progress_bar, get_datetime_str
+
+# documents synced from files, a deleted one resets the manifest so that it is imported again
+synced_doctypes = ('DocType', 'Page', 'Report', 'Dashboard Chart Source', 'Print Format',
+	'Website Theme', 'Web Form', 'Notification', 'Print Style', 'Data Migration Mapping',
+	'Data Migration Plan')
+
+# global default that ties the manifest file to the database it was written for
+manifest_token_key = 'doctype_sync_manifest'
 
 def sync_all(force=0, verbose=False, reset_permissions=False):
 	block_user(True)
@@ -49,14 +59,49 @@ def sync_for(app_name, force=0, sync_everything = False, verbose=False, reset_pe
 		folder = os.path.dirname(frappe.get_module(app_name + "." + module_name).__file__)
 		get_doc_files(files, folder, force, sync_everything, verbose=verbose)
 
-	l = len(files)
+	# files that have not changed since they were last synced are skipped, unless their
+	# documents were changed in the database
+	manifest = get_sync_manifest()
+	skipped, to_sync, unchanged = 0, [], []
+	for path in files:
+		previous = manifest.get(path)
+		state = get_file_state(path, previous)
+		if not force and state and previous and previous.get('hash') == state['hash'] \
+			and previous.get('docs'):
+			unchanged.append((path, state, previous))
+		else:
+			to_sync.append((path, state))
+
+	# prefetch `modified` of the documents, instead of a query per file
+	docs = {}
+	for path, state in to_sync:
+		docs[path] = read_doc_from_file(path) if state else None
+	db_modified = {} if force else get_db_modified(list(docs.values())
+		+ [[{'doctype': d[0], 'name': d[1]} for d in previous['docs']] for path, state, previous in unchanged])
+
+	for path, state, previous in unchanged:
+		if is_synced(previous, db_modified):
+			# the mtime is updated, in case the file was touched (e.g. by git checkout)
+			manifest[path] = dict(previous, **state)
+			skipped += 1
+		else:
+			docs[path] = read_doc_from_file(path)
+			to_sync.append((path, state))
+
+	imported = 0
+	l = len(to_sync)
 	if l:
-		for i, doc_path in enumerate(files):
-			import_file_by_path(doc_path, force=force, ignore_version=True,
-				reset_permissions=reset_permissions, for_sync=True)
+		for i, (doc_path, state) in enumerate(to_sync):
+			if import_file_by_path(doc_path, force=force, ignore_version=True,
+				reset_permissions=reset_permissions, for_sync=True, docs=docs[doc_path],
+				db_modified=db_modified):
+				imported += 1
 			#print module_name + ' | ' + doctype + ' | ' + name
 
 			frappe.db.commit()
+			if state:
+				manifest[doc_path] = dict(state, modified=get_modified(docs[doc_path]),
+					docs=get_doc_names(docs[doc_path]))
 
 			# show progress bar
 			update_progress_bar("Updating DocTypes for {0}".format(app_name), i, l)
@@ -64,6 +109,122 @@ def sync_for(app_name, force=0, sync_everything = False, verbose=False, reset_pe
 		# print each progress bar on new line
 		print()
 
+	save_sync_manifest(manifest)
+
+	if verbose or l:
+		print("{0}: {1} files imported, {2} unchanged, {3} skipped".format(app_name,
+			imported, l - imported, skipped))
+
+def get_sync_manifest():
+	"""Returns the manifest of synced files ({path: {mtime, size, hash, modified, docs}}) of the site.
+	It is discarded if the database was restored or a synced document was deleted since
+	it was written."""
+	path = frappe.get_site_path('doctype_sync_manifest.json')
+	if not os.path.exists(path):
+		return {}
+
+	with open(path, 'r') as f:
+		try:
+			manifest = json.loads(f.read())
+		except ValueError:
+			return {}
+
+	# not in the (new) database if the site is reinstalled
+	token = frappe.db.get_value('DefaultValue', {'parent': '__global',
+		'defkey': manifest_token_key}, 'defvalue', ignore=True)
+	if not token or manifest.get('token') != token:
+		return {}
+
+	return manifest.get('files') or {}
+
+def save_sync_manifest(files):
+	token = frappe.generate_hash(length=10)
+	frappe.db.set_global(manifest_token_key, token)
+	frappe.db.commit()
+
+	with open(frappe.get_site_path('doctype_sync_manifest.json'), 'w') as f:
+		f.write(json.dumps({'token': token, 'files': files}))
+
+def reset_sync_manifest():
+	"""All files are checked in the next sync"""
+	frappe.db.set_global(manifest_token_key, None)
+
+def is_synced_from_file(doc):
+	"""Returns True if the document is a standard document of a module, which is synced
+	from its file"""
+	for fieldname in ('is_standard', 'standard'):
+		if doc.meta.has_field(fieldname):
+			value = doc.get(fieldname)
+			return value == 'Yes' or cint(value) == 1
+
+	if doc.meta.has_field('custom') and cint(doc.get('custom')):
+		return False
+
+	return bool(doc.get('module'))
+
+def get_file_state(path, previous=None):
+	"""Returns {mtime, size, hash} of the file, or None if it is missing. The file is
+	not read if its mtime and size are the same as in `previous`."""
+	try:
+		stat = os.stat(path)
+	except OSError:
+		return None
+
+	if previous and previous.get('mtime') == stat.st_mtime and previous.get('size') == stat.st_size:
+		file_hash = previous.get('hash')
+	else:
+		with open(path, 'rb') as f:
+			file_hash = hashlib.md5(f.read()).hexdigest()
+
+	return {'mtime': stat.st_mtime, 'size': stat.st_size, 'hash': file_hash}
+
+def get_modified(docs):
+	if isinstance(docs, list):
+		return [d.get('modified') for d in docs]
+	return docs and docs.get('modified')
+
+def get_doc_names(docs):
+	return [[d.get('doctype'), d.get('name')] for d in (docs if isinstance(docs, list) else [docs]) if d]
+
+def is_synced(previous, db_modified):
+	"""Returns True if the documents of the file are in the database with the `modified`
+	they were synced with"""
+	modified = previous.get('modified')
+	if not isinstance(modified, list):
+		modified = [modified]
+
+	if len(modified) != len(previous['docs']):
+		return False
+
+	for (doctype, name), file_modified in zip(previous['docs'], modified):
+		value = db_modified.get((doctype, name))
+		if not (value and file_modified) or get_datetime_str(value) != get_datetime_str(file_modified):
+			return False
+
+	return True
+
+def get_db_modified(docs_list):
+	"""Returns {(doctype, name): modified} of the documents in the database, with one
+	query per doctype"""
+	names = {}
+	for docs in docs_list:
+		for doc in (docs if isinstance(docs, list) else [docs]):
+			if doc and doc.get('doctype') and doc.get('name'):
+				names.setdefault(doc['doctype'], set()).add(doc['name'])
+
+	db_modified = {}
+	for doctype, doctype_names in names.items():
+		try:
+			for name, modified in frappe.db.sql("""select name, modified from `tab{0}`
+				where name in %(names)s""".format(doctype), {'names': tuple(doctype_names)}):
+				db_modified[(doctype, name)] = modified
+		except Exception as e:
+			# not installed yet
+			if not frappe.db.is_table_missing(e):
+				raise
+
+	return db_modified
+
 def get_doc_files(files, start_path, force=0, sync_everything = False, verbose=False):
 	"""walk and sync all doctypes and pages"""
 
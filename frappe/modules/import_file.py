@@ -41,12 +41,18 @@ def get_file_path(module, dt, dn):
 	return path
 
 def import_file_by_path(path, force=False, data_import=False, pre_process=None, ignore_version=None,
-		reset_permissions=False, for_sync=False):
-	try:
-		docs = read_doc_from_file(path)
-	except IOError:
-		print (path + " missing")
-		return
+		reset_permissions=False, for_sync=False, docs=None, db_modified=None):
+	"""Import the document(s) in the file at `path` if they were modified since they were last
+	imported. Returns False if not modified.
+
+	:param docs: Contents of the file, if already read.
+	:param db_modified: {(doctype, name): modified} of documents in the database, if prefetched."""
+	if docs is None:
+		try:
+			docs = read_doc_from_file(path)
+		except IOError:
+			print (path + " missing")
+			return
 
 	if docs:
 		if not isinstance(docs, list):
@@ -55,8 +61,11 @@ def import_file_by_path(path, force=False, data_import=False, pre_process=None,
 		for doc in docs:
 			if not force:
 				# check if timestamps match
-				db_modified = frappe.db.get_value(doc['doctype'], doc['name'], 'modified')
-				if db_modified and doc.get('modified')==get_datetime_str(db_modified):
+				if db_modified is None:
+					modified = frappe.db.get_value(doc['doctype'], doc['name'], 'modified')
+				else:
+					modified = db_modified.get((doc['doctype'], doc['name']))
+				if modified and doc.get('modified')==get_datetime_str(modified):
 					return False
 
 			original_modified = doc.get("modified")
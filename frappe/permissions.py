@@ -78,8 +78,8 @@ def has_permission(doctype, ptype="read", doc=None, verbose=False, user=None, ra
 
 	def false_if_not_shared():
 		if ptype in ("read", "write", "share", "email", "print"):
-			shared = frappe.share.get_shared(doctype, user,
-				["read" if ptype in ("email", "print") else ptype])
+			shared = get_permission_bundle(doctype, user).shared[
+				"read" if ptype in ("email", "print") else ptype]
 
 			if doc:
 				doc_name = get_doc_name(doc)
@@ -167,47 +167,149 @@ def get_role_permissions(doctype_meta, user=None):
 		return allow_everything()
 
 	if not frappe.local.role_permissions.get(cache_key):
-		perms = frappe._dict(
-			if_owner={}
-		)
-
-		roles = frappe.get_roles(user)
-
-		def is_perm_applicable(perm):
-			return perm.role in roles and cint(perm.permlevel)==0
-
-		def has_permission_without_if_owner_enabled(ptype):
-			return any(p.get(ptype, 0) and not p.get('if_owner', 0) for p in applicable_permissions)
-
-		applicable_permissions = list(filter(is_perm_applicable, getattr(doctype_meta, 'permissions', [])))
-		has_if_owner_enabled = any(p.get('if_owner', 0) for p in applicable_permissions)
-
-		for ptype in rights:
-			pvalue = any(p.get(ptype, 0) for p in applicable_permissions)
-			# check if any perm object allows perm type
-			perms[ptype] = cint(pvalue)
-			if (pvalue
-				and has_if_owner_enabled
-				and not has_permission_without_if_owner_enabled(ptype)
-				and ptype != 'create'):
-				perms['if_owner'][ptype] = 1
-				# has no access if not owner
-				# only provide read access so that user is able to at-least access list
-				# (and the documents will be filtered based on owner sin further checks)
-				perms[ptype] = 1 if ptype == 'read' else 0
+		if frappe.local.meta_cache.get(doctype_meta.name) is doctype_meta:
+			perms = get_permission_bundle(doctype_meta.name, user).role_permissions
+		else:
+			perms = build_role_permissions(doctype_meta, user)
 
 		frappe.local.role_permissions[cache_key] = perms
 
 	return frappe.local.role_permissions[cache_key]
 
+def build_role_permissions(doctype_meta, user):
+	if user == 'Administrator':
+		return allow_everything()
+
+	perms = frappe._dict(
+		if_owner={}
+	)
+
+	roles = frappe.get_roles(user)
+
+	def is_perm_applicable(perm):
+		return perm.role in roles and cint(perm.permlevel)==0
+
+	def has_permission_without_if_owner_enabled(ptype):
+		return any(p.get(ptype, 0) and not p.get('if_owner', 0) for p in applicable_permissions)
+
+	applicable_permissions = list(filter(is_perm_applicable, getattr(doctype_meta, 'permissions', [])))
+	has_if_owner_enabled = any(p.get('if_owner', 0) for p in applicable_permissions)
+
+	for ptype in rights:
+		pvalue = any(p.get(ptype, 0) for p in applicable_permissions)
+		# check if any perm object allows perm type
+		perms[ptype] = cint(pvalue)
+		if (pvalue
+			and has_if_owner_enabled
+			and not has_permission_without_if_owner_enabled(ptype)
+			and ptype != 'create'):
+			perms['if_owner'][ptype] = 1
+			# has no access if not owner
+			# only provide read access so that user is able to at-least access list
+			# (and the documents will be filtered based on owner sin further checks)
+			perms[ptype] = 1 if ptype == 'read' else 0
+
+	return perms
+
+def get_permission_bundle(doctype, user=None):
+	"""Returns the permissions of `user` on `doctype`, resolved in one go:
+
+		role_permissions: as returned by `get_role_permissions`
+		user_permissions: {link doctype: set of names allowed for `doctype`}
+		shared: {"read": set of names shared with the user, "write": ..., "share": ...}
+
+	Bundles are cached for the request and in a Redis hash per user (and the process
+	wide L1 cache if enabled), stamped with the meta version of the doctype and the
+	user's permission stamp (see `get_permission_stamp`)."""
+	from frappe.model.meta import get_meta_version
+
+	if not user: user = frappe.session.user
+
+	cache_key = (doctype, user)
+	bundle = frappe.local.permission_bundles.get(cache_key)
+	if bundle is None:
+		stamp = (get_meta_version(doctype), get_permission_stamp(user))
+		name = get_permission_bundle_key(user)
+
+		cached = frappe.cache().hget(name, doctype)
+		if cached and cached[0] == stamp:
+			bundle = cached[1]
+		else:
+			bundle = build_permission_bundle(doctype, user)
+			frappe.cache().hset(name, doctype, (stamp, bundle))
+
+		frappe.local.permission_bundles[cache_key] = bundle
+
+	return bundle
+
+def get_permission_bundle_key(user):
+	# "user:" keys of the user are deleted with the user's cache
+	return 'user:{0}:permission_bundle'.format(user)
+
+def build_permission_bundle(doctype, user):
+	bundle = frappe._dict(
+		role_permissions=build_role_permissions(frappe.get_meta(doctype), user),
+		user_permissions={},
+		shared={'read': set(), 'write': set(), 'share': set()}
+	)
+
+	for allow, user_permissions in get_user_permissions(user).items():
+		allowed_docs = get_allowed_docs_for_doctype(user_permissions, doctype)
+		if allowed_docs:
+			bundle.user_permissions[allow] = set(allowed_docs)
+
+	user_condition = '`user`=%(user)s'
+	if user != 'Guest':
+		user_condition += ' or `everyone`=1'
+
+	for d in frappe.db.sql("""select `share_name`, `read`, `write`, `share` from `tabDocShare`
+		where `share_doctype`=%(doctype)s and ({0})""".format(user_condition),
+		dict(doctype=doctype, user=user), as_dict=True):
+		for right in ('read', 'write', 'share'):
+			if d.get(right):
+				bundle.shared[right].add(d.share_name)
+
+	return bundle
+
+def get_permission_stamp(user):
+	"""Returns a random stamp for the permissions of the user, regenerated when the user's
+	cache is cleared or their User Permissions / shares change"""
+	return frappe.cache().hget('permission_stamp', user,
+		generator=lambda: frappe.generate_hash(length=10))
+
+def clear_permission_stamp(user=None):
+	"""Invalidate cached permissions of the user (or all users)"""
+	if user:
+		frappe.cache().hdel('permission_stamp', user)
+	else:
+		frappe.cache().delete_value('permission_stamp')
+
+	frappe.local.permission_bundles = {}
+	frappe.local.role_permissions = {}
+
+def clear_shared_permission_stamps(doctype, name):
+	"""Invalidate cached permissions of the users the document is shared with. Call before
+	its shares are changed with a query, which skips `DocShare.on_update` / `on_trash`"""
+	shares = frappe.db.sql("""select `user`, `everyone` from `tabDocShare`
+		where `share_doctype`=%s and `share_name`=%s""", (doctype, name), as_dict=True)
+
+	if any(d.everyone for d in shares):
+		clear_permission_stamp()
+	else:
+		for d in shares:
+			clear_permission_stamp(d.user)
+
 def get_user_permissions(user):
 	from frappe.core.doctype.user_permission.user_permission import get_user_permissions
 	return get_user_permissions(user)
 
 def has_user_permission(doc, user=None):
 	'''Returns True if User is allowed to view considering User Permissions'''
-	from frappe.core.doctype.user_permission.user_permission import get_user_permissions
-	user_permissions = get_user_permissions(user)
+	doctype = doc.get('doctype')
+	docname = doc.get('name')
+
+	# {link doctype: set of names allowed for doctype}
+	user_permissions = get_permission_bundle(doctype, user).user_permissions
 
 	if not user_permissions:
 		# no user permission rules specified for this doctype
@@ -219,17 +321,12 @@ def has_user_permission(doc, user=None):
 
 	apply_strict_user_permissions = frappe.get_system_settings('apply_strict_user_permissions')
 
-	doctype = doc.get('doctype')
-	docname = doc.get('name')
-
 	# STEP 1: ---------------------
 	# check user permissions on self
 	if doctype in user_permissions:
-		allowed_docs = get_allowed_docs_for_doctype(user_permissions.get(doctype, []), doctype)
-
-		# if allowed_docs is empty it states that there is no applicable permission under the current doctype
+		allowed_docs = user_permissions[doctype]
 
-		# only check if allowed_docs is not empty
+		# only check if there are permissions applicable under the current doctype
 		if allowed_docs and docname not in allowed_docs:
 			# no user permissions for this doc specified
 			push_perm_check_log(_('Not allowed for {0}: {1}').format(_(doctype), docname))
@@ -259,8 +356,8 @@ def has_user_permission(doc, user=None):
 			if field.options not in user_permissions:
 				continue
 
-			# get the list of all allowed values for this link
-			allowed_docs = get_allowed_docs_for_doctype(user_permissions.get(field.options, []), doctype)
+			# get the set of all allowed values for this link
+			allowed_docs = user_permissions[field.options]
 
 			if allowed_docs and d.get(field.fieldname) not in allowed_docs:
 				# restricted for this link field, and no matching values found
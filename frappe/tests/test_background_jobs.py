@@ -0,0 +1,37 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import frappe
+from rq.job import Job
+from frappe.utils.background_jobs import (get_redis_conn, get_queued_job_field, mark_job_as_queued,
+	unmark_job_as_queued, is_job_queued, QUEUED_JOBS_KEY)
+
+class TestBackgroundJobs(unittest.TestCase):
+	def test_queued_job_index(self):
+		conn = get_redis_conn()
+		site, job_id = frappe.local.site, 'test_queued_job_index'
+		field = get_queued_job_field(site, job_id)
+		conn.hdel(QUEUED_JOBS_KEY, field)
+
+		# a queued rq job
+		conn.hset(Job.key_for('test-job-1'), 'status', 'queued')
+		try:
+			self.assertTrue(mark_job_as_queued(site, job_id, 'test-job-1'))
+			self.assertTrue(is_job_queued(job_id))
+			self.assertFalse(mark_job_as_queued(site, job_id, 'test-job-2'))
+
+			# started, the job can be queued again
+			conn.hset(Job.key_for('test-job-1'), 'status', 'started')
+			self.assertFalse(is_job_queued(job_id))
+			self.assertTrue(mark_job_as_queued(site, job_id, 'test-job-2'))
+
+			# the entry of the new job is kept
+			unmark_job_as_queued(site, job_id, 'test-job-1')
+			self.assertEqual(frappe.safe_decode(conn.hget(QUEUED_JOBS_KEY, field)), 'test-job-2')
+
+			unmark_job_as_queued(site, job_id, 'test-job-2')
+			self.assertFalse(conn.hget(QUEUED_JOBS_KEY, field))
+		finally:
+			conn.delete(Job.key_for('test-job-1'))
+			conn.hdel(QUEUED_JOBS_KEY, field)
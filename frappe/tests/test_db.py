@@ -65,3 +65,18 @@ class TestDB(unittest.TestCase):
 		self.assertIn('tabCustom Field', frappe.flags.touched_tables)
 		frappe.flags.in_migrate = False
 		frappe.flags.touched_tables.clear()
+
+	def test_sql_iter(self):
+		names = frappe.db.sql_list("select name from tabDocType order by name")
+
+		rows = frappe.db.sql_iter("select name from tabDocType order by name", batch_size=7)
+		self.assertEqual([r[0] for r in rows], names)
+
+		batches = list(frappe.db.sql_iter("select name from tabDocType order by name", as_dict=True,
+			batch_size=7, as_batches=True))
+		self.assertEqual(len(batches[0]), 7)
+		self.assertEqual([r.name for batch in batches for r in batch], names)
+
+		rows = frappe.get_all("DocType", order_by="name", as_iterator=True)
+		self.assertFalse(isinstance(rows, list))
+		self.assertEqual([r.name for r in rows], names)
@@ -349,6 +349,45 @@ class TestReportview(unittest.TestCase):
 		self.assertTrue({'name': 'Prepared Report'} in res)
 		self.assertFalse({'name': 'Property Setter'} in res)
 
+	def test_query_plan_cache(self):
+		frappe.conf.db_query_plan_cache = 1
+		try:
+			clear_user_permissions_for_doctype('Blog Post', 'test2@example.com')
+			frappe.get_doc('User', 'test2@example.com').add_roles('Blogger')
+			frappe.set_user('test2@example.com')
+
+			all_posts = frappe.get_list('Blog Post', fields=['name'], order_by='name')
+			self.assertEqual(frappe.get_list('Blog Post', fields=['name'], order_by='name'), all_posts)
+
+			# cached conditions are invalidated with user permissions
+			add_user_permission('Blog Post', '-test-blog-post', 'test2@example.com', True)
+			self.assertEqual(frappe.get_list('Blog Post', fields=['name'],
+				filters={'name': ('like', '-test-blog-post%')}), [{'name': '-test-blog-post'}])
+
+			# filter values are not part of the plan
+			self.assertEqual(frappe.get_list('Blog Post', filters={'name': '-test-blog-post-1'}), [])
+		finally:
+			frappe.set_user('Administrator')
+			clear_user_permissions_for_doctype('Blog Post', 'test2@example.com')
+			frappe.conf.db_query_plan_cache = None
+
+	def test_permission_semi_join(self):
+		frappe.conf.permission_semi_join_threshold = 1
+		try:
+			clear_user_permissions_for_doctype('Blog Post', 'test2@example.com')
+			frappe.get_doc('User', 'test2@example.com').add_roles('Blogger')
+			add_user_permission('Blog Post', '-test-blog-post', 'test2@example.com', True)
+			add_user_permission('Blog Post', '-test-blog-post-1', 'test2@example.com', True)
+
+			frappe.set_user('test2@example.com')
+			self.assertIn('`tabUser Permission`', DatabaseQuery('Blog Post').build_match_conditions())
+			self.assertEqual(sorted(d.name for d in frappe.get_list('Blog Post')),
+				['-test-blog-post', '-test-blog-post-1'])
+		finally:
+			frappe.set_user('Administrator')
+			clear_user_permissions_for_doctype('Blog Post', 'test2@example.com')
+			frappe.conf.permission_semi_join_threshold = None
+
 
 def create_event(subject="_Test Event", starts_on=None):
 	""" create a test event """
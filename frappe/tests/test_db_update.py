@@ -33,6 +33,31 @@ class TestDBUpdate(unittest.TestCase):
 			self.assertEqual(fieldtype, table_column.type)
 			self.assertIn(table_column.default or 'NULL', [default, "'{}'".format(default)])
 
+	@unittest.skipIf(frappe.conf.db_type == 'postgres', 'MariaDB only')
+	def test_online_schema_change(self):
+		from frappe.database.mariadb.online_schema_change import copy_table, get_trigger_names
+
+		table = '_test_online_schema_change'
+		frappe.db.sql_ddl('drop table if exists `{0}`'.format(table))
+		frappe.db.sql_ddl('create table `{0}` (name varchar(140) primary key, value varchar(140))'.format(table))
+		frappe.db.sql('insert into `{0}` values {1}'.format(table,
+			', '.join("('{0:05d}', 'value {0}')".format(i) for i in range(12000))))
+		frappe.db.commit()
+
+		copy_table(table, ['ADD COLUMN `extra` int(11) not null default 0', 'ADD INDEX `value`(`value`)'])
+
+		self.assertEqual(frappe.db.sql('select count(*) from `{0}`'.format(table))[0][0], 12000)
+		self.assertEqual(frappe.db.sql('select value, extra from `{0}` where name=%s'.format(table), '00042'),
+			(('value 42', 0),))
+		self.assertTrue(frappe.db.has_index(table, 'value'))
+
+		# the shadow table and triggers are dropped
+		self.assertFalse(frappe.db.sql('show tables like %s', '_{0}_%'.format(table)))
+		self.assertFalse(frappe.db.sql('select trigger_name from information_schema.triggers where trigger_name in %s',
+			[tuple(get_trigger_names(table).values())]))
+
+		frappe.db.sql_ddl('drop table `{0}`'.format(table))
+
 def get_fieldtype_from_def(field_def):
 	fieldtuple = frappe.db.type_map.get(field_def.fieldtype, ('', 0))
 	fieldtype = fieldtuple[0]
@@ -0,0 +1,48 @@
+from __future__ import unicode_literals
+
+import json
+import unittest
+
+import frappe
+from frappe.deferred_insert import (deferred_insert, save_to_db, get_failed_records,
+	dead_letter_queue, queue_prefix)
+
+class TestDeferredInsert(unittest.TestCase):
+	def setUp(self):
+		frappe.cache().delete_value([dead_letter_queue, queue_prefix + 'Route History'])
+
+	def test_save_to_db(self):
+		route = 'test-deferred-insert/' + frappe.generate_hash(length=10)
+		deferred_insert('Route History', json.dumps([
+			{'route': route, 'user': 'Administrator'},
+			{'route': route, 'user': 'Administrator'}
+		]))
+		deferred_insert('Route History', json.dumps({'route': route, 'user': '_Test Missing User'}))
+
+		save_to_db()
+
+		self.assertEqual(frappe.db.count('Route History', {'route': route}), 2)
+
+		# the record with an invalid link is kept with its error
+		failed = get_failed_records()
+		self.assertEqual(len(failed), 1)
+		self.assertEqual(failed[0]['record']['user'], '_Test Missing User')
+		self.assertTrue(failed[0]['error'])
+
+		frappe.db.sql('delete from `tabRoute History` where route=%s', route)
+		frappe.db.commit()
+
+	def test_malformed_entries(self):
+		route = 'test-deferred-insert/' + frappe.generate_hash(length=10)
+		deferred_insert('Route History', '123')
+		deferred_insert('Route History', json.dumps([{'route': route, 'user': 'Administrator'}, 'abc']))
+		deferred_insert('Route History', json.dumps({'route': route, 'user': 'Administrator'}))
+
+		save_to_db()
+
+		# valid records of the batch are still inserted
+		self.assertEqual(frappe.db.count('Route History', {'route': route}), 2)
+		self.assertEqual(set(f['record'] for f in get_failed_records()), {123, 'abc'})
+
+		frappe.db.sql('delete from `tabRoute History` where route=%s', route)
+		frappe.db.commit()
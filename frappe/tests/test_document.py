@@ -76,6 +76,21 @@ class TestDocument(unittest.TestCase):
 		d.insert()
 		self.assertEqual(frappe.db.get_value("User", d.name), d.name)
 
+	def test_link_validation_of_children(self):
+		d = frappe.get_doc({
+			"doctype": "User",
+			"email": "test_link_validation_children@example.com",
+			"first_name": "Link Validation",
+			"roles": [{"role": "System Manager"}, {"role": "ABC"}, {"role": "XYZ"}]
+		})
+		try:
+			d.insert()
+		except frappe.LinkValidationError:
+			message = frappe.local.message_log[-1]
+			self.assertTrue("ABC" in message and "XYZ" in message)
+		else:
+			self.fail("LinkValidationError not raised")
+
 	def test_confict_validation(self):
 		d1 = self.test_insert()
 		d2 = frappe.get_doc(d1.doctype, d1.name)
@@ -253,4 +268,62 @@ class TestDocument(unittest.TestCase):
 		self.assertFalse(doc.get('dependent_field'))
 		self.assertEqual(doc.get('independent_field'), 'Some Data')
 
-		clear_custom_fields('ToDo')
\ No newline at end of file
+		clear_custom_fields('ToDo')
+
+	def test_bulk_insert(self):
+		docs = frappe.bulk_insert([{
+			"doctype": "Event",
+			"subject": "test-doc-bulk-insert {0}".format(i),
+			"starts_on": "2014-01-01",
+			"event_type": "Public",
+			"event_participants": [{
+				"reference_doctype": "User",
+				"reference_docname": "Administrator"
+			}]
+		} for i in range(3)], chunk_size=2)
+
+		self.assertEqual(len(docs), 3)
+		for d in docs:
+			self.assertFalse(d.is_new())
+			self.assertEqual(frappe.db.get_value("Event", d.name, "subject"), d.subject)
+			self.assertEqual(frappe.db.count("Event Participants", {"parent": d.name}), 1)
+
+			# default values are set as in insert
+			self.assertEqual(d.send_reminder, 1)
+
+	def test_child_table_sync(self):
+		d = frappe.get_doc({
+			"doctype": "Event",
+			"subject": "test-doc-child-table-sync",
+			"starts_on": "2014-01-01",
+			"event_type": "Public",
+			"event_participants": [{
+				"reference_doctype": "User",
+				"reference_docname": "Administrator"
+			}, {
+				"reference_doctype": "User",
+				"reference_docname": "Guest"
+			}]
+		}).insert()
+
+		# header only change, child rows are not written
+		d.subject = "test-doc-child-table-sync changed"
+		d.save()
+		self.assertEqual(d.flags.child_table_sync.skipped, 2)
+		self.assertEqual(d.flags.child_table_sync.updated, 0)
+
+		# one changed, one removed, one added
+		d.event_participants[0].reference_docname = "Guest"
+		d.remove(d.event_participants[1])
+		d.append("event_participants", {
+			"reference_doctype": "User",
+			"reference_docname": "Administrator"
+		})
+		d.save()
+		self.assertEqual(d.flags.child_table_sync.updated, 1)
+		self.assertEqual(d.flags.child_table_sync.inserted, 1)
+		self.assertEqual(d.flags.child_table_sync.deleted, 1)
+
+		d.reload()
+		self.assertEqual([p.reference_docname for p in d.event_participants],
+			["Guest", "Administrator"])
@@ -0,0 +1,31 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+from __future__ import unicode_literals
+import unittest
+import frappe
+from frappe.utils.testutils import add_custom_field, clear_custom_fields
+
+class TestMeta(unittest.TestCase):
+	def test_meta_shared_across_requests(self):
+		meta = frappe.get_meta("ToDo")
+
+		# new request
+		frappe.local.meta_cache = {}
+		frappe.local.meta_versions = None
+		self.assertTrue(frappe.get_meta("ToDo") is meta)
+
+	def test_meta_store_invalidation(self):
+		meta = frappe.get_meta("ToDo")
+		self.assertFalse(meta.has_field("test_meta_store_field"))
+
+		add_custom_field("ToDo", "test_meta_store_field", "Link", options="User")
+		frappe.local.meta_cache = {}
+		frappe.local.meta_versions = None
+
+		meta = frappe.get_meta("ToDo")
+		self.assertTrue(meta.has_field("test_meta_store_field"))
+		self.assertTrue("test_meta_store_field" in meta.get_valid_columns())
+		self.assertTrue("test_meta_store_field" in [df.fieldname for df in meta.get_link_fields()])
+
+		clear_custom_fields("ToDo")
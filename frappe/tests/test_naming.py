@@ -94,3 +94,32 @@ class TestNaming(unittest.TestCase):
 
 		self.assertEqual(count.get('current'), 2)
 		frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
+
+	def test_series_block(self):
+		from frappe.model.naming import make_autoname, series_pools
+
+		series = 'TEST-BLOCK-'
+		series_pools.pop((frappe.local.site, series), None)
+		frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
+		frappe.db.commit()
+
+		frappe.local.conf.naming_series_block_size = {series: 5}
+		try:
+			self.assertEqual(make_autoname('TEST-BLOCK-.###'), 'TEST-BLOCK-001')
+			self.assertEqual(make_autoname('TEST-BLOCK-.###'), 'TEST-BLOCK-002')
+
+			# a block of numbers is reserved and committed
+			frappe.db.rollback()
+			self.assertEqual(frappe.db.sql("""SELECT current from `tabSeries` where name = %s""", series)[0][0], 5)
+
+			# last number is returned to the pool
+			revert_series_if_last('TEST-BLOCK-.###', 'TEST-BLOCK-002')
+			self.assertEqual(make_autoname('TEST-BLOCK-.###'), 'TEST-BLOCK-002')
+
+			for i in range(4):
+				make_autoname('TEST-BLOCK-.###')
+			self.assertEqual(frappe.db.sql("""SELECT current from `tabSeries` where name = %s""", series)[0][0], 10)
+		finally:
+			frappe.local.conf.naming_series_block_size = None
+			frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
+			frappe.db.commit()
@@ -474,3 +474,21 @@ class TestPermissions(unittest.TestCase):
 
 		# reset the user
 		frappe.set_user(current_user)
+
+	def test_permission_bundle(self):
+		from frappe.permissions import get_permission_bundle
+		frappe.set_user("Administrator")
+
+		bundle = get_permission_bundle("Blog Post", "test2@example.com")
+		self.assertTrue(bundle.role_permissions.get("read"))
+		self.assertFalse(bundle.user_permissions)
+
+		add_user_permission("Blog Category", "_Test Blog Category 1", "test2@example.com")
+		frappe.share.add("Blog Post", "-test-blog-post", "test2@example.com", write=1)
+
+		bundle = get_permission_bundle("Blog Post", "test2@example.com")
+		self.assertEqual(bundle.user_permissions["Blog Category"], {"_Test Blog Category 1"})
+		self.assertIn("-test-blog-post", bundle.shared["write"])
+
+		frappe.share.remove("Blog Post", "-test-blog-post", "test2@example.com")
+		self.assertNotIn("-test-blog-post", get_permission_bundle("Blog Post", "test2@example.com").shared["write"])
@@ -0,0 +1,71 @@
+#  -*- coding: utf-8 -*-
+
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+from __future__ import unicode_literals
+import unittest
+import frappe
+import frappe.utils.redis_wrapper
+from frappe.utils.process_cache import ProcessCache
+
+
+class TestProcessCache(unittest.TestCase):
+	def test_lru_bounds(self):
+		cache = ProcessCache(max_entries=2, max_bytes=100)
+		for key in ("a", "b", "c"):
+			cache.set("meta", key, key, 10, cache.get_generation("meta"))
+
+		# oldest entry is evicted
+		self.assertEqual(cache.get("meta", "a"), (False, None))
+		self.assertEqual(cache.get("meta", "c"), (True, "c"))
+
+		cache.set("meta", "d", "d", 95, cache.get_generation("meta"))
+		self.assertEqual(cache.stats().entries, 1)
+		self.assertEqual(cache.stats().size, 95)
+
+	def test_invalidation(self):
+		cache = ProcessCache()
+		generation = cache.get_generation("meta")
+		cache.set("meta", "ToDo", {}, 1, generation)
+		cache.set("meta", "User", {}, 1, generation)
+
+		cache.invalidate("meta", "ToDo")
+		self.assertFalse(cache.get("meta", "ToDo")[0])
+		self.assertTrue(cache.get("meta", "User")[0])
+
+		# value fetched before the invalidation is not cached
+		cache.set("meta", "ToDo", {}, 1, generation)
+		self.assertFalse(cache.get("meta", "ToDo")[0])
+
+		cache.check_version("meta", b"1")
+		cache.check_version("meta", b"2")
+		self.assertFalse(cache.get("meta", "User")[0])
+
+	def test_redis_wrapper(self):
+		frappe.conf.l1_cache = 1
+		try:
+			frappe.cache().hset("app_hooks", "test_l1_cache", "value")
+			frappe.local.cache = {}
+			self.assertEqual(frappe.cache().hget("app_hooks", "test_l1_cache"), "value")
+
+			# served from process cache in the next request
+			hits = frappe.cache().get_l1_cache_stats().hits
+			frappe.local.cache = {}
+			frappe.local.l1_cache_versions = {}
+			self.assertEqual(frappe.cache().hget("app_hooks", "test_l1_cache"), "value")
+			self.assertEqual(frappe.cache().get_l1_cache_stats().hits, hits + 1)
+
+			# changes made to a value in a request are not seen by other requests
+			frappe.cache().hset("app_hooks", "test_l1_cache_list", ["a"])
+			frappe.local.cache = {}
+			frappe.cache().hget("app_hooks", "test_l1_cache_list").append("b")
+			frappe.local.cache = {}
+			self.assertEqual(frappe.cache().hget("app_hooks", "test_l1_cache_list"), ["a"])
+			frappe.cache().hdel("app_hooks", "test_l1_cache_list")
+
+			frappe.cache().hdel("app_hooks", "test_l1_cache")
+			frappe.local.cache = {}
+			self.assertEqual(frappe.cache().hget("app_hooks", "test_l1_cache"), None)
+		finally:
+			frappe.conf.l1_cache = None
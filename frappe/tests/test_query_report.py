@@ -6,9 +6,11 @@ from __future__ import unicode_literals
 import unittest
 
 import frappe
-from frappe.desk.query_report import build_xlsx_data
+from frappe.desk.query_report import build_xlsx_data, iter_xlsx_data, get_filtered_data
+from frappe.permissions import add_user_permission, clear_user_permissions_for_doctype
 import frappe.utils
 
+test_dependencies = ['Blog Post', 'Blog Category', 'User']
 
 class TestQueryReport(unittest.TestCase):
 	def test_xlsx_data_with_multiple_datatypes(self):
@@ -42,3 +44,37 @@ class TestQueryReport(unittest.TestCase):
 
 		for row in xlsx_data:
 			self.assertEqual(type(row), list)
+
+	def test_xlsx_file(self):
+		"""Rows from a generator are written to a temporary xlsx file"""
+		import os
+		from frappe.utils.xlsxutils import make_xlsx_file, read_xlsx_file_from_attached_file
+
+		columns = {0: {"label": "Column A", "fieldname": "column_a"}}
+		data = frappe._dict(columns=["column_a"], result=[{"column_a": i} for i in range(100)])
+
+		path = make_xlsx_file(iter_xlsx_data(columns, data, range(0, 100, 2)), "Query Report")
+		try:
+			rows = read_xlsx_file_from_attached_file(filepath=path)
+		finally:
+			os.remove(path)
+
+		self.assertEqual(rows[0], ["Column A"])
+		self.assertEqual([row[0] for row in rows[1:]], list(range(0, 100, 2)))
+
+	def test_filtered_data(self):
+		"""Rows linking to documents not allowed by user permissions are removed"""
+		frappe.get_doc('User', 'test2@example.com').add_roles('Blogger')
+		add_user_permission('Blog Category', '_Test Blog Category 1', 'test2@example.com')
+
+		try:
+			columns = ["Post:Data:100", "Category:Link/Blog Category:100"]
+			data = [
+				["a", "_Test Blog Category 1"],
+				["b", "_Test Blog Category 2"],
+				["c", "_Test Missing Blog Category"],
+			]
+			result = get_filtered_data('Blog Post', columns, data, 'test2@example.com')
+			self.assertEqual(result, [data[0], data[2]])
+		finally:
+			clear_user_permissions_for_doctype('Blog Category', 'test2@example.com')
@@ -0,0 +1,107 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+from __future__ import unicode_literals
+import unittest
+import frappe
+import datetime
+from frappe.utils.redis_codec import RedisCodec, loads
+
+class TestRedisWrapper(unittest.TestCase):
+	def test_hget_many(self):
+		cache = frappe.cache()
+		cache.hset("test_redis_wrapper", "a", 1)
+		cache.hset("test_redis_wrapper", "b", {"x": 2})
+
+		frappe.local.cache = {}
+		self.assertEqual(cache.hget_many("test_redis_wrapper", ["a", "b", "c"]),
+			{"a": 1, "b": {"x": 2}, "c": None})
+
+		cache.hdel_many(["test_redis_wrapper"], ["a", "b"])
+		frappe.local.cache = {}
+		self.assertEqual(cache.hget_many("test_redis_wrapper", ["a", "b"]), {"a": None, "b": None})
+
+	def test_get_values(self):
+		cache = frappe.cache()
+		cache.set_value("test_redis_wrapper_1", "one")
+		cache.set_value("test_redis_wrapper_2", [2])
+
+		frappe.local.cache = {}
+		self.assertEqual(cache.get_values(["test_redis_wrapper_1", "test_redis_wrapper_2"]),
+			{"test_redis_wrapper_1": "one", "test_redis_wrapper_2": [2]})
+
+		cache.delete_value(["test_redis_wrapper_1", "test_redis_wrapper_2"])
+
+	def test_batch(self):
+		cache = frappe.cache()
+		with cache.batch():
+			cache.hset("test_redis_wrapper", "a", 1)
+			cache.set_value("test_redis_wrapper_1", "one")
+
+			# written to local cache immediately, to redis before a read or at the end of the block
+			self.assertEqual(cache.hget("test_redis_wrapper", "a"), 1)
+			self.assertEqual(cache.hkeys("test_redis_wrapper"), [b"a"])
+
+		frappe.local.cache = {}
+		self.assertEqual(cache.hget("test_redis_wrapper", "a"), 1)
+		self.assertEqual(cache.get_value("test_redis_wrapper_1"), "one")
+
+		# values deleted in the block are not read back from redis
+		with cache.batch():
+			cache.hdel("test_redis_wrapper", "a")
+			cache.delete_value("test_redis_wrapper_1")
+			self.assertEqual(cache.hget("test_redis_wrapper", "a"), None)
+			self.assertEqual(cache.get_value("test_redis_wrapper_1"), None)
+
+		cache.delete_value(["test_redis_wrapper", "test_redis_wrapper_1"])
+
+	def test_get_keys(self):
+		cache = frappe.cache()
+		for redis_key_index in (0, 1):
+			frappe.conf.redis_key_index = redis_key_index
+			try:
+				cache.set_value("test_redis_wrapper_keys|a", 1)
+				cache.hset("test_redis_wrapper_keys|b", "x", 1)
+
+				keys = sorted(frappe.safe_decode(k) for k in cache.get_keys("test_redis_wrapper_keys|"))
+				self.assertEqual(keys, [frappe.safe_decode(cache.make_key("test_redis_wrapper_keys|a")),
+					frappe.safe_decode(cache.make_key("test_redis_wrapper_keys|b"))])
+
+				cache.delete_keys("test_redis_wrapper_keys|")
+				self.assertEqual(cache.get_keys("test_redis_wrapper_keys|"), [])
+			finally:
+				frappe.conf.redis_key_index = None
+
+	def test_codec(self):
+		value = frappe._dict(name="ToDo", fields=[{"fieldname": "description", "idx": 1}],
+			modified=datetime.datetime(2019, 1, 1, 10, 0, 0, 5), keys=("a", "b"), meta=frappe.get_meta("ToDo"))
+
+		codecs = [RedisCodec(), RedisCodec("pickle", "zlib", compression_threshold=10)]
+		try:
+			codecs.append(RedisCodec("msgpack", "zlib", compression_threshold=10))
+		except ImportError:
+			pass
+
+		for codec in codecs:
+			data = codec.dumps(value)
+			self.assertEqual(loads(data).fields, value.fields)
+			self.assertEqual(loads(data).modified, value.modified)
+			self.assertEqual(loads(data).keys, value.keys)
+
+			# objects that msgpack cannot encode are pickled
+			data = codec.dumps({"meta": value.meta})
+			self.assertEqual(loads(data)["meta"].name, "ToDo")
+
+			# keys that are not strings
+			data = codec.dumps({1: "a", ("ToDo", "Administrator"): {2: "b"}})
+			self.assertEqual(loads(data), {1: "a", ("ToDo", "Administrator"): {2: "b"}})
+
+		frappe.conf.redis_codec = "pickle"
+		frappe.conf.redis_compression = "zlib"
+		try:
+			frappe.cache().set_value("test_redis_wrapper_codec", value.fields)
+			frappe.local.cache = {}
+			self.assertEqual(frappe.cache().get_value("test_redis_wrapper_codec"), value.fields)
+			frappe.cache().delete_value("test_redis_wrapper_codec")
+		finally:
+			frappe.conf.redis_codec = frappe.conf.redis_compression = None
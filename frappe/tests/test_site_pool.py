@@ -0,0 +1,26 @@
+from __future__ import unicode_literals, print_function
+
+import unittest
+
+from frappe.utils.site_pool import run_for_sites
+
+def run_test_site(site, failing_site):
+	'''This function needs to be pickleable'''
+	print('running', site)
+	if site == failing_site:
+		raise ValueError('test failure')
+
+class TestSitePool(unittest.TestCase):
+	def test_run_for_sites(self):
+		sites = ['site{0}.test'.format(i) for i in range(5)]
+		results = run_for_sites(run_test_site, sites, 2, args=('site2.test',))
+
+		results = dict((r.site, r) for r in results)
+		self.assertEqual(sorted(results), sites)
+
+		# a failing site does not stop the others
+		for site in sites:
+			self.assertEqual(results[site].status, 'Failed' if site == 'site2.test' else 'Success')
+			self.assertEqual(results[site].output.strip().splitlines()[0], 'running ' + site)
+
+		self.assertTrue('test failure' in results['site2.test'].error)
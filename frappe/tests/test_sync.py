@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+import os
+import unittest
+import tempfile
+
+import frappe
+from frappe.model.sync import get_file_state, get_db_modified, is_synced
+
+class TestSync(unittest.TestCase):
+	def test_file_state(self):
+		fd, path = tempfile.mkstemp(suffix='.json')
+		os.close(fd)
+		try:
+			with open(path, 'w') as f:
+				f.write('{"doctype": "DocType"}')
+			state = get_file_state(path)
+
+			# touched, same content
+			os.utime(path, (state['mtime'] + 10, state['mtime'] + 10))
+			self.assertEqual(get_file_state(path, state)['hash'], state['hash'])
+
+			with open(path, 'w') as f:
+				f.write('{"doctype": "Page"}')
+			self.assertNotEqual(get_file_state(path, state)['hash'], state['hash'])
+		finally:
+			os.remove(path)
+
+		self.assertEqual(get_file_state(path), None)
+
+	def test_db_modified(self):
+		db_modified = get_db_modified([{'doctype': 'DocType', 'name': 'ToDo'},
+			[{'doctype': 'DocType', 'name': 'Note'}]])
+
+		self.assertEqual(db_modified[('DocType', 'ToDo')],
+			frappe.db.get_value('DocType', 'ToDo', 'modified'))
+		self.assertEqual(db_modified[('DocType', 'Note')],
+			frappe.db.get_value('DocType', 'Note', 'modified'))
+
+	def test_is_synced(self):
+		modified = frappe.db.get_value('DocType', 'ToDo', 'modified')
+		db_modified = {('DocType', 'ToDo'): modified}
+
+		self.assertTrue(is_synced({'docs': [['DocType', 'ToDo']], 'modified': str(modified)}, db_modified))
+
+		# changed in the database, or deleted
+		self.assertFalse(is_synced({'docs': [['DocType', 'ToDo']], 'modified': '2010-01-01 00:00:00'},
+			db_modified))
+		self.assertFalse(is_synced({'docs': [['DocType', 'ToDo']], 'modified': str(modified)}, {}))
@@ -19,6 +19,25 @@ class TestTranslate(unittest.TestCase):
 		self.assertEqual(_('Change'), 'Changement')
 		self.assertEqual(_('Change', context='Coins'), 'la monnaie')
 
+	def test_translation_catalog(self):
+		import tempfile
+		from frappe.utils.translation_catalog import Catalog, write_catalog
+
+		translations = {'Change': 'Changement', 'Submit': 'Soumettre', 'Sans traduction': '',
+			'{0} is mandatory': '{0} est obligatoire', 'Ménage': 'Ménage à trois'}
+		path = os.path.join(tempfile.mkdtemp(), 'fr.catalog')
+		write_catalog(path, translations)
+
+		catalog = Catalog(path)
+		self.assertEqual(len(catalog), 4)
+		for key, value in translations.items():
+			self.assertEqual(catalog.get(key), value or None)
+		self.assertEqual(catalog.get('Not translated'), None)
+		self.assertTrue('Submit' in catalog)
+		self.assertTrue(catalog.is_file(os.stat(path)))
+
+		os.remove(path)
+
 expected_output = [
 	('apps/frappe/frappe/tests/translation_test_file.txt', 'Warning: Unable to find {0} in any table related to {1}', 'This is some context', 2),
 	('apps/frappe/frappe/tests/translation_test_file.txt', 'Warning: Unable to find {0} in any table related to {1}', None, 4),
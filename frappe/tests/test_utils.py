@@ -124,6 +124,32 @@ class TestHTMLUtils(unittest.TestCase):
 		self.assertTrue('<h1>Hello</h1>' in clean)
 		self.assertTrue('<a href="http://test.com">text</a>' in clean)
 
+class TestSiteConfigCache(unittest.TestCase):
+	def test_cached_file_json(self):
+		import os, json, tempfile
+		from frappe import get_cached_file_json
+
+		path = os.path.join(tempfile.mkdtemp(), "site_config.json")
+		self.assertEqual(get_cached_file_json(path), None)
+
+		with open(path, "w") as f:
+			json.dump({"db_name": "a", "limits": {"users": 1}}, f)
+
+		config = get_cached_file_json(path)
+		self.assertEqual(config["db_name"], "a")
+
+		# each call gets its own copy
+		config["limits"]["users"] = 10
+		self.assertEqual(get_cached_file_json(path)["limits"]["users"], 1)
+
+		# reloaded when the file changes
+		with open(path, "w") as f:
+			json.dump({"db_name": "bc"}, f)
+		self.assertEqual(get_cached_file_json(path)["db_name"], "bc")
+
+		os.remove(path)
+		self.assertEqual(get_cached_file_json(path), None)
+
 @frappe.whitelist()
 def create_todo_records():
 	if frappe.db.get_all('ToDo', {'description': 'this is first todo'}):
@@ -155,4 +181,4 @@ def setup_workflow():
   from frappe.workflow.doctype.workflow.test_workflow import create_todo_workflow
   create_todo_workflow()
   create_todo_records()
-  frappe.clear_cache()
\ No newline at end of file
+  frappe.clear_cache()
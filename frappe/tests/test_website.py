@@ -77,3 +77,38 @@ class TestWebsite(unittest.TestCase):
 		delattr(frappe.hooks, 'website_redirects')
 		frappe.cache().delete_key('app_hooks')
 
+
+	def test_page_cache(self):
+		from frappe.website import page_cache
+
+		frappe.set_user('Guest')
+		developer_mode = frappe.conf.developer_mode
+		frappe.conf.update(website_page_cache=1, developer_mode=0)
+		try:
+			frappe.cache().delete_value(page_cache.CACHE_KEY)
+			set_request(method='GET', path='/contact', headers={'Accept-Encoding': 'gzip'})
+			self.assertEqual(page_cache.get_response(frappe.local.request), None)
+
+			page_cache.store_response(frappe.local.request, render.render())
+			response = page_cache.get_response(frappe.local.request)
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+			self.assertTrue('</html>' in frappe.safe_decode(frappe.utils.gzip_decompress(response.get_data())))
+
+			# conditional request
+			set_request(method='GET', path='/contact', headers={'Accept-Encoding': 'gzip',
+				'If-None-Match': response.headers.get('ETag')})
+			self.assertEqual(page_cache.get_response(frappe.local.request).status_code, 304)
+
+			# logged in users are not served from the cache
+			set_request(method='GET', path='/contact', headers={'Cookie': 'sid=abc'})
+			self.assertEqual(page_cache.get_response(frappe.local.request), None)
+
+			# cleared for the page in all languages
+			set_request(method='GET', path='/contact', headers={'Accept-Encoding': 'gzip'})
+			page_cache.clear('contact')
+			self.assertEqual(page_cache.get_response(frappe.local.request), None)
+		finally:
+			frappe.conf.update(website_page_cache=None, developer_mode=developer_mode)
+			frappe.cache().delete_value(page_cache.CACHE_KEY)
+			frappe.set_user('Administrator')
@@ -198,6 +198,29 @@ def get_full_dict(lang):
 
 	return frappe.local.lang_full_dict
 
+def get_translation(msg, lang):
+	"""Returns the translation of `msg` in `lang`, or None.
+
+	When the compiled catalog of the language is built, user translations are looked up
+	in a per request dict and app translations in the memory mapped catalog, so the full
+	dictionary of the language is not loaded."""
+	from frappe.utils.translation_catalog import get_catalog
+
+	catalog = get_catalog(lang) if lang != 'en' else None
+	if catalog is None:
+		return get_full_dict(lang).get(msg)
+
+	if getattr(frappe.local, 'lang_user_translations', None) is None:
+		frappe.local.lang_user_translations = {}
+
+	if lang not in frappe.local.lang_user_translations:
+		try:
+			frappe.local.lang_user_translations[lang] = get_user_translations(lang)
+		except Exception:
+			frappe.local.lang_user_translations[lang] = {}
+
+	return frappe.local.lang_user_translations[lang].get(msg) or catalog.get(msg)
+
 def load_lang(lang, apps=None):
 	"""Combine all translations from `.csv` files in all `apps`.
 	For derivative languages (es-GT), take translations from the
@@ -208,21 +231,29 @@ def load_lang(lang, apps=None):
 
 	out = frappe.cache().hget("lang_full_dict", lang, shared=True)
 	if not out:
-		out = {}
-		for app in (apps or frappe.get_all_apps(True)):
-			path = os.path.join(frappe.get_pymodule_path(app), "translations", lang + ".csv")
-			out.update(get_translation_dict_from_file(path, lang, app) or {})
-
-		if '-' in lang:
-			parent = lang.split('-')[0]
-			parent_out = load_lang(parent)
-			parent_out.update(out)
-			out = parent_out
-
+		out = get_translations_from_apps(lang, apps)
 		frappe.cache().hset("lang_full_dict", lang, out, shared=True)
 
 	return out or {}
 
+def get_translations_from_apps(lang, apps=None):
+	"""Translations of `lang` from the `.csv` files of `apps` (and of the base language), without cache"""
+	if lang=='en':
+		return {}
+
+	out = {}
+	for app in (apps or frappe.get_all_apps(True)):
+		path = os.path.join(frappe.get_pymodule_path(app), "translations", lang + ".csv")
+		out.update(get_translation_dict_from_file(path, lang, app) or {})
+
+	if '-' in lang:
+		parent = lang.split('-')[0]
+		parent_out = get_translations_from_apps(parent, apps)
+		parent_out.update(out)
+		out = parent_out
+
+	return out
+
 def get_translation_dict_from_file(path, lang, app):
 	"""load translation dict from given path"""
 	cleaned = {}
@@ -266,6 +297,7 @@ def clear_cache():
 	cache.delete_key("lang_full_dict", shared=True)
 	cache.delete_key("translation_assets", shared=True)
 	cache.delete_key("lang_user_translations")
+	frappe.local.lang_user_translations = None
 
 def get_messages_for_app(app):
 	"""Returns all messages (list) for a specified `app`"""
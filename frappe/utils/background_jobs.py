@@ -1,11 +1,12 @@
 from __future__ import unicode_literals, print_function
 import redis
-from rq import Connection, Queue, Worker
+from rq import Connection, Queue, Worker, get_current_job
+from rq.job import Job, JobStatus
 from rq.logutils import setup_loghandlers
 from frappe.utils import cstr
 from collections import defaultdict
 import frappe
-import os, socket, time
+import os, socket, time, uuid
 from frappe import _
 from six import string_types
 
@@ -21,8 +22,12 @@ queue_timeout = {
 
 redis_connection = None
 
+# hash of "site::job_id" -> rq job id, of jobs enqueued with `deduplicate` that have not started yet
+QUEUED_JOBS_KEY = 'frappe:queued_jobs'
+
 def enqueue(method, queue='default', timeout=None, event=None,
-	is_async=True, job_name=None, now=False, enqueue_after_commit=False, **kwargs):
+	is_async=True, job_name=None, now=False, enqueue_after_commit=False,
+	deduplicate=False, job_id=None, **kwargs):
 	'''
 		Enqueue method to be executed using a background worker
 
@@ -33,6 +38,8 @@ def enqueue(method, queue='default', timeout=None, event=None,
 		:param is_async: if is_async=False, the method is executed immediately, else via a worker
 		:param job_name: can be used to name an enqueue call, which can be used to prevent duplicate calls
 		:param now: if now=True, the method is executed via frappe.call
+		:param deduplicate: if deduplicate=True, the job is not enqueued if a job with the same `job_id` is already queued for the site
+		:param job_id: identifies the job for `deduplicate`, defaults to `job_name` or the method
 		:param kwargs: keyword arguments to be passed to the method
 	'''
 	# To handle older implementations
@@ -41,7 +48,6 @@ def enqueue(method, queue='default', timeout=None, event=None,
 	if now or frappe.flags.in_migrate:
 		return frappe.call(method, **kwargs)
 
-	q = get_queue(queue, is_async=is_async)
 	if not timeout:
 		timeout = queue_timeout.get(queue) or 300
 	queue_args = {
@@ -53,10 +59,17 @@ def enqueue(method, queue='default', timeout=None, event=None,
 		"is_async": is_async,
 		"kwargs": kwargs
 	}
+	if deduplicate:
+		queue_args["job_id"] = job_id or queue_args["job_name"]
+
 	if enqueue_after_commit:
 		if not frappe.flags.enqueue_after_commit:
 			frappe.flags.enqueue_after_commit = []
 
+		if deduplicate and any(job["queue_args"].get("job_id") == queue_args["job_id"]
+			for job in frappe.flags.enqueue_after_commit):
+			return frappe.flags.enqueue_after_commit
+
 		frappe.flags.enqueue_after_commit.append({
 			"queue": queue,
 			"is_async": is_async,
@@ -65,8 +78,25 @@ def enqueue(method, queue='default', timeout=None, event=None,
 		})
 		return frappe.flags.enqueue_after_commit
 	else:
-		return q.enqueue_call(execute_job, timeout=timeout,
-			kwargs=queue_args)
+		return enqueue_call(queue, is_async, timeout, queue_args)
+
+def enqueue_call(queue, is_async, timeout, queue_args):
+	'''Enqueue `execute_job` with `queue_args`. Returns None if the args have a `job_id`
+	and the job is already queued for the site'''
+	q = get_queue(queue, is_async=is_async)
+	job_id = queue_args.get("job_id")
+	if not (job_id and is_async):
+		return q.enqueue_call(execute_job, timeout=timeout, kwargs=queue_args)
+
+	rq_job_id = str(uuid.uuid4())
+	if not mark_job_as_queued(queue_args["site"], job_id, rq_job_id):
+		return None
+
+	try:
+		return q.enqueue_call(execute_job, timeout=timeout, kwargs=queue_args, job_id=rq_job_id)
+	except Exception:
+		unmark_job_as_queued(queue_args["site"], job_id, rq_job_id)
+		raise
 
 def enqueue_doc(doctype, name=None, method=None, queue='default', timeout=300,
 	now=False, **kwargs):
@@ -77,10 +107,16 @@ def enqueue_doc(doctype, name=None, method=None, queue='default', timeout=300,
 def run_doc_method(doctype, name, doc_method, **kwargs):
 	getattr(frappe.get_doc(doctype, name), doc_method)(**kwargs)
 
-def execute_job(site, method, event, job_name, kwargs, user=None, is_async=True, retry=0):
+def execute_job(site, method, event, job_name, kwargs, user=None, is_async=True, retry=0, job_id=None):
 	'''Executes job in a worker, performs commit/rollback and logs if there is any error'''
 	from frappe.utils.scheduler import log
 
+	if job_id and is_async and not retry:
+		# the job is running, the same job can be queued again
+		current_job = get_current_job()
+		if current_job:
+			unmark_job_as_queued(site, job_id, current_job.id)
+
 	if is_async:
 		frappe.connect(site)
 		if os.environ.get('CI'):
@@ -159,8 +195,64 @@ def get_worker_name(queue):
 
 	return name
 
+def get_queued_job_field(site, job_id):
+	return '{0}::{1}'.format(site, job_id)
+
+def mark_job_as_queued(site, job_id, rq_job_id):
+	'''Add the job to `QUEUED_JOBS_KEY`. Returns False if a job with the same `job_id` is
+	already queued for the site'''
+	conn = get_redis_conn()
+	field = get_queued_job_field(site, job_id)
+	if conn.hsetnx(QUEUED_JOBS_KEY, field, rq_job_id):
+		return True
+
+	queued_job_id = conn.hget(QUEUED_JOBS_KEY, field)
+	if queued_job_id is None:
+		# started in the meantime
+		return bool(conn.hsetnx(QUEUED_JOBS_KEY, field, rq_job_id))
+
+	if is_job_pending(queued_job_id):
+		return False
+
+	# the job was lost (queue emptied, worker killed), replace the stale entry
+	return bool(get_script(conn, 'compare_and_set')(keys=[QUEUED_JOBS_KEY],
+		args=[field, queued_job_id, rq_job_id]))
+
+def unmark_job_as_queued(site, job_id, rq_job_id):
+	'''Remove the job from `QUEUED_JOBS_KEY`, unless the entry is of another job'''
+	conn = get_redis_conn()
+	get_script(conn, 'compare_and_delete')(keys=[QUEUED_JOBS_KEY],
+		args=[get_queued_job_field(site, job_id), rq_job_id])
+
+def is_job_queued(job_id, site=None):
+	'''Returns True if a job enqueued with `deduplicate` and `job_id` has not started yet'''
+	queued_job_id = get_redis_conn().hget(QUEUED_JOBS_KEY,
+		get_queued_job_field(site or frappe.local.site, job_id))
+	return bool(queued_job_id) and is_job_pending(queued_job_id)
+
+def is_job_pending(rq_job_id):
+	status = get_redis_conn().hget(Job.key_for(frappe.safe_decode(rq_job_id)), 'status')
+	return frappe.safe_decode(status) in (JobStatus.QUEUED, JobStatus.DEFERRED)
+
+scripts = {
+	'compare_and_set': '''
+		if redis.call('hget', KEYS[1], ARGV[1]) == ARGV[2] then
+			return redis.call('hset', KEYS[1], ARGV[1], ARGV[3]) + 1
+		end
+		return 0''',
+	'compare_and_delete': '''
+		if redis.call('hget', KEYS[1], ARGV[1]) == ARGV[2] then
+			return redis.call('hdel', KEYS[1], ARGV[1])
+		end
+		return 0'''
+}
+
+def get_script(conn, name):
+	return conn.register_script(scripts[name])
+
 def get_jobs(site=None, queue=None, key='method'):
-	'''Gets jobs per queue or per site or both'''
+	'''Gets jobs per queue or per site or both. This reads every job in the queues,
+	use `enqueue(..., deduplicate=True)` or `is_job_queued` to check for a queued job'''
 	jobs_per_site = defaultdict(list)
 	for queue in get_queue_list(queue):
 		q = get_queue(queue)
@@ -0,0 +1,172 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""
+Process wide (L1) cache for values read from Redis.
+
+`frappe.local.cache` is thrown away at the end of every request, so every request
+re-fetches `meta`, `app_hooks` etc. from Redis. When `l1_cache` is set in site config,
+`RedisWrapper` also keeps the encoded values of `global_cache_keys`,
+`doctype_cache_keys`, permission bundles and `website_page_response` in this LRU,
+shared by all requests of the worker process.
+
+Coherence:
+
+- Writing or deleting a key / hash field increments the version of the key in the
+  Redis hash `l1_cache_version` and publishes the key on `INVALIDATION_CHANNEL`.
+- Every worker listens on the channel in a daemon thread and evicts the key.
+- In case a message is missed, the version of each key is also checked once per
+  request and all entries of a key are dropped if it has changed.
+
+Values are kept encoded and decoded once per request, so a request that changes a
+value (e.g. a docfield of a `Meta`) does not change it for other requests.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import frappe
+
+INVALIDATION_CHANNEL = 'frappe:l1_cache:invalidate'
+VERSION_KEY = 'l1_cache_version'
+
+class ProcessCache(object):
+	"""LRU cache of (key, hash field) -> value bounded by number of entries and
+	(pickled) size in bytes."""
+	def __init__(self, max_entries=2000, max_bytes=64 * 1024 * 1024):
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.lock = threading.RLock()
+		self.pid = os.getpid()
+		self.listener = None
+		self.hits = self.misses = self.evictions = self.invalidations = 0
+		self.epoch = 0
+		self.clear()
+
+	def clear(self):
+		"""Drop all entries (counters are kept)"""
+		with self.lock:
+			# (name, field) -> (value, size in bytes)
+			self.data = OrderedDict()
+			# name -> set of fields cached for the name
+			self.fields = {}
+			# name -> version of the name in redis when its entries were cached
+			self.versions = {}
+			# name -> local invalidation counter, to discard values fetched before an invalidation
+			self.generations = {}
+			self.size = 0
+			self.epoch += 1
+
+	def get(self, name, field=None):
+		"""Returns (found, value)"""
+		with self.lock:
+			entry = self.data.get((name, field))
+			if entry is None:
+				self.misses += 1
+				return False, None
+
+			# mark as recently used
+			del self.data[(name, field)]
+			self.data[(name, field)] = entry
+			self.hits += 1
+			return True, entry[0]
+
+	def set(self, name, field, value, size, generation):
+		"""Cache the value fetched from redis, unless it was invalidated while fetching"""
+		if size > self.max_bytes:
+			return
+
+		with self.lock:
+			if self.get_generation(name) != generation:
+				return
+
+			self._pop(name, field)
+			self.data[(name, field)] = (value, size)
+			self.fields.setdefault(name, set()).add(field)
+			self.size += size
+
+			while self.data and (len(self.data) > self.max_entries or self.size > self.max_bytes):
+				(_name, _field), entry = self.data.popitem(last=False)
+				self.fields[_name].discard(_field)
+				self.size -= entry[1]
+				self.evictions += 1
+
+	def get_generation(self, name):
+		return self.epoch, self.generations.get(name, 0)
+
+	def invalidate(self, name, field=None):
+		"""Evict `field` of `name` or all entries of `name` if `field` is None"""
+		with self.lock:
+			self.generations[name] = self.generations.get(name, 0) + 1
+			self.invalidations += 1
+			if field is None:
+				for _field in list(self.fields.get(name, ())):
+					self._pop(name, _field)
+			else:
+				self._pop(name, field)
+
+	def check_version(self, name, version):
+		"""Drop all entries of `name` if its version in redis has changed since they were cached"""
+		with self.lock:
+			if self.versions.get(name) != version:
+				if name in self.versions:
+					self.invalidate(name)
+				self.versions[name] = version
+
+	def _pop(self, name, field):
+		entry = self.data.pop((name, field), None)
+		if entry is not None:
+			self.fields[name].discard(field)
+			self.size -= entry[1]
+
+	def stats(self):
+		with self.lock:
+			return frappe._dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+				invalidations=self.invalidations, entries=len(self.data), size=self.size,
+				max_entries=self.max_entries, max_bytes=self.max_bytes,
+				listening=bool(self.listener and self.listener.is_alive()))
+
+	def ensure_listener(self, redis_connection):
+		"""Start the invalidation listener thread (again, after a fork)"""
+		if self.pid != os.getpid():
+			# threads and cached entries are not carried over to forked workers
+			self.pid = os.getpid()
+			self.listener = None
+			self.clear()
+
+		if self.listener and self.listener.is_alive():
+			return
+
+		with self.lock:
+			if not (self.listener and self.listener.is_alive()):
+				self.listener = InvalidationListener(self, redis_connection)
+				self.listener.start()
+
+class InvalidationListener(threading.Thread):
+	"""Daemon thread that evicts keys published on `INVALIDATION_CHANNEL`"""
+	def __init__(self, process_cache, redis_connection):
+		super(InvalidationListener, self).__init__(name='frappe-l1-cache-invalidation')
+		self.daemon = True
+		self.process_cache = process_cache
+		self.redis_connection = redis_connection
+
+	def run(self):
+		while True:
+			try:
+				pubsub = self.redis_connection.pubsub(ignore_subscribe_messages=True)
+				pubsub.subscribe(INVALIDATION_CHANNEL)
+				for message in pubsub.listen():
+					if message.get('type') == 'message':
+						name, field = json.loads(frappe.safe_decode(message['data']))
+						self.process_cache.invalidate(name, field)
+			except Exception:
+				# messages may have been missed while disconnected
+				self.process_cache.clear()
+				time.sleep(1)
+
+def make_invalidation_message(name, field=None):
+	return json.dumps([name, field])
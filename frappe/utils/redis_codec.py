@@ -0,0 +1,273 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""
+Serialization of values stored in Redis by `RedisWrapper`.
+
+The codec is selected in site config:
+
+	"redis_codec": "pickle" | "msgpack",
+	"redis_compression": "zstd" | "lz4" | "zlib",
+	"redis_compression_threshold": 4096
+
+Values written with a configured codec are prefixed with a tag byte that records
+the serializer and compression, so every worker can read values written with any
+codec. Untagged values are plain pickles, which is also what is written when
+`redis_codec` is not set. To migrate a deployment, first update all workers (and
+install `msgpack` / `zstandard` / `lz4` if needed), then set `redis_codec`.
+
+msgpack is much faster to decode than pickle for large dicts (meta, bootinfo), but
+cannot represent arbitrary objects. Values that it cannot encode (e.g. `Meta` or
+`Document` objects) are pickled instead.
+
+To compare codecs for payloads of the current site:
+
+	bench --site [sitename] execute frappe.utils.redis_codec.benchmark
+"""
+
+from __future__ import unicode_literals, print_function
+
+import datetime
+import decimal
+import zlib
+import timeit
+from six.moves import cPickle as pickle
+from six import PY2, text_type
+
+import frappe
+
+# tag byte -> (serializer, compression)
+# pickle opcodes are printable ascii or >= 0x80, so these never start a plain pickle
+TAGS = {
+	b'\x01': ('pickle', None),
+	b'\x02': ('msgpack', None),
+	b'\x03': ('pickle', 'zlib'),
+	b'\x04': ('msgpack', 'zlib'),
+	b'\x05': ('pickle', 'zstd'),
+	b'\x06': ('msgpack', 'zstd'),
+	b'\x07': ('pickle', 'lz4'),
+	b'\x08': ('msgpack', 'lz4'),
+}
+TAG_FOR = {codec: tag for tag, codec in TAGS.items()}
+
+DEFAULT_COMPRESSION_THRESHOLD = 4096
+
+# msgpack extension types
+EXT_DICT = 1
+EXT_TUPLE = 2
+EXT_SET = 3
+EXT_DATETIME = 4
+EXT_DATE = 5
+EXT_TIME = 6
+EXT_TIMEDELTA = 7
+EXT_DECIMAL = 8
+
+_codec_cache = {}
+
+class RedisCodec(object):
+	"""Encode / decode values for `RedisWrapper`"""
+	def __init__(self, serializer=None, compression=None, compression_threshold=None):
+		if serializer not in (None, 'pickle', 'msgpack'):
+			raise ValueError('Unknown redis_codec: {0}'.format(serializer))
+		if compression not in (None, 'zlib', 'zstd', 'lz4'):
+			raise ValueError('Unknown redis_compression: {0}'.format(compression))
+
+		self.serializer = serializer
+		self.compression = compression
+		self.compression_threshold = compression_threshold or DEFAULT_COMPRESSION_THRESHOLD
+
+		if serializer == 'msgpack':
+			import_module('msgpack')
+		if compression:
+			get_compressor(compression)
+
+	def dumps(self, value):
+		if not self.serializer:
+			# legacy, readable by workers that do not know about tags
+			return pickle.dumps(value)
+
+		serializer = self.serializer
+		data = None
+		if serializer == 'msgpack':
+			try:
+				data = msgpack_dumps(value)
+			except (TypeError, ValueError, OverflowError):
+				serializer = 'pickle'
+
+		if data is None:
+			data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+		compression = None
+		if self.compression and len(data) > self.compression_threshold:
+			compression = self.compression
+			data = get_compressor(compression)[0](data)
+
+		return TAG_FOR[(serializer, compression)] + data
+
+	def loads(self, data):
+		return loads(data)
+
+def loads(data):
+	"""Decode a value written with any codec"""
+	codec = TAGS.get(data[:1])
+	if not codec:
+		return pickle.loads(data)
+
+	serializer, compression = codec
+	data = data[1:]
+	if compression:
+		data = get_compressor(compression)[1](data)
+
+	if serializer == 'msgpack':
+		return msgpack_loads(data)
+
+	return pickle.loads(data)
+
+def get_codec():
+	"""Returns the codec configured for the current site"""
+	conf = getattr(frappe.local, 'conf', None) or {}
+	key = (conf.get('redis_codec'), conf.get('redis_compression'),
+		conf.get('redis_compression_threshold'))
+
+	codec = _codec_cache.get(key)
+	if not codec:
+		codec = _codec_cache[key] = RedisCodec(*key)
+
+	return codec
+
+def get_compressor(compression):
+	"""Returns (compress, decompress) functions"""
+	if compression == 'zlib':
+		return zlib.compress, zlib.decompress
+
+	if compression == 'zstd':
+		zstandard = import_module('zstandard')
+		return (lambda data: zstandard.ZstdCompressor().compress(data),
+			lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+	if compression == 'lz4':
+		lz4_frame = import_module('lz4.frame')
+		return lz4_frame.compress, lz4_frame.decompress
+
+	raise ValueError('Unknown redis_compression: {0}'.format(compression))
+
+def import_module(name):
+	try:
+		return frappe.get_module(name)
+	except ImportError:
+		raise ImportError('{0} is required for the configured redis codec. Please install it with `bench pip install {1}`'
+			.format(name, name.split('.')[0]))
+
+def msgpack_dumps(value):
+	msgpack = import_module('msgpack')
+	return msgpack.packb(value, default=encode_ext, use_bin_type=True, strict_types=True)
+
+def msgpack_loads(data):
+	msgpack = import_module('msgpack')
+	# keys of cached dicts can be ints or tuples, not just strings
+	return msgpack.unpackb(data, ext_hook=decode_ext, raw=False, strict_map_key=False)
+
+def encode_ext(obj):
+	msgpack = import_module('msgpack')
+	packb = lambda value: msgpack.packb(value, default=encode_ext, use_bin_type=True, strict_types=True)
+
+	if isinstance(obj, frappe._dict):
+		return msgpack.ExtType(EXT_DICT, packb(dict(obj)))
+
+	# with strict_types, subclasses of dict, list and str are passed here
+	if isinstance(obj, dict):
+		if type(obj) is not dict and type(obj).__module__ != 'collections':
+			raise TypeError('Cannot encode {0}'.format(type(obj)))
+		return dict(obj)
+
+	if isinstance(obj, tuple):
+		return msgpack.ExtType(EXT_TUPLE, packb(list(obj)))
+
+	if isinstance(obj, (set, frozenset)):
+		return msgpack.ExtType(EXT_SET, packb(list(obj)))
+
+	if isinstance(obj, (datetime.datetime, datetime.time)) and obj.tzinfo:
+		raise TypeError('Cannot encode timezone aware {0}'.format(type(obj)))
+
+	if isinstance(obj, datetime.datetime):
+		return msgpack.ExtType(EXT_DATETIME, packb(obj.isoformat()))
+
+	if isinstance(obj, datetime.date):
+		return msgpack.ExtType(EXT_DATE, packb(obj.isoformat()))
+
+	if isinstance(obj, datetime.time):
+		return msgpack.ExtType(EXT_TIME, packb(obj.isoformat()))
+
+	if isinstance(obj, datetime.timedelta):
+		return msgpack.ExtType(EXT_TIMEDELTA, packb([obj.days, obj.seconds, obj.microseconds]))
+
+	if isinstance(obj, decimal.Decimal):
+		return msgpack.ExtType(EXT_DECIMAL, packb(text_type(obj)))
+
+	if PY2 and isinstance(obj, str):
+		return obj.decode('utf-8')
+
+	if isinstance(obj, text_type):
+		return text_type(obj)
+
+	raise TypeError('Cannot encode {0}'.format(type(obj)))
+
+def decode_ext(code, data):
+	value = msgpack_loads(data)
+	if code == EXT_DICT:
+		return frappe._dict(value)
+	if code == EXT_TUPLE:
+		return tuple(value)
+	if code == EXT_SET:
+		return set(value)
+	if code == EXT_DATETIME:
+		return parse_isoformat(value, '%Y-%m-%dT%H:%M:%S')
+	if code == EXT_DATE:
+		return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+	if code == EXT_TIME:
+		return parse_isoformat(value, '%H:%M:%S').time()
+	if code == EXT_TIMEDELTA:
+		return datetime.timedelta(*value)
+	if code == EXT_DECIMAL:
+		return decimal.Decimal(value)
+
+	raise ValueError('Unknown msgpack extension type {0}'.format(code))
+
+def parse_isoformat(value, fmt):
+	if '.' in value:
+		fmt += '.%f'
+	return datetime.datetime.strptime(value, fmt)
+
+def get_benchmark_payloads():
+	from frappe.boot import get_bootinfo
+
+	payloads = {}
+	for doctype in ('DocType', 'User', 'ToDo'):
+		meta = frappe.get_meta(doctype)
+		payloads['meta:' + doctype] = meta
+		payloads['meta dict:' + doctype] = meta.as_dict()
+
+	payloads['bootinfo'] = get_bootinfo()
+	return payloads
+
+def benchmark(number=200):
+	"""Print payload size and encode / decode time of each codec for meta and bootinfo
+	of the current site"""
+	codecs = [('pickle (legacy)', RedisCodec())]
+	for serializer in ('pickle', 'msgpack'):
+		for compression in (None, 'zlib', 'zstd', 'lz4'):
+			name = serializer + (('+' + compression) if compression else '')
+			try:
+				codecs.append((name, RedisCodec(serializer, compression)))
+			except ImportError as e:
+				print('skipping {0}: {1}'.format(name, e))
+
+	for payload_name, value in get_benchmark_payloads().items():
+		print('\n{0}'.format(payload_name))
+		print('{0:<20} {1:>10} {2:>12} {3:>12}'.format('codec', 'bytes', 'dumps (ms)', 'loads (ms)'))
+		for name, codec in codecs:
+			data = codec.dumps(value)
+			dumps_time = timeit.timeit(lambda: codec.dumps(value), number=number) * 1000 / number
+			loads_time = timeit.timeit(lambda: loads(data), number=number) * 1000 / number
+			if codec.serializer == 'msgpack' and TAGS[data[:1]][0] != 'msgpack':
+				name += ' (pickled)'
+			print('{0:<20} {1:>10} {2:>12.3f} {3:>12.3f}'.format(name, len(data), dumps_time, loads_time))
@@ -3,9 +3,15 @@
 from __future__ import unicode_literals
 
 import redis, frappe, re
-from six.moves import cPickle as pickle
+from contextlib import contextmanager
+from frappe.utils.redis_codec import get_codec, loads
 from frappe.utils import cstr
-from six import iteritems
+from frappe.utils.process_cache import (ProcessCache, INVALIDATION_CHANNEL, VERSION_KEY,
+	make_invalidation_message)
+from six import iteritems, string_types
+
+process_cache = None
+l1_cache_keys = None
 
 
 class RedisWrapper(redis.Redis):
@@ -42,14 +48,17 @@ class RedisWrapper(redis.Redis):
 			frappe.local.cache[key] = val
 
 		try:
-			if expires_in_sec:
-				self.setex(key, pickle.dumps(val), expires_in_sec)
-			else:
-				self.set(key, pickle.dumps(val))
+			with self.indexed_write(key):
+				if expires_in_sec:
+					self.get_writer().setex(key, get_codec().dumps(val), expires_in_sec)
+				else:
+					self.get_writer().set(key, get_codec().dumps(val))
 
 		except redis.exceptions.ConnectionError:
 			return None
 
+		self.invalidate_l1_cache(key)
+
 	def get_value(self, key, generator=None, user=None, expires=False):
 		"""Returns cache value. If not found and generator function is
 			given, it will call the generator.
@@ -65,14 +74,26 @@ class RedisWrapper(redis.Redis):
 			val = frappe.local.cache[key]
 
 		else:
-			val = None
-			try:
-				val = self.get(key)
-			except redis.exceptions.ConnectionError:
-				pass
-
-			if val is not None:
-				val = pickle.loads(val)
+			val, found = None, False
+
+			l1_cache = None if (user or expires) else self.get_l1_cache(key)
+			if l1_cache:
+				found, val = l1_cache.get(frappe.safe_decode(key))
+				if found:
+					val = loads(val)
+				generation = l1_cache.get_generation(frappe.safe_decode(key))
+
+			if not found:
+				self.flush_batch()
+				try:
+					val = self.get(key)
+				except redis.exceptions.ConnectionError:
+					pass
+
+				if val is not None:
+					if l1_cache:
+						l1_cache.set(frappe.safe_decode(key), None, val, len(val), generation)
+					val = loads(val)
 
 			if not expires:
 				if val is None and generator:
@@ -94,20 +115,83 @@ class RedisWrapper(redis.Redis):
 	def get_keys(self, key):
 		"""Return keys starting with `key`."""
 		try:
-			key = self.make_key(key + "*")
-			return self.keys(key)
+			return list(self.iter_keys(key))
 
 		except redis.exceptions.ConnectionError:
+			key = self.make_key(key + "*")
 			regex = re.compile(cstr(key).replace("|", "\|").replace("*", "[\w]*"))
 			return [k for k in list(frappe.local.cache) if regex.match(k.decode())]
 
+	def iter_keys(self, key):
+		"""Iterate over keys starting with `key` using `SCAN`, which (unlike `KEYS`) does
+		not block the server. If `redis_key_index` is set in site config, only the site's
+		key index is scanned (see `indexed_write`)."""
+		self.flush_batch()
+		pattern = self.make_key(key + "*")
+		if self.is_key_index_enabled():
+			keys = super(RedisWrapper, self).sscan_iter(self.get_key_index_name(), match=pattern,
+				count=1000)
+		else:
+			keys = self.scan_iter(match=pattern, count=1000)
+
+		for k in keys:
+			yield k
+
 	def delete_keys(self, key):
 		"""Delete keys with wildcard `*`."""
 		try:
-			self.delete_value(self.get_keys(key), make_keys=False)
+			keys = []
+			for k in self.iter_keys(key):
+				keys.append(k)
+				if len(keys) >= 1000:
+					self.delete_value(keys, make_keys=False)
+					keys = []
+
+			self.delete_value(keys, make_keys=False)
 		except redis.exceptions.ConnectionError:
 			pass
 
+	@staticmethod
+	def is_key_index_enabled():
+		conf = getattr(frappe.local, 'conf', None)
+		return bool(conf and conf.get('redis_key_index'))
+
+	def get_key_index_name(self):
+		return self.make_key('__key_index')
+
+	@contextmanager
+	def indexed_write(self, key):
+		"""Add `key` to the site's key index (if `redis_key_index` is enabled) in the same
+		round trip as the writes made in the block.
+
+		With the index, wildcard lookups and deletes (`get_keys`, `delete_keys`) scan only
+		the keys of the site instead of the whole keyspace of a shared Redis server. Only
+		keys written through this wrapper are indexed, so run `rebuild_key_index` after
+		enabling it. Keys that expire stay in the index until deleted via `delete_keys`."""
+		if not self.is_key_index_enabled():
+			yield
+			return
+
+		with self.batch():
+			yield
+			self.get_writer().sadd(self.get_key_index_name(), key)
+
+	def rebuild_key_index(self):
+		"""Rebuild the site's key index by scanning the keyspace"""
+		index_name = self.get_key_index_name()
+		super(RedisWrapper, self).delete(index_name)
+
+		keys = []
+		for k in self.scan_iter(match=self.make_key("*"), count=1000):
+			if k != index_name:
+				keys.append(k)
+			if len(keys) >= 1000:
+				super(RedisWrapper, self).sadd(index_name, *keys)
+				keys = []
+
+		if keys:
+			super(RedisWrapper, self).sadd(index_name, *keys)
+
 	def delete_key(self, *args, **kwargs):
 		self.delete_value(*args, **kwargs)
 
@@ -116,28 +200,45 @@ class RedisWrapper(redis.Redis):
 		if not isinstance(keys, (list, tuple)):
 			keys = (keys, )
 
-		for key in keys:
-			if make_keys:
-				key = self.make_key(key, shared=shared)
+		if make_keys:
+			keys = [self.make_key(key, shared=shared) for key in keys]
+
+		if not keys:
+			return
 
+		for key in keys:
 			if key in frappe.local.cache:
 				del frappe.local.cache[key]
 
-			try:
-				self.delete(key)
-			except redis.exceptions.ConnectionError:
-				pass
+		try:
+			if self.is_key_index_enabled():
+				with self.batch():
+					self.get_writer().delete(*keys)
+					self.get_writer().srem(self.get_key_index_name(), *keys)
+			else:
+				self.get_writer().delete(*keys)
+		except redis.exceptions.ConnectionError:
+			pass
+
+		for key in keys:
+			self.invalidate_l1_cache(key)
 
 	def lpush(self, key, value):
-		super(RedisWrapper, self).lpush(self.make_key(key), value)
+		key = self.make_key(key)
+		with self.indexed_write(key):
+			self.get_writer().lpush(key, value)
 
 	def rpush(self, key, value):
-		super(RedisWrapper, self).rpush(self.make_key(key), value)
+		key = self.make_key(key)
+		with self.indexed_write(key):
+			self.get_writer().rpush(key, value)
 
 	def lpop(self, key):
+		self.flush_batch()
 		return super(RedisWrapper, self).lpop(self.make_key(key))
 
 	def llen(self, key):
+		self.flush_batch()
 		return super(RedisWrapper, self).llen(self.make_key(key))
 
 	def hset(self, name, key, value, shared=False):
@@ -150,13 +251,17 @@ class RedisWrapper(redis.Redis):
 
 		# set in redis
 		try:
-			super(RedisWrapper, self).hset(_name,
-				key, pickle.dumps(value))
+			with self.indexed_write(_name):
+				self.get_writer().hset(_name,
+					key, get_codec().dumps(value))
 		except redis.exceptions.ConnectionError:
 			pass
 
+		self.invalidate_l1_cache(_name, key)
+
 	def hgetall(self, name):
-		return {key: pickle.loads(value) for key, value in
+		self.flush_batch()
+		return {key: loads(value) for key, value in
 			iteritems(super(RedisWrapper, self).hgetall(self.make_key(name)))}
 
 	def hget(self, name, key, generator=None, shared=False):
@@ -167,14 +272,26 @@ class RedisWrapper(redis.Redis):
 		if key in frappe.local.cache[_name]:
 			return frappe.local.cache[_name][key]
 
+		l1_cache = self.get_l1_cache(_name) if isinstance(key, string_types) else None
+		if l1_cache:
+			found, value = l1_cache.get(frappe.safe_decode(_name), key)
+			if found:
+				value = frappe.local.cache[_name][key] = loads(value)
+				return value
+
+			generation = l1_cache.get_generation(frappe.safe_decode(_name))
+
 		value = None
+		self.flush_batch()
 		try:
 			value = super(RedisWrapper, self).hget(_name, key)
 		except redis.exceptions.ConnectionError:
 			pass
 
 		if value:
-			value = pickle.loads(value)
+			if l1_cache:
+				l1_cache.set(frappe.safe_decode(_name), key, value, len(value), generation)
+			value = loads(value)
 			frappe.local.cache[_name][key] = value
 		elif generator:
 			value = generator()
@@ -191,17 +308,253 @@ class RedisWrapper(redis.Redis):
 			if key in frappe.local.cache[_name]:
 				del frappe.local.cache[_name][key]
 		try:
-			super(RedisWrapper, self).hdel(_name, key)
+			self.get_writer().hdel(_name, key)
+		except redis.exceptions.ConnectionError:
+			pass
+
+		self.invalidate_l1_cache(_name, key)
+
+	def hget_many(self, name, keys, shared=False):
+		"""Returns a dict of values for multiple keys of a hash. Keys not in
+		`frappe.local.cache` are fetched with one `HMGET`.
+
+		:param name: Hash name.
+		:param keys: List of hash keys."""
+		_name = self.make_key(name, shared=shared)
+		if not _name in frappe.local.cache:
+			frappe.local.cache[_name] = {}
+		local_cache = frappe.local.cache[_name]
+
+		out, to_fetch = {}, []
+		l1_cache = self.get_l1_cache(_name)
+		if l1_cache:
+			generation = l1_cache.get_generation(frappe.safe_decode(_name))
+
+		for key in keys:
+			if key in local_cache:
+				out[key] = local_cache[key]
+				continue
+
+			if l1_cache and isinstance(key, string_types):
+				found, value = l1_cache.get(frappe.safe_decode(_name), key)
+				if found:
+					out[key] = local_cache[key] = loads(value)
+					continue
+
+			to_fetch.append(key)
+
+		if to_fetch:
+			self.flush_batch()
+			try:
+				values = super(RedisWrapper, self).hmget(_name, to_fetch)
+			except redis.exceptions.ConnectionError:
+				values = [None] * len(to_fetch)
+
+			for key, value in zip(to_fetch, values):
+				if value:
+					if l1_cache and isinstance(key, string_types):
+						l1_cache.set(frappe.safe_decode(_name), key, value, len(value), generation)
+					value = loads(value)
+					local_cache[key] = value
+				else:
+					value = None
+				out[key] = value
+
+		return out
+
+	def hdel_many(self, names, keys, shared=False):
+		"""Delete keys from multiple hashes in one round trip.
+
+		:param names: Hash name or list of hash names.
+		:param keys: Key or list of keys to be deleted from each hash."""
+		if not isinstance(names, (list, tuple)):
+			names = (names, )
+		if not isinstance(keys, (list, tuple)):
+			keys = (keys, )
+
+		if not keys:
+			return
+
+		with self.batch():
+			for name in names:
+				_name = self.make_key(name, shared=shared)
+
+				local_cache = frappe.local.cache.get(_name)
+				if local_cache:
+					for key in keys:
+						local_cache.pop(key, None)
+
+				self.get_writer().hdel(_name, *keys)
+
+				for key in keys:
+					self.invalidate_l1_cache(_name, key)
+
+	def get_values(self, keys, user=None):
+		"""Returns a dict of cache values for multiple keys. Keys not in
+		`frappe.local.cache` are fetched with one `MGET`.
+
+		:param keys: List of cache keys.
+		:param user: Prepends keys with User."""
+		out, to_fetch = {}, {}
+		for key in keys:
+			_key = self.make_key(key, user)
+			if _key in frappe.local.cache:
+				out[key] = frappe.local.cache[_key]
+				continue
+
+			l1_cache = None if user else self.get_l1_cache(_key)
+			if l1_cache:
+				found, value = l1_cache.get(frappe.safe_decode(_key))
+				if found:
+					out[key] = frappe.local.cache[_key] = loads(value)
+					continue
+
+			to_fetch[_key] = (key, l1_cache,
+				l1_cache and l1_cache.get_generation(frappe.safe_decode(_key)))
+
+		if to_fetch:
+			self.flush_batch()
+			try:
+				values = self.mget(list(to_fetch))
+			except redis.exceptions.ConnectionError:
+				values = [None] * len(to_fetch)
+
+			for (_key, (key, l1_cache, generation)), value in zip(iteritems(to_fetch), values):
+				if value is not None:
+					if l1_cache:
+						l1_cache.set(frappe.safe_decode(_key), None, value, len(value), generation)
+					value = loads(value)
+
+				out[key] = frappe.local.cache[_key] = value
+
+		return out
+
+	@contextmanager
+	def batch(self):
+		"""Send writes (`set_value`, `delete_value`, `hset`, `hdel`) made in the block
+		in one pipeline round trip at the end of the block. Values are still written to
+		`frappe.local.cache` immediately. A read from Redis in the block (`get_value`,
+		`hget`, `hkeys`, `get_keys`, `smembers` etc.) sends the queued writes first, so
+		that it does not see a value that was deleted in the block.
+
+		Example:
+
+			with frappe.cache().batch():
+				for user in users:
+					frappe.cache().hdel("bootinfo", user)
+		"""
+		if getattr(frappe.local, 'redis_batch', None) is not None:
+			# nested, sent by the outer block
+			yield
+			return
+
+		frappe.local.redis_batch = self.pipeline(transaction=False)
+		try:
+			yield
+		finally:
+			# send even if the block failed, queued deletes must not be lost
+			pipeline, frappe.local.redis_batch = frappe.local.redis_batch, None
+			try:
+				pipeline.execute()
+			except redis.exceptions.ConnectionError:
+				pass
+
+	def flush_batch(self):
+		"""Send the writes queued in the current `batch` block"""
+		pipeline = getattr(frappe.local, 'redis_batch', None)
+		if pipeline is not None and len(pipeline):
+			try:
+				pipeline.execute()
+			except redis.exceptions.ConnectionError:
+				pass
+
+	def get_writer(self):
+		"""Returns the pipeline of the current `batch` block, or this connection"""
+		pipeline = getattr(frappe.local, 'redis_batch', None)
+		if pipeline is not None:
+			return pipeline
+		return super(RedisWrapper, self)
+
+	def get_l1_cache(self, name):
+		"""Returns the process wide cache (see `frappe.utils.process_cache`) if `l1_cache` is
+		enabled in site config and `name` is one of the global or doctype cache keys.
+
+		:param name: Redis key (with prefix)."""
+		if not self.is_l1_cache_key(name):
+			return None
+
+		l1_cache = get_process_cache()
+		l1_cache.ensure_listener(self)
+
+		# in case an invalidation message was missed, check the version once per request
+		name = frappe.safe_decode(name)
+		versions = getattr(frappe.local, 'l1_cache_versions', None)
+		if versions is None:
+			versions = frappe.local.l1_cache_versions = {}
+
+		if name not in versions:
+			try:
+				version = super(RedisWrapper, self).hget(VERSION_KEY, name)
+			except redis.exceptions.ConnectionError:
+				return None
+
+			l1_cache.check_version(name, version)
+			versions[name] = version
+
+		return l1_cache
+
+	def invalidate_l1_cache(self, name, key=None):
+		"""Evict `name` (or hash field `key` of `name`) from the process wide cache of all workers.
+		The version of `name` is incremented, so that workers that missed the message drop
+		all its values.
+
+		:param name: Redis key (with prefix).
+		:param key: Hash field, if None all values of `name` are evicted."""
+		if not self.is_l1_cache_key(name):
+			return
+
+		name = frappe.safe_decode(name)
+		if key is not None:
+			key = cstr(key)
+
+		if process_cache:
+			process_cache.invalidate(name, key)
+
+		try:
+			self.get_writer().hincrby(VERSION_KEY, name, 1)
+			self.get_writer().publish(INVALIDATION_CHANNEL, make_invalidation_message(name, key))
 		except redis.exceptions.ConnectionError:
 			pass
 
+	@staticmethod
+	def is_l1_cache_key(name):
+		global l1_cache_keys
+		conf = getattr(frappe.local, 'conf', None)
+		if not (conf and conf.get('l1_cache')):
+			return False
+
+		if l1_cache_keys is None:
+			from frappe.cache_manager import global_cache_keys, doctype_cache_keys
+			l1_cache_keys = frozenset(global_cache_keys + doctype_cache_keys
+				+ ('website_page_response',))
+
+		name = frappe.safe_decode(name).split('|', 1)[-1]
+
+		# permission bundles are kept in a hash per user (`user:[user]:permission_bundle`)
+		return name in l1_cache_keys or name.endswith(':permission_bundle')
+
+	def get_l1_cache_stats(self):
+		"""Returns hit / miss counters of the process wide cache"""
+		return process_cache.stats() if process_cache else None
+
 	def hdel_keys(self, name_starts_with, key):
 		"""Delete hash names with wildcard `*` and key"""
 		for name in frappe.cache().get_keys(name_starts_with):
-			name = name.split("|", 1)[1]
+			name = frappe.safe_decode(name).split("|", 1)[1]
 			self.hdel(name, key)
 
 	def hkeys(self, name):
+		self.flush_batch()
 		try:
 			return super(RedisWrapper, self).hkeys(self.make_key(name))
 		except redis.exceptions.ConnectionError:
@@ -209,7 +562,9 @@ class RedisWrapper(redis.Redis):
 
 	def sadd(self, name, *values):
 		"""Add a member/members to a given set"""
-		super(RedisWrapper, self).sadd(self.make_key(name), *values)
+		name = self.make_key(name)
+		with self.indexed_write(name):
+			self.get_writer().sadd(name, *values)
 
 	def srem(self, name, *values):
 		"""Remove a specific member/list of members from the set"""
@@ -217,17 +572,28 @@ class RedisWrapper(redis.Redis):
 
 	def sismember(self, name, value):
 		"""Returns True or False based on if a given value is present in the set"""
+		self.flush_batch()
 		return super(RedisWrapper, self).sismember(self.make_key(name), value)
 
 	def spop(self, name):
 		"""Removes and returns a random member from the set"""
+		self.flush_batch()
 		return super(RedisWrapper, self).spop(self.make_key(name))
 
 	def srandmember(self, name, count=None):
 		"""Returns a random member from the set"""
+		self.flush_batch()
 		return super(RedisWrapper, self).srandmember(self.make_key(name))
 
 	def smembers(self, name):
 		"""Return all members of the set"""
+		self.flush_batch()
 		return super(RedisWrapper, self).smembers(self.make_key(name))
 
+def get_process_cache():
+	global process_cache
+	if not process_cache:
+		conf = frappe.local.conf
+		process_cache = ProcessCache(max_entries=conf.get('l1_cache_max_entries') or 2000,
+			max_bytes=conf.get('l1_cache_max_bytes') or 64 * 1024 * 1024)
+	return process_cache
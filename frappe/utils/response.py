@@ -45,7 +45,8 @@ def build_response(response_type=None):
 		'pdf': as_pdf,
 		'page': as_page,
 		'redirect': redirect,
-		'binary': as_binary
+		'binary': as_binary,
+		'file': as_file
 	}
 
 	return response_type_map[frappe.response.get('type') or response_type]()
@@ -99,6 +100,16 @@ def as_binary():
 	response.data = frappe.response['filecontent']
 	return response
 
+def as_file():
+	"""Send the temporary file at `frappe.response.filepath` without reading it in memory.
+	The file is deleted after it is sent"""
+	path = frappe.response['filepath']
+	response = Response(wrap_file(frappe.local.request.environ, open(path, 'rb')), direct_passthrough=True)
+	response.mimetype = 'application/octet-stream'
+	response.headers["Content-Disposition"] = ("filename=\"%s\"" % frappe.response['filename'].replace(' ', '_')).encode("utf-8")
+	response.call_on_close(lambda: os.remove(path))
+	return response
+
 def make_logs(response = None):
 	"""make strings for msgprint and errprint"""
 	if not response:
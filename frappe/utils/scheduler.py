@@ -18,7 +18,7 @@ import frappe.utils
 import os
 from frappe.utils import get_sites
 from datetime import datetime
-from frappe.utils.background_jobs import enqueue, get_jobs, queue_timeout
+from frappe.utils.background_jobs import enqueue, queue_timeout
 from frappe.limits import has_expired
 from frappe.utils.data import get_datetime, now_datetime
 from frappe.core.doctype.user.user import STANDARD_USERS
@@ -54,24 +54,39 @@ def start_scheduler():
 		time.sleep(1)
 
 def enqueue_events_for_all_sites():
-	'''Loop through sites and enqueue events that are not already queued'''
+	'''Loop through sites and enqueue events that are not already queued.
+	Set `scheduler_workers` in common_site_config.json to enqueue for that many sites
+	at a time, in separate processes'''
 
 	if os.path.exists(os.path.join('.', '.restarting')):
 		# Don't add task to queue if webserver is in restart mode
 		return
 
 	with frappe.init_site():
-		jobs_per_site = get_jobs()
 		sites = get_sites()
+		workers = frappe.utils.cint(frappe.get_conf().scheduler_workers)
+
+	if workers > 1 and len(sites) > 1:
+		from frappe.utils.site_pool import run_for_sites
+
+		start = time.time()
+		results = run_for_sites(enqueue_events_for_site, sites, workers, capture_output=False)
+		failed = [r for r in results if r.status != 'Success']
+		for r in failed:
+			print(r.error)
+
+		frappe.logger(__name__).debug('Queued events for {0} sites in {1:.1f}s, {2} failed'.format(
+			len(sites), time.time() - start, len(failed)))
+		return
 
 	for site in sites:
 		try:
-			enqueue_events_for_site(site=site, queued_jobs=jobs_per_site[site])
+			enqueue_events_for_site(site=site)
 		except:
 			# it should try to enqueue other sites
 			print(frappe.get_traceback())
 
-def enqueue_events_for_site(site, queued_jobs):
+def enqueue_events_for_site(site, queued_jobs=()):
 	def log_and_raise():
 		frappe.logger(__name__).error('Exception in Enqueue Events for Site {0}'.format(site) +
 			'\n' + frappe.get_traceback())
@@ -103,7 +118,7 @@ def enqueue_events_for_site(site, queued_jobs):
 	finally:
 		frappe.destroy()
 
-def enqueue_events(site, queued_jobs):
+def enqueue_events(site, queued_jobs=()):
 	nowtime = frappe.utils.now_datetime()
 	last = frappe.db.get_value('System Settings', 'System Settings', 'scheduler_last_event')
 
@@ -146,9 +161,6 @@ def trigger(site, event, last=None, queued_jobs=(), now=False):
 
 	queue = 'long' if event.endswith('_long') else 'short'
 	timeout = queue_timeout[queue]
-	if not queued_jobs and not now:
-		queued_jobs = get_jobs(site=site, queue=queue)
-
 	if frappe.flags.in_test:
 		frappe.flags.ran_schedulers.append(event)
 
@@ -175,8 +187,9 @@ def trigger(site, event, last=None, queued_jobs=(), now=False):
 
 	for handler in events:
 		if not now:
+			# jobs already in the queue are skipped by deduplicate
 			if handler not in queued_jobs:
-				enqueue(handler, queue, timeout, event)
+				enqueue(handler, queue, timeout, event, deduplicate=True)
 		else:
 			scheduler_task(site=site, event=event, handler=handler, now=True)
 
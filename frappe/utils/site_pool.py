@@ -0,0 +1,92 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""
+Run a function for many sites in a pool of worker processes.
+
+Each site runs in a new process (forked from the caller), so a failing site, or the
+state it leaves in `frappe.local` and module globals, does not affect the other sites.
+Used by `bench --site all migrate --parallel N` and the scheduler (`scheduler_workers`
+in common_site_config).
+"""
+
+from __future__ import unicode_literals, print_function
+
+import sys
+import time
+import multiprocessing
+
+from six import StringIO
+
+import frappe
+
+def run_for_sites(method, sites, processes, args=None, capture_output=True, callback=None):
+	"""Call `method(site, *args)` for each site, in at most `processes` processes at a time.
+
+	Returns a list of results (site, status, time, error, output), in the order the sites
+	finished. `callback` is called with each result as it comes in.
+
+	:param method: Module level function (it is pickled by name).
+	:param capture_output: Collect stdout / stderr of each site in `output`, instead of
+		interleaving the output of all sites."""
+	tasks = [(method, site, tuple(args or ()), capture_output) for site in sites]
+	results = []
+
+	pool = multiprocessing.Pool(max(1, min(processes, len(tasks))),
+		initializer=reset_connections, maxtasksperchild=1)
+	try:
+		for result in pool.imap_unordered(run_for_site, tasks):
+			results.append(result)
+			if callback:
+				callback(result)
+	finally:
+		pool.close()
+		pool.join()
+
+	return results
+
+def run_for_site(task):
+	method, site, args, capture_output = task
+	if capture_output:
+		sys.stdout = sys.stderr = output = StringIO()
+
+	start = time.time()
+	try:
+		method(site, *args)
+		status, error = 'Success', None
+	except BaseException:
+		# SystemExit, KeyboardInterrupt must not kill the pool
+		status, error = 'Failed', frappe.get_traceback()
+	finally:
+		if capture_output:
+			sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+	return frappe._dict(site=site, status=status, time=time.time() - start, error=error,
+		output=output.getvalue() if capture_output else None)
+
+def reset_connections():
+	"""Connections opened before the fork must not be shared with the parent"""
+	import frappe.realtime
+	import frappe.utils.background_jobs
+
+	frappe.redis_server = None
+	frappe.realtime.redis_server = None
+	frappe.utils.background_jobs.redis_connection = None
+
+def print_report(results, title):
+	"""Print the status of each site and the tracebacks of failed sites"""
+	failed = [r for r in results if r.status != 'Success']
+
+	print()
+	print('{0}: {1} sites, {2} failed, {3:.1f}s in total'.format(title, len(results),
+		len(failed), sum(r.time for r in results)))
+	for r in sorted(results, key=lambda r: r.site):
+		print('{0:<40} {1:<8} {2:>8.1f}s'.format(r.site, r.status, r.time))
+
+	for r in failed:
+		print()
+		print('{0} failed:'.format(r.site))
+		if r.output:
+			print(r.output)
+		print(r.error)
+
+	return failed
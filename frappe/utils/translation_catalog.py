@@ -0,0 +1,174 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""
+Compiled translation catalogs.
+
+The app translations of each language (see `frappe.translate.get_translations_from_apps`)
+are written to `sites/translations/[lang].catalog` by `bench build` and `bench migrate`.
+Workers memory map the file, so `_()` looks up a message in place instead of
+unpickling the full dictionary of the language on every request, and the pages of
+the file are shared by all workers through the OS page cache.
+
+Format (little endian):
+
+	header   magic "FTC1", uint32 count
+	index    count x (uint64 hash, uint32 key offset, uint32 key length,
+	         uint32 value offset, uint32 value length), sorted by hash
+	strings  utf-8 keys and values
+
+`hash` is the first 8 bytes of the md5 of the utf-8 key. A lookup is a binary search
+of the index. User translations (`Translation`) are not compiled, they are looked up
+in a small dict before the catalog.
+
+To rebuild the catalogs:
+
+	bench --site [sitename] execute frappe.utils.translation_catalog.build_catalogs
+"""
+
+from __future__ import unicode_literals, print_function
+
+import os
+import mmap
+import struct
+import hashlib
+from six.moves import range
+
+import frappe
+
+MAGIC = b'FTC1'
+HEADER = struct.Struct(str('<4sI'))
+ENTRY = struct.Struct(str('<QIIII'))
+HASH = struct.Struct(str('<Q'))
+
+# path -> Catalog, mapped once per process
+catalogs = {}
+
+class Catalog(object):
+	"""Read only mapping of a compiled catalog file"""
+	def __init__(self, path):
+		with open(path, 'rb') as f:
+			self.stat = os.fstat(f.fileno())
+			self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, self.count = HEADER.unpack_from(self.data, 0)
+		if magic != MAGIC:
+			raise ValueError('{0} is not a translation catalog'.format(path))
+
+	def get(self, key, default=None):
+		key = key.encode('utf-8')
+		key_hash = get_hash(key)
+
+		# first entry with the hash
+		lo, hi = 0, self.count
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if HASH.unpack_from(self.data, HEADER.size + mid * ENTRY.size)[0] < key_hash:
+				lo = mid + 1
+			else:
+				hi = mid
+
+		for i in range(lo, self.count):
+			entry_hash, key_offset, key_length, value_offset, value_length = \
+				ENTRY.unpack_from(self.data, HEADER.size + i * ENTRY.size)
+			if entry_hash != key_hash:
+				break
+
+			if self.data[key_offset:key_offset + key_length] == key:
+				return self.data[value_offset:value_offset + value_length].decode('utf-8')
+
+		return default
+
+	def __contains__(self, key):
+		return self.get(key) is not None
+
+	def __len__(self):
+		return self.count
+
+	def is_file(self, stat):
+		"""True if `stat` is of the mapped file, i.e. the catalog was not rebuilt since"""
+		return (stat.st_ino, stat.st_mtime, stat.st_size) == \
+			(self.stat.st_ino, self.stat.st_mtime, self.stat.st_size)
+
+def get_hash(key):
+	return HASH.unpack(hashlib.md5(key).digest()[:8])[0]
+
+def get_catalog_path(lang):
+	return os.path.join(frappe.local.sites_path, 'translations', lang + '.catalog')
+
+def get_catalog(lang):
+	"""Returns the compiled catalog of `lang`, or None if it is not built. The file is
+	checked for a rebuild once per request"""
+	if frappe.local.conf.developer_mode:
+		# translation files are edited
+		return None
+
+	if getattr(frappe.local, 'translation_catalogs', None) is None:
+		frappe.local.translation_catalogs = {}
+
+	if lang not in frappe.local.translation_catalogs:
+		path = get_catalog_path(lang)
+		try:
+			stat = os.stat(path)
+		except OSError:
+			catalog = None
+		else:
+			catalog = catalogs.get(path)
+			if not (catalog and catalog.is_file(stat)):
+				catalog = catalogs[path] = Catalog(path)
+
+		frappe.local.translation_catalogs[lang] = catalog
+
+	return frappe.local.translation_catalogs[lang]
+
+def write_catalog(path, translations):
+	"""Compile `translations` ({message: translation}) to the catalog file at `path`"""
+	entries = []
+	for key, value in translations.items():
+		if value:
+			key = key.encode('utf-8')
+			entries.append((get_hash(key), key, value.encode('utf-8')))
+	entries.sort(key=lambda entry: entry[0])
+
+	index, strings = [], []
+	offset = HEADER.size + ENTRY.size * len(entries)
+	for key_hash, key, value in entries:
+		index.append(ENTRY.pack(key_hash, offset, len(key), offset + len(key), len(value)))
+		strings.extend((key, value))
+		offset += len(key) + len(value)
+
+	frappe.create_folder(os.path.dirname(path))
+
+	# replaced atomically, workers that have mapped the old file keep reading it
+	tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+	with open(tmp_path, 'wb') as f:
+		f.write(HEADER.pack(MAGIC, len(entries)))
+		f.write(b''.join(index))
+		f.write(b''.join(strings))
+	os.rename(tmp_path, path)
+
+def get_languages():
+	"""Languages that have a translation file in any app, and the languages of the site"""
+	languages = set()
+	if getattr(frappe.local, 'db', None):
+		from frappe.translate import get_all_languages
+		languages.update(get_all_languages())
+
+	for app in frappe.get_all_apps(True):
+		path = os.path.join(frappe.get_pymodule_path(app), "translations")
+		if os.path.exists(path):
+			languages.update(f[:-4] for f in os.listdir(path) if f.endswith('.csv'))
+
+	return sorted(languages)
+
+def build_catalogs(verbose=False):
+	"""Compile the app translations of all languages"""
+	from frappe.translate import get_translations_from_apps
+
+	for lang in get_languages():
+		if lang == 'en':
+			continue
+
+		translations = get_translations_from_apps(lang)
+		write_catalog(get_catalog_path(lang), translations)
+		if verbose:
+			print('Built translation catalog for {0} ({1} messages)'.format(lang, len(translations)))
@@ -6,6 +6,8 @@ import frappe
 
 import openpyxl
 import re
+import os
+import tempfile
 from openpyxl.styles import Font
 from openpyxl import load_workbook
 from six import BytesIO, string_types
@@ -13,19 +15,42 @@ from six import BytesIO, string_types
 ILLEGAL_CHARACTERS_RE = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
 # return xlsx file object
 def make_xlsx(data, sheet_name, wb=None):
+	writer = XLSXWriter(sheet_name, wb)
+	for row in data:
+		writer.writerow(row)
 
-	if wb is None:
-		wb = openpyxl.Workbook(write_only=True)
-
-	ws = wb.create_sheet(sheet_name, 0)
+	return writer.getvalue()
 
-	row1 = ws.row_dimensions[1]
-	row1.font = Font(name='Calibri',bold=True)
+def make_xlsx_file(data, sheet_name):
+	"""Write rows of `data` (can be a generator) to a temporary xlsx file and return its path.
 
+	Rows are streamed to disk, so memory does not grow with the number of rows. To send
+	the file (and delete it after), set `frappe.response.filepath` and `frappe.response.type = "file"`"""
+	writer = XLSXWriter(sheet_name)
 	for row in data:
+		writer.writerow(row)
+
+	return writer.save_to_file()
+
+
+class XLSXWriter(object):
+	"""Writes rows to a sheet of a write only workbook, so that rows do not need to be
+	collected in memory before building the file"""
+	def __init__(self, sheet_name, wb=None):
+		if wb is None:
+			wb = openpyxl.Workbook(write_only=True)
+
+		self.wb = wb
+		self.sheet_name = sheet_name
+		self.ws = wb.create_sheet(sheet_name, 0)
+
+		row1 = self.ws.row_dimensions[1]
+		row1.font = Font(name='Calibri',bold=True)
+
+	def writerow(self, row):
 		clean_row = []
 		for item in row:
-			if isinstance(item, string_types) and (sheet_name not in ['Data Import Template', 'Data Export']):
+			if isinstance(item, string_types) and (self.sheet_name not in ['Data Import Template', 'Data Export']):
 				value = handle_html(item)
 			else:
 				value = item
@@ -36,11 +61,20 @@ def make_xlsx(data, sheet_name, wb=None):
 
 			clean_row.append(value)
 
-		ws.append(clean_row)
+		self.ws.append(clean_row)
+
+	def getvalue(self):
+		"""Returns the xlsx file object"""
+		xlsx_file = BytesIO()
+		self.wb.save(xlsx_file)
+		return xlsx_file
 
-	xlsx_file = BytesIO()
-	wb.save(xlsx_file)
-	return xlsx_file
+	def save_to_file(self):
+		"""Saves the workbook to a temporary file and returns its path"""
+		fd, path = tempfile.mkstemp(prefix='frappe-', suffix='.xlsx')
+		os.close(fd)
+		self.wb.save(path)
+		return path
 
 
 def handle_html(data):
@@ -95,3 +129,44 @@ def read_xlsx_file_from_attached_file(file_url=None, fcontent=None, filepath=Non
 			tmp_list.append(cell.value)
 		rows.append(tmp_list)
 	return rows
+
+def benchmark(rows=500000, columns=10):
+	"""Print wall time and peak RSS of building an xlsx file of `rows` x `columns` in memory
+	(materialized rows, `make_xlsx`) and streamed to disk (row generator, `make_xlsx_file`)
+
+		bench --site [sitename] execute frappe.utils.xlsxutils.benchmark --kwargs "{'rows': 500000}"
+	"""
+	import multiprocessing
+
+	print('{0:<12} {1:>10} {2:>16}'.format('path', 'time (s)', 'peak rss (MB)'))
+	for path in ('in memory', 'streaming'):
+		# in a new process for each path, as peak rss can not be reset
+		pool = multiprocessing.Pool(1)
+		try:
+			wall_time, peak_rss = pool.apply(run_benchmark, (path, rows, columns))
+		finally:
+			pool.close()
+			pool.join()
+		print('{0:<12} {1:>10.2f} {2:>16.1f}'.format(path, wall_time, peak_rss / 1024.0))
+
+def run_benchmark(path, rows, columns):
+	import time
+	import datetime
+	import resource
+	from six.moves import range
+
+	def get_rows():
+		yield ['Column {0}'.format(i) for i in range(columns)]
+		for i in range(rows):
+			yield [('GL-{0}-{1}'.format(i, c) if c % 3 == 0 else
+				(i * 1.5 + c) if c % 3 == 1 else datetime.date(2019, 1, 1 + i % 28)) for c in range(columns)]
+
+	start = time.time()
+	if path == 'in memory':
+		data = list(get_rows())
+		make_xlsx(data, 'Benchmark').getvalue()
+	else:
+		os.remove(make_xlsx_file(get_rows(), 'Benchmark'))
+
+	# ru_maxrss is in KB on linux
+	return time.time() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,207 @@
+# Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""
+Full page cache for guest website pages.
+
+`frappe.app.application` serves pages from this cache before the session is loaded
+and the database is connected. Enable it in site config:
+
+	"website_page_cache": 1,
+	"website_page_cache_ttl": 60,
+	"website_page_cache_stale_ttl": 600
+
+GET / HEAD requests without a query string and without a logged in `sid` cookie are
+cacheable. Their rendered 200 responses are stored in the Redis hash
+`website_page_response`, one field (`[path]::[language]`) per page and language the
+page is rendered in. Each entry keeps the body, its gzip (and brotli, if installed) compressed copies, the ETag and the
+Last-Modified time, so a hit does no rendering or compression. Conditional requests
+get a 304.
+
+A page is fresh for `website_page_cache_ttl` seconds. For the next
+`website_page_cache_stale_ttl` seconds the stale copy is still served, while the page
+is rendered again in a background job. Entries are cleared with the `website_page`
+cache (`frappe.website.render.clear_cache`).
+"""
+
+from __future__ import unicode_literals
+
+import time
+import hashlib
+import datetime
+
+from werkzeug.wrappers import Response
+
+import frappe
+from frappe.utils import cint, gzip_compress
+
+CACHE_KEY = 'website_page_response'
+DEFAULT_TTL = 60
+DEFAULT_STALE_TTL = 600
+
+def is_enabled():
+	conf = frappe.local.conf
+	return bool(cint(conf.get('website_page_cache'))
+		and not conf.get('disable_website_cache') and not conf.get('developer_mode'))
+
+def is_cacheable_request(request):
+	"""Website GET / HEAD requests by guests, without query string"""
+	if request.method not in ('GET', 'HEAD') or request.query_string:
+		return False
+
+	if request.cookies.get('sid', 'Guest') != 'Guest' or request.headers.get('Authorization'):
+		return False
+
+	return not request.path.startswith(('/api/', '/backups', '/private/files/', '/files/', '/assets/'))
+
+def get_path(request):
+	return request.path.strip('/ ') or 'index'
+
+def get_variant(request):
+	"""The language the page is rendered in, guessed from the Accept-Language header
+	like `frappe.auth.HTTPRequest.set_lang` does for guests"""
+	from frappe.translate import guess_language
+
+	variant = guess_language()
+
+	# pages can have a version per translated language, see `render_page_by_language`
+	translated_languages = frappe.get_hooks('translated_languages_for_website')
+	if translated_languages:
+		variant += ':' + (guess_language(translated_languages) or '')
+
+	return variant
+
+def get_field(path, variant):
+	return '{0}::{1}'.format(path, variant)
+
+def get_response(request):
+	"""Returns the response for a cached page, or None"""
+	if not (is_enabled() and is_cacheable_request(request)):
+		return None
+
+	path, variant = get_path(request), get_variant(request)
+	entry = frappe.cache().hget(CACHE_KEY, get_field(path, variant))
+	if not entry:
+		return None
+
+	now = time.time()
+	if now > entry['expires'] + cint(frappe.local.conf.get('website_page_cache_stale_ttl') or DEFAULT_STALE_TTL):
+		return None
+
+	if now > entry['expires']:
+		refresh_in_background(request, entry)
+
+	return make_response(request, entry)
+
+def make_response(request, entry):
+	encoding = get_encoding(request, entry)
+
+	response = Response()
+	response.mimetype = entry['mimetype']
+	response.charset = 'utf-8'
+	response.data = entry[encoding] if encoding else entry['body']
+	if encoding:
+		response.headers['Content-Encoding'] = encoding
+
+	# encoded bodies are different representations and need their own tag
+	response.set_etag(entry['etag'] + ('-' + encoding if encoding else ''))
+	response.last_modified = datetime.datetime.utcfromtimestamp(entry['last_modified'])
+	response.headers['Cache-Control'] = 'no-cache'
+	response.headers['Vary'] = 'Accept-Encoding, Accept-Language'
+	response.headers['X-Page-Name'] = entry['page_name']
+	response.headers['X-From-Cache'] = 'True'
+
+	# 304 if the client has this version
+	return response.make_conditional(request.environ)
+
+def get_encoding(request, entry):
+	for encoding in ('br', 'gzip'):
+		if entry.get(encoding) and request.accept_encodings[encoding]:
+			return encoding
+
+def store_response(request, response):
+	"""Store the response of a rendered page if the request is cacheable"""
+	if not (is_enabled() and is_cacheable_request(request)):
+		return
+
+	from frappe.website.utils import can_cache
+	if (frappe.session.user != 'Guest' or response.status_code != 200 or response.direct_passthrough
+		or not can_cache() or response.headers.get('Content-Encoding')):
+		return
+
+	field = get_field(get_path(request), get_variant(request))
+	previous = frappe.cache().hget(CACHE_KEY, field)
+
+	body = response.get_data()
+	etag = hashlib.md5(body).hexdigest()
+
+	frappe.cache().hset(CACHE_KEY, field, {
+		'body': body,
+		'gzip': gzip_compress(body),
+		'br': brotli_compress(body),
+		'etag': etag,
+		# unchanged pages keep their validators, so clients still get a 304
+		'last_modified': previous['last_modified'] if previous and previous['etag'] == etag else int(time.time()),
+		'expires': time.time() + cint(frappe.local.conf.get('website_page_cache_ttl') or DEFAULT_TTL),
+		'mimetype': response.mimetype,
+		'page_name': response.headers.get('X-Page-Name') or '',
+		'lang': frappe.local.lang
+	})
+
+def clear(path=None):
+	"""Delete the cached responses of the page in all languages, or of all pages"""
+	cache = frappe.cache()
+	if not path:
+		cache.delete_value(CACHE_KEY)
+		return
+
+	prefix = get_field(path.strip('/ ') or 'index', '')
+	with cache.batch():
+		for field in cache.hkeys(CACHE_KEY):
+			field = frappe.safe_decode(field)
+			if field.startswith(prefix):
+				cache.hdel(CACHE_KEY, field)
+
+def brotli_compress(data):
+	try:
+		import brotli
+	except ImportError:
+		return None
+
+	return brotli.compress(data)
+
+def get_refresh_lock_key(path, variant):
+	return frappe.cache().make_key('{0}_refresh:{1}:{2}'.format(CACHE_KEY, path, variant))
+
+def refresh_in_background(request, entry):
+	from frappe.utils.background_jobs import enqueue
+
+	path, variant = get_path(request), get_variant(request)
+
+	# one refresh per page and language at a time
+	if frappe.cache().set(get_refresh_lock_key(path, variant), 1, nx=True, ex=60):
+		enqueue('frappe.website.page_cache.refresh', queue='short', path=request.path,
+			host_url=request.host_url, accept_language=request.headers.get('Accept-Language'),
+			lang=entry['lang'])
+
+def refresh(path, host_url, accept_language=None, lang=None):
+	"""Render the page as Guest and update the cached response"""
+	from werkzeug.test import EnvironBuilder
+	from werkzeug.wrappers import Request
+	import frappe.website.render
+
+	frappe.set_user('Guest')
+	headers = {'Accept-Language': accept_language} if accept_language else {}
+	request = Request(EnvironBuilder(path=path, base_url=host_url, headers=headers).get_environ())
+	frappe.local.request = request
+	if lang:
+		frappe.local.lang = lang
+
+	lock_key = get_refresh_lock_key(get_path(request), get_variant(request))
+	try:
+		# the rendered html is also cached in `website_page`, without expiry
+		frappe.cache().hdel('website_page', get_path(request))
+
+		store_response(request, frappe.website.render.render())
+	finally:
+		frappe.cache().delete(lock_key)
+		frappe.local.request = None
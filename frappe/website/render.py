@@ -286,7 +286,7 @@ def clear_cache(path=None):
 		frappe.clear_cache("Guest")
 		for key in ('portal_menu_items', 'home_page', 'website_route_rules',
 			'doctypes_with_web_view', 'website_redirects', 'page_context',
-			'website_page'):
+			'website_page', 'website_page_response'):
 			frappe.cache().delete_value(key)
 
 	for method in frappe.get_hooks("website_clear_cache"):
@@ -9,6 +9,8 @@ from past.builtins import cmp
 from frappe.utils import markdown
 
 def delete_page_cache(path):
+	from frappe.website.page_cache import clear as clear_page_responses
+
 	cache = frappe.cache()
 	cache.delete_value('full_index')
 	groups = ("website_page", "page_context")
@@ -19,6 +21,8 @@ def delete_page_cache(path):
 		for name in groups:
 			cache.delete_key(name)
 
+	clear_page_responses(path)
+
 def find_first_image(html):
 	m = re.finditer("""<img[^>]*src\s?=\s?['"]([^'"]*)['"]""", html)
 	try:
@@ -317,6 +317,10 @@ def make_layout(doc, meta, format_data=None):
 		if is_visible(df, doc) and has_value(df, doc):
 			append_empty_field_dict_to_page_column(page)
 
+			if df.fieldtype=="Table":
+				# rows are set on the docfield below, not on the one of the (shared) meta
+				df = copy.copy(df)
+
 			page[-1]['columns'][-1]['fields'].append(df)
 
 			# section has fields